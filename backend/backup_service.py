@@ -1,8 +1,10 @@
 import asyncio
+import hashlib
 import json
 import os
+import time
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Callable, Optional, Tuple
 
 import httpx
 
@@ -17,6 +19,14 @@ EXCHANGE_PRICES_URL = f"{EXCHANGE_BASE}/mat-prices"
 EXCHANGE_DETAILS_URL = f"{EXCHANGE_BASE}/mat-details"
 EXCHANGE_DETAILS_ALL_URL = f"{EXCHANGE_BASE}/mat-details"
 
+# (source, url, backup file, json.dumps options)
+BACKUP_SOURCES: List[Tuple[str, str, str, Dict[str, Any]]] = [
+    ('game_data', GAME_DATA_URL, 'game_data_backup.json', {'indent': 2}),
+    ('exchange_prices', EXCHANGE_PRICES_URL, 'exchange_prices_backup.json', {'separators': (',', ':')}),
+    # 使用全量详情接口（7天历史）
+    ('exchange_details_all', EXCHANGE_DETAILS_ALL_URL, 'exchange_details_all_backup.json', {'separators': (',', ':')}),
+]
+
 
 class BackupService:
     """Periodically backs up official API payloads to local files (overwrites)."""
@@ -25,11 +35,30 @@ class BackupService:
         self.interval_seconds = interval_seconds
         self._task: asyncio.Task | None = None
         self._stopping: bool = False
+        self._listeners: List[Callable[[str, Any], None]] = []
+        self._client: Optional[httpx.AsyncClient] = None
+        # per-source conditional request validators (ETag / Last-Modified)
+        self._validators: Dict[str, Dict[str, str]] = {}
+        # per-source sha256 of the last upstream body that was written (or found identical on disk)
+        self._content_hashes: Dict[str, str] = {}
+
+    def add_listener(self, callback: Callable[[str, Any], None]) -> None:
+        """Register a callback(source, payload) invoked after a backup file is rewritten."""
+        self._listeners.append(callback)
+
+    def _notify(self, source: str, payload: Any) -> None:
+        for callback in self._listeners:
+            try:
+                callback(source, payload)
+            except Exception:  # noqa: BLE001
+                # a failing consumer must not break the backup cycle
+                pass
 
-    async def _fetch_json(self, client: httpx.AsyncClient, url: str) -> Any:
-        resp = await client.get(url, timeout=30)
-        resp.raise_for_status()
-        return resp.json()
+    def _get_client(self) -> httpx.AsyncClient:
+        """Long-lived pooled client shared by all backup cycles."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=30)
+        return self._client
 
     def _atomic_write(self, target_path: str, content: str) -> None:
         tmp_path = f"{target_path}.tmp"
@@ -37,6 +66,79 @@ class BackupService:
             f.write(content)
         os.replace(tmp_path, target_path)
 
+    def _store(self, target_path: str, body: bytes, dump_options: Dict[str, Any]) -> Tuple[Any, bool]:
+        """
+        Parse an upstream body and write it to the backup file unless the file already holds
+        identical content. Runs in a worker thread (parsing/serializing 1 MB+ blocks the loop).
+
+        Returns:
+            (payload, written)
+        """
+        payload = json.loads(body)
+        content = json.dumps(payload, ensure_ascii=False, **dump_options)
+        try:
+            with open(target_path, 'r', encoding='utf-8') as f:
+                if f.read() == content:
+                    return payload, False
+        except OSError:
+            pass
+        self._atomic_write(target_path, content)
+        return payload, True
+
+    async def _backup_source(self, source: str, url: str, filename: str,
+                             dump_options: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Fetch one source and rewrite its backup file only when the content changed.
+
+        Returns:
+            (status, metrics) where status is 'ok', 'unchanged', 'not_modified' or 'error: ...'
+        """
+        metrics: Dict[str, Any] = {'latency_ms': None, 'bytes': 0, 'http_status': None}
+        started = time.monotonic()
+        try:
+            headers = {}
+            validators = self._validators.get(source, {})
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+
+            resp = await self._get_client().get(url, headers=headers)
+            metrics['latency_ms'] = round((time.monotonic() - started) * 1000, 1)
+            metrics['http_status'] = resp.status_code
+            metrics['bytes'] = len(resp.content)
+            if resp.status_code == 304:
+                return 'not_modified', metrics
+            resp.raise_for_status()
+
+            validators = {
+                'etag': resp.headers.get('etag', ''),
+                'last_modified': resp.headers.get('last-modified', '')
+            }
+            digest = hashlib.sha256(resp.content).hexdigest()
+            if self._content_hashes.get(source) == digest:
+                self._validators[source] = validators
+                return 'unchanged', metrics
+
+            payload, written = await asyncio.to_thread(
+                self._store, os.path.join(DATA_DIR, filename), resp.content, dump_options
+            )
+            # only remember validators/hash once the file on disk matches this body,
+            # otherwise a failed store would be masked by 304s on later cycles
+            self._validators[source] = validators
+            self._content_hashes[source] = digest
+            if not written:
+                return 'unchanged', metrics
+            self._notify(source, payload)
+            return 'ok', metrics
+        except Exception as e:  # noqa: BLE001
+            # force an unconditional full fetch next cycle
+            self._validators.pop(source, None)
+            self._content_hashes.pop(source, None)
+            if metrics['latency_ms'] is None:
+                metrics['latency_ms'] = round((time.monotonic() - started) * 1000, 1)
+            return f"error: {e}", metrics
+
     def _ensure_data_dir(self) -> None:
         os.makedirs(DATA_DIR, exist_ok=True)
 
@@ -44,44 +146,16 @@ class BackupService:
         self._ensure_data_dir()
         result: Dict[str, Any] = {"timestamp": datetime.utcnow().isoformat() + "Z"}
 
-        async with httpx.AsyncClient() as client:
-            # 1) Game Data backup
-            try:
-                game_data = await self._fetch_json(client, GAME_DATA_URL)
-                
-                self._atomic_write(
-                    os.path.join(DATA_DIR, 'game_data_backup.json'),
-                    json.dumps(game_data, ensure_ascii=False, indent=2)
-                )
-                result['game_data'] = 'ok'
-            except Exception as e:  # noqa: BLE001
-                result['game_data'] = f"error: {e}"
-
-            # 2) Exchange prices backup (all materials)
-            try:
-                prices = await self._fetch_json(client, EXCHANGE_PRICES_URL)
-                self._atomic_write(
-                    os.path.join(DATA_DIR, 'exchange_prices_backup.json'),
-                    json.dumps(prices, ensure_ascii=False, separators=(',', ':'))
-                )
-                result['exchange_prices'] = 'ok'
-            except Exception as e:  # noqa: BLE001
-                result['exchange_prices'] = f"error: {e}"
-
-            # 3) Exchange material details backup（使用全量详情接口即可）
-            try:
-                # Prefer single-shot all materials details (7-day history)
-                try:
-                    details_all = await self._fetch_json(client, EXCHANGE_DETAILS_ALL_URL)
-                    self._atomic_write(
-                        os.path.join(DATA_DIR, 'exchange_details_all_backup.json'),
-                        json.dumps(details_all, ensure_ascii=False, separators=(',', ':'))
-                    )
-                    result['exchange_details_all'] = 'ok'
-                except Exception as e_all:  # noqa: BLE001
-                    result['exchange_details_all'] = f"error: {e_all}"
-            except Exception as e:  # noqa: BLE001
-                result['exchange_details_all'] = f"error: {e}"
+        # all sources are fetched concurrently on the shared client
+        outcomes = await asyncio.gather(*[
+            self._backup_source(source, url, filename, dump_options)
+            for source, url, filename, dump_options in BACKUP_SOURCES
+        ])
+        source_metrics: Dict[str, Any] = {}
+        for (source, _, _, _), (status, metrics) in zip(BACKUP_SOURCES, outcomes):
+            result[source] = status
+            source_metrics[source] = metrics
+        result['metrics'] = source_metrics
 
         return result
 
@@ -107,6 +181,9 @@ class BackupService:
             except Exception:
                 pass
             self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def run_once(self) -> Dict[str, Any]:
         return await self._backup_once()
@@ -0,0 +1,654 @@
+"""
+GT2See 基地规划（线性规划 / 混合整数规划）
+给定每小时目标产出、建筑槽位（galaxyConfig.slotsPerBase）、劳动力上限与价格，求每种配方运行的建筑数量，
+使每小时净成本最低（允许出售剩余产出时即净收益最高）。SciPy（requirements.txt 中固定版本）可用时使用 HiGHS 求解，
+否则使用内置的单纯形法 + 分支定界；求解有时间上限，超时返回当前最优可行解
+"""
+import math
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy 为内置求解器的依赖
+    np = None
+
+try:
+    from scipy.optimize import linprog, milp, Bounds, LinearConstraint
+except ImportError:  # SciPy 为可选依赖，缺失时使用内置求解器
+    linprog = None
+
+from calculators import ComprehensiveAnalyzer
+from constants import get_material_name, get_building_name
+from price_table import is_valid_price
+
+HAS_NUMPY = np is not None
+HAS_SCIPY = linprog is not None
+
+WORKFORCE_TYPES = ('Worker', 'Technician', 'Engineer', 'Scientist')
+
+# 单纯形法的数值容差（检验数按归一化后的目标函数比较）
+_TOLERANCE = 1e-9
+
+# 主元的最小绝对值，避免在接近0的元素上换基导致数值发散
+_PIVOT_TOLERANCE = 1e-7
+
+# 判断整数解的容差
+_INTEGER_TOLERANCE = 1e-6
+
+# 累计多少次退化迭代后改用 Bland 规则（防止循环）
+_DEGENERATE_LIMIT = 50
+
+# 单次单纯形求解的最大迭代次数
+_MAX_ITERATIONS = 50000
+
+
+class PlannerTimeout(Exception):
+    """求解超时"""
+
+
+class LPResult:
+    """一次线性规划求解的结果"""
+
+    __slots__ = ('status', 'x', 'objective', 'duals_ub', 'duals_eq')
+
+    def __init__(self, status: str, x=None, objective: Optional[float] = None, duals_ub=None, duals_eq=None):
+        # status: optimal / infeasible / unbounded
+        self.status = status
+        self.x = x
+        self.objective = objective
+        # 约束右端的边际值（目标函数对右端项的导数）
+        self.duals_ub = duals_ub
+        self.duals_eq = duals_eq
+
+
+def _pivot(tableau, row: int, col: int):
+    """以 tableau[row, col] 为主元做一次换基"""
+    tableau[row] /= tableau[row, col]
+    column = tableau[:, col].copy()
+    column[row] = 0.0
+    tableau -= np.outer(column, tableau[row])
+
+
+def _run_simplex(tableau, basis: List[int], allowed, deadline: float) -> str:
+    """
+    在单纯形表上迭代到最优（最后一行为检验数，最后一列为右端项）
+
+    Args:
+        allowed: 允许入基的列（布尔数组）
+
+    Returns:
+        'optimal' 或 'unbounded'
+    """
+    degenerate = 0
+    last_objective = tableau[-1, -1]
+    for _ in range(_MAX_ITERATIONS):
+        if time.monotonic() > deadline:
+            raise PlannerTimeout()
+
+        reduced = tableau[-1, :-1]
+        candidates = np.flatnonzero((reduced < -_TOLERANCE) & allowed)
+        if len(candidates) == 0:
+            return 'optimal'
+
+        bland = degenerate >= _DEGENERATE_LIMIT
+        col = int(candidates[0]) if bland else int(candidates[np.argmin(reduced[candidates])])
+
+        column = tableau[:-1, col]
+        rows = np.flatnonzero(column > _PIVOT_TOLERANCE)
+        if len(rows) == 0:
+            return 'unbounded'
+        ratios = np.maximum(tableau[rows, -1], 0.0) / column[rows]
+        best = ratios.min()
+        ties = rows[ratios <= best + _TOLERANCE]
+        if bland:
+            row = int(min(ties, key=lambda r: basis[r]))
+        else:
+            # 比值相同时选主元绝对值最大的行，数值更稳定
+            row = int(ties[np.argmax(column[ties])])
+
+        _pivot(tableau, row, col)
+        basis[row] = col
+
+        # 退化迭代过多后一直使用 Bland 规则直到结束
+        if tableau[-1, -1] <= last_objective + _TOLERANCE:
+            degenerate += 1
+        last_objective = tableau[-1, -1]
+    raise Exception("Simplex iteration limit reached")
+
+
+def simplex(c, A_ub, b_ub, A_eq, b_eq, deadline: float) -> LPResult:
+    """
+    两阶段单纯形法：min c·x，s.t. A_ub·x ≤ b_ub，A_eq·x = b_eq，x ≥ 0
+
+    每行都加人工变量，人工变量列在第二阶段保留（不再入基），其检验数即约束的对偶值
+
+    Raises:
+        PlannerTimeout: 超过 deadline（time.monotonic）
+    """
+    # 目标函数归一化，使检验数的容差与价格量级无关
+    c = np.asarray(c, dtype=float)
+    scale = float(np.abs(c).max(initial=0.0)) or 1.0
+    A = np.vstack([A_ub, A_eq]).astype(float)
+    b = np.concatenate([b_ub, b_eq]).astype(float)
+    m_ub = len(b_ub)
+    m, n = A.shape
+
+    # 右端项为负的行整行取反，保证初始基可行
+    sign = np.where(b < 0, -1.0, 1.0)
+    A *= sign[:, None]
+    b *= sign
+
+    slack_start = n
+    artificial_start = n + m_ub
+    width = artificial_start + m
+    tableau = np.zeros((m + 1, width + 1))
+    tableau[:m, :n] = A
+    tableau[np.arange(m_ub), slack_start + np.arange(m_ub)] = sign[:m_ub]
+    tableau[np.arange(m), artificial_start + np.arange(m)] = 1.0
+    tableau[:m, -1] = b
+    basis = [artificial_start + i for i in range(m)]
+
+    allowed = np.zeros(width, dtype=bool)
+    allowed[:artificial_start] = True
+
+    # 第一阶段：最小化人工变量之和
+    tableau[-1, :artificial_start] = -tableau[:m, :artificial_start].sum(axis=0)
+    tableau[-1, -1] = -b.sum()
+    _run_simplex(tableau, basis, allowed, deadline)
+    if -tableau[-1, -1] > 1e-7 * max(1.0, float(np.abs(b).max(initial=0.0))):
+        return LPResult('infeasible')
+
+    # 把仍在基中（取值为0）的人工变量换出；整行为0的冗余约束保留
+    for row in range(m):
+        if basis[row] >= artificial_start:
+            candidates = np.flatnonzero(np.abs(tableau[row, :artificial_start]) > _TOLERANCE)
+            if len(candidates):
+                col = int(candidates[0])
+                _pivot(tableau, row, col)
+                basis[row] = col
+
+    # 第二阶段：原目标函数
+    costs = np.zeros(width)
+    costs[:n] = c / scale
+    basic_costs = costs[basis]
+    tableau[-1, :-1] = costs - basic_costs @ tableau[:m, :-1]
+    tableau[-1, -1] = -(basic_costs @ tableau[:m, -1])
+    if _run_simplex(tableau, basis, allowed, deadline) == 'unbounded':
+        return LPResult('unbounded')
+
+    solution = np.zeros(width)
+    solution[basis] = tableau[:m, -1]
+    x = solution[:n]
+    duals = -tableau[-1, artificial_start:width] * sign * scale
+    return LPResult('optimal', x, float(c @ x), duals[:m_ub], duals[m_ub:])
+
+
+class BasePlanModel:
+    """
+    基地规划的矩阵形式
+
+    变量（均为每小时）：[每个配方运行的建筑数 | 各材料购买量 | 各材料出售量]
+    约束：每种材料 产出 - 消耗 + 购买 - 出售 = 目标产出；建筑数之和 ≤ 槽位；各类劳动力 ≤ 上限
+    目标：最小化 劳动力成本 + 购买成本 - 出售收入
+    """
+
+    def __init__(
+        self,
+        index,
+        material_prices: Dict[int, Dict[str, Any]],
+        targets: Dict[int, float],
+        slots: int,
+        workforce_limits: Optional[List[Optional[float]]] = None,
+        building_ids: Optional[set] = None,
+        allow_buy: bool = True,
+        sell_surplus: bool = True,
+        fertility_abundance: float = 100.0,
+        total_population: int = 0,
+        include_workforce: bool = True
+    ):
+        self.targets = targets
+        self.slots = slots
+        self.workforce_limits = list(workforce_limits or [None] * len(WORKFORCE_TYPES))
+        efficiency = fertility_abundance / 100.0 if fertility_abundance > 0 else 1.0
+
+        # 可用配方：建筑在允许范围内，且（计入劳动力时）劳动力成本可用
+        self.workforce_cost: Dict[Any, float] = {}
+        usable_by_output: Dict[Any, List[Dict[str, Any]]] = {}
+        for recipe in index.recipes:
+            building = index.buildings_by_id.get(recipe.get('producedIn'))
+            output = recipe.get('output') or {}
+            if building is None or not output.get('am') or not recipe.get('timeMinutes'):
+                continue
+            if building_ids and building.get('id') not in building_ids:
+                continue
+            cost_per_hour = 0.0
+            if include_workforce:
+                workforce = ComprehensiveAnalyzer.calculate_workforce_cost_per_cycle(
+                    building, recipe, material_prices, index.materials_by_name, total_population
+                )
+                if workforce['totalWorkforceCost'] is None:
+                    continue
+                # 劳动力按天消耗，与生产效率无关：按原始生产时间折算为每小时
+                cost_per_hour = workforce['totalWorkforceCost'] / (recipe['timeMinutes'] / 60)
+            self.workforce_cost[recipe.get('id')] = cost_per_hour
+            usable_by_output.setdefault(output.get('id'), []).append(recipe)
+
+        # 相关材料：目标材料（允许出售时还包括所有可生产材料）及其配方输入的闭包
+        pending = list(targets)
+        if sell_surplus:
+            pending.extend(usable_by_output)
+        relevant = set()
+        self.recipes: List[Dict[str, Any]] = []
+        while pending:
+            mat_id = pending.pop()
+            if mat_id in relevant:
+                continue
+            relevant.add(mat_id)
+            for recipe in usable_by_output.get(mat_id, []):
+                self.recipes.append(recipe)
+                for item in recipe.get('inputs', []) or []:
+                    pending.append(item.get('id'))
+        self.recipes.sort(key=lambda r: r.get('id'))
+        self.material_ids: List[Any] = sorted(relevant)
+        row_of = {mat_id: i for i, mat_id in enumerate(self.material_ids)}
+
+        self.prices: Dict[Any, Optional[float]] = {}
+        for mat_id in self.material_ids:
+            price = material_prices.get(mat_id, {}).get('currentPrice')
+            self.prices[mat_id] = price if is_valid_price(price) else None
+
+        # 每个配方每栋建筑每小时的产出与消耗
+        self.buildings = [index.buildings_by_id[r.get('producedIn')] for r in self.recipes]
+        self.output_rates: List[float] = []
+        self.input_rates: List[List[Tuple[Any, float]]] = []
+        for recipe in self.recipes:
+            runs_per_hour = 60.0 / recipe['timeMinutes'] * efficiency
+            self.output_rates.append(recipe['output']['am'] * runs_per_hour)
+            self.input_rates.append([
+                (item.get('id'), item.get('am', 0) * runs_per_hour) for item in recipe.get('inputs', []) or []
+            ])
+
+        # 变量布局
+        self.buy_ids = [m for m in self.material_ids if allow_buy and self.prices[m] is not None]
+        self.sell_ids = list(self.material_ids)
+        n_recipes = len(self.recipes)
+        self.buy_start = n_recipes
+        self.sell_start = n_recipes + len(self.buy_ids)
+        n_vars = self.sell_start + len(self.sell_ids)
+        self.n_recipes = n_recipes
+
+        c = [0.0] * n_vars
+        for j, recipe in enumerate(self.recipes):
+            c[j] = self.workforce_cost[recipe.get('id')]
+        for k, mat_id in enumerate(self.buy_ids):
+            c[self.buy_start + k] = self.prices[mat_id]
+        for k, mat_id in enumerate(self.sell_ids):
+            price = self.prices[mat_id]
+            c[self.sell_start + k] = -price if sell_surplus and price is not None else 0.0
+        self.c = np.array(c)
+
+        A_eq = np.zeros((len(self.material_ids), n_vars))
+        for j, recipe in enumerate(self.recipes):
+            A_eq[row_of[recipe['output']['id']], j] += self.output_rates[j]
+            for mat_id, rate in self.input_rates[j]:
+                A_eq[row_of[mat_id], j] -= rate
+        for k, mat_id in enumerate(self.buy_ids):
+            A_eq[row_of[mat_id], self.buy_start + k] = 1.0
+        for k, mat_id in enumerate(self.sell_ids):
+            A_eq[row_of[mat_id], self.sell_start + k] = -1.0
+        self.A_eq = A_eq
+        self.b_eq = np.array([float(targets.get(m, 0.0)) for m in self.material_ids])
+
+        # 槽位约束在第0行，其后为有上限的劳动力类型
+        ub_rows = [[1.0] * n_recipes + [0.0] * (n_vars - n_recipes)]
+        ub_rhs = [float(slots)]
+        self.workforce_rows: List[int] = []
+        for k, limit in enumerate(self.workforce_limits):
+            if limit is None:
+                continue
+            row = [0.0] * n_vars
+            for j, building in enumerate(self.buildings):
+                row[j] = float(self._workers(building)[k])
+            ub_rows.append(row)
+            ub_rhs.append(float(limit))
+            self.workforce_rows.append(k)
+        self.A_ub = np.array(ub_rows)
+        self.b_ub = np.array(ub_rhs)
+
+    @staticmethod
+    def _workers(building: Dict[str, Any]) -> List[int]:
+        """建筑所需劳动力 [Worker, Technician, Engineer, Scientist]"""
+        workers = building.get('workersNeeded', [0, 0, 0, 0])
+        if not isinstance(workers, list) or len(workers) < 4:
+            return [0, 0, 0, 0]
+        return workers[:4]
+
+    def with_bounds(self, bounds: Dict[int, Tuple[Optional[float], Optional[float]]]):
+        """附加变量上下界约束后的 (A_ub, b_ub)（供分支定界使用）"""
+        if not bounds:
+            return self.A_ub, self.b_ub
+        rows = []
+        rhs = []
+        for j, (lower, upper) in bounds.items():
+            if upper is not None:
+                row = np.zeros(len(self.c))
+                row[j] = 1.0
+                rows.append(row)
+                rhs.append(upper)
+            if lower is not None and lower > 0:
+                row = np.zeros(len(self.c))
+                row[j] = -1.0
+                rows.append(row)
+                rhs.append(-lower)
+        if not rows:
+            return self.A_ub, self.b_ub
+        return np.vstack([self.A_ub, rows]), np.concatenate([self.b_ub, rhs])
+
+
+def _fractional_column(x, n_integer: int) -> Optional[int]:
+    """小数部分最接近0.5的整数变量，全部为整数时返回None"""
+    best = None
+    best_distance = 0.5 - _INTEGER_TOLERANCE
+    for j in range(n_integer):
+        distance = abs(x[j] - math.floor(x[j] + 0.5))
+        if distance > _INTEGER_TOLERANCE and 0.5 - distance < best_distance:
+            best = j
+            best_distance = 0.5 - distance
+    return best
+
+
+def _solve_builtin(model: BasePlanModel, integer: bool, deadline: float) -> Dict[str, Any]:
+    """内置求解器：单纯形法求LP松弛，需要整数解时深度优先分支定界"""
+    relaxation = simplex(model.c, model.A_ub, model.b_ub, model.A_eq, model.b_eq, deadline)
+    outcome = {'relaxation': relaxation, 'x': relaxation.x, 'objective': relaxation.objective,
+               'status': relaxation.status, 'integral': False, 'gap': None, 'nodes': 0}
+    if relaxation.status != 'optimal' or not integer:
+        return outcome
+
+    n_integer = model.n_recipes
+    incumbent = None
+    incumbent_objective = math.inf
+
+    def solve_node(bounds):
+        A_ub, b_ub = model.with_bounds(bounds)
+        result = simplex(model.c, A_ub, b_ub, model.A_eq, model.b_eq, deadline)
+        return result if result.status == 'optimal' else None
+
+    def improves(objective):
+        if incumbent is None:
+            return True
+        return objective < incumbent_objective - _TOLERANCE * max(1.0, abs(incumbent_objective))
+
+    # 启发：建筑数向下取整后固定，求连续变量（允许购买时通常可行），作为初始可行解
+    stack = [(relaxation.objective, {}, relaxation.x)]
+    nodes = 0
+    try:
+        floors = {j: (math.floor(relaxation.x[j] + _INTEGER_TOLERANCE),) * 2 for j in range(n_integer)}
+        rounded = solve_node(floors)
+        if rounded is not None:
+            incumbent, incumbent_objective = rounded.x, rounded.objective
+
+        while stack:
+            bound, bounds, x = stack.pop()
+            if not improves(bound):
+                continue
+            col = _fractional_column(x, n_integer)
+            if col is None:
+                incumbent, incumbent_objective = x, bound
+                continue
+            nodes += 1
+            value = x[col]
+            lower, upper = bounds.get(col, (None, None))
+            down = dict(bounds)
+            down[col] = (lower, float(math.floor(value)))
+            up = dict(bounds)
+            up[col] = (float(math.ceil(value)), upper)
+            # 先压入较远的分支，使离松弛解更近的分支先被探索
+            children = [down, up] if value - math.floor(value) >= 0.5 else [up, down]
+            for child_bounds in children:
+                child = solve_node(child_bounds)
+                if child is not None and improves(child.objective):
+                    stack.append((child.objective, child_bounds, child.x))
+        timed_out = False
+    except PlannerTimeout:
+        timed_out = True
+
+    outcome['nodes'] = nodes
+    if incumbent is None:
+        outcome['status'] = 'timeLimit' if timed_out else 'infeasible'
+        return outcome
+
+    outcome.update(x=incumbent, objective=incumbent_objective, integral=True,
+                   status='timeLimit' if timed_out else 'optimal')
+    if timed_out:
+        best_bound = min([incumbent_objective] + [entry[0] for entry in stack])
+        outcome['gap'] = (incumbent_objective - best_bound) / max(1.0, abs(incumbent_objective))
+    else:
+        outcome['gap'] = 0.0
+    return outcome
+
+
+_SCIPY_STATUS = {0: 'optimal', 1: 'timeLimit', 2: 'infeasible', 3: 'unbounded'}
+
+
+def _is_feasible(model: BasePlanModel, x) -> bool:
+    """检查解是否满足全部约束（相对容差）"""
+    x = np.asarray(x, dtype=float)
+    if x.shape != (len(model.c),) or not np.all(np.isfinite(x)) or np.any(x < -_INTEGER_TOLERANCE):
+        return False
+    if len(model.b_ub) and np.any(model.A_ub @ x > model.b_ub + _INTEGER_TOLERANCE * (1 + np.abs(model.b_ub))):
+        return False
+    if len(model.b_eq):
+        return bool(np.all(np.abs(model.A_eq @ x - model.b_eq) <= _INTEGER_TOLERANCE * (1 + np.abs(model.b_eq))))
+    return True
+
+
+def _solve_scipy(model: BasePlanModel, integer: bool, deadline: float) -> Dict[str, Any]:
+    """SciPy HiGHS：linprog 求LP松弛（含对偶值），milp 求整数解"""
+    res = linprog(model.c, A_ub=model.A_ub, b_ub=model.b_ub, A_eq=model.A_eq, b_eq=model.b_eq,
+                  bounds=(0, None), method='highs',
+                  options={'time_limit': max(deadline - time.monotonic(), 0.01)})
+    status = _SCIPY_STATUS.get(res.status, 'error')
+    if status == 'optimal':
+        relaxation = LPResult('optimal', res.x, float(res.fun),
+                              np.asarray(res.ineqlin.marginals), np.asarray(res.eqlin.marginals))
+    elif status == 'timeLimit':
+        # 超时时 HiGHS 返回的是中途的基解，只有满足全部约束时才作为可行解使用（没有对偶值）
+        if res.x is None or not _is_feasible(model, res.x):
+            raise PlannerTimeout()
+        relaxation = LPResult('timeLimit', res.x, float(res.fun))
+    else:
+        relaxation = LPResult(status)
+    outcome = {'relaxation': relaxation, 'x': relaxation.x, 'objective': relaxation.objective,
+               'status': status, 'integral': False, 'gap': None, 'nodes': 0}
+    if status != 'optimal' or not integer:
+        return outcome
+
+    integrality = np.zeros(len(model.c))
+    integrality[:model.n_recipes] = 1
+    res = milp(
+        model.c,
+        constraints=[LinearConstraint(model.A_ub, -np.inf, model.b_ub),
+                     LinearConstraint(model.A_eq, model.b_eq, model.b_eq)],
+        integrality=integrality,
+        bounds=Bounds(0, np.inf),
+        options={'time_limit': max(deadline - time.monotonic(), 0.01)}
+    )
+    outcome['nodes'] = getattr(res, 'mip_node_count', None) or 0
+    if res.x is None:
+        outcome['status'] = 'timeLimit' if res.status == 1 else _SCIPY_STATUS.get(res.status, 'error')
+        return outcome
+    outcome.update(x=res.x, objective=float(res.fun), integral=True,
+                   status='optimal' if res.status == 0 else 'timeLimit',
+                   gap=getattr(res, 'mip_gap', None))
+    return outcome
+
+
+def _describe_plan(model: BasePlanModel, outcome: Dict[str, Any]) -> Dict[str, Any]:
+    """把求解结果整理为建筑清单、材料流量与影子价格"""
+    x = outcome['x']
+    relaxation: LPResult = outcome['relaxation']
+
+    buildings = []
+    workers_used = [0.0] * len(WORKFORCE_TYPES)
+    slots_used = 0.0
+    workforce_cost = 0.0
+    produced = {m: 0.0 for m in model.material_ids}
+    consumed = {m: 0.0 for m in model.material_ids}
+    for j, recipe in enumerate(model.recipes):
+        count = float(x[j])
+        if count <= _INTEGER_TOLERANCE:
+            continue
+        if outcome['integral']:
+            count = float(round(count))
+        building = model.buildings[j]
+        output_id = recipe['output']['id']
+        produced[output_id] += model.output_rates[j] * count
+        for mat_id, rate in model.input_rates[j]:
+            consumed[mat_id] += rate * count
+        cost = model.workforce_cost[recipe.get('id')] * count
+        workforce_cost += cost
+        slots_used += count
+        for k, workers in enumerate(model._workers(building)):
+            workers_used[k] += workers * count
+        buildings.append({
+            'recipeId': recipe.get('id'),
+            'buildingId': building.get('id'),
+            'buildingName': get_building_name(building.get('id'), 'en'),
+            'buildingNameZh': get_building_name(building.get('id'), 'zh'),
+            'outputMaterialId': output_id,
+            'outputMaterialName': get_material_name(output_id, 'en'),
+            'outputMaterialNameZh': get_material_name(output_id, 'zh'),
+            'count': count,
+            'outputPerHour': model.output_rates[j] * count,
+            'workforceCostPerHour': cost
+        })
+
+    bought = {mat_id: float(x[model.buy_start + k]) for k, mat_id in enumerate(model.buy_ids)}
+    sold = {mat_id: float(x[model.sell_start + k]) for k, mat_id in enumerate(model.sell_ids)}
+    duals_eq = relaxation.duals_eq
+    materials = []
+    purchase_cost = 0.0
+    sales_revenue = 0.0
+    for i, mat_id in enumerate(model.material_ids):
+        buy = bought.get(mat_id, 0.0)
+        sell = sold.get(mat_id, 0.0)
+        target = model.targets.get(mat_id, 0.0)
+        if max(produced[mat_id], consumed[mat_id], buy, sell, target) <= _INTEGER_TOLERANCE:
+            continue
+        price = model.prices[mat_id]
+        purchase_cost += buy * (price or 0.0)
+        sales_revenue -= sell * model.c[model.sell_start + i]
+        materials.append({
+            'materialId': mat_id,
+            'materialName': get_material_name(mat_id, 'en'),
+            'materialNameZh': get_material_name(mat_id, 'zh'),
+            'targetPerHour': target,
+            'producedPerHour': produced[mat_id],
+            'consumedPerHour': consumed[mat_id],
+            'boughtPerHour': buy,
+            'soldPerHour': sell,
+            'unitPrice': price,
+            # 目标产出每增加1单位/小时，最优成本的变化
+            'shadowPrice': float(duals_eq[i]) if duals_eq is not None else None
+        })
+
+    duals_ub = relaxation.duals_ub
+    workforce_values = {}
+    for row, k in enumerate(model.workforce_rows, start=1):
+        workforce_values[WORKFORCE_TYPES[k]] = -float(duals_ub[row]) if duals_ub is not None else None
+
+    return {
+        'netProfitPerHour': -outcome['objective'],
+        'workforceCostPerHour': workforce_cost,
+        'purchaseCostPerHour': purchase_cost,
+        'salesRevenuePerHour': sales_revenue,
+        'slots': model.slots,
+        'slotsUsed': slots_used,
+        'workforceLimits': dict(zip(WORKFORCE_TYPES, model.workforce_limits)),
+        'workforceUsed': dict(zip(WORKFORCE_TYPES, workers_used)),
+        'buildings': buildings,
+        'materials': materials,
+        'shadowPrices': {
+            # 影子价格来自LP松弛：多1个槽位/1名劳动力每小时可增加的净收益
+            'slot': -float(duals_ub[0]) if duals_ub is not None else None,
+            'workforce': workforce_values
+        }
+    }
+
+
+def plan_base(
+    index,
+    material_prices: Dict[int, Dict[str, Any]],
+    targets: Dict[int, float],
+    slots: int,
+    workforce_limits: Optional[List[Optional[float]]] = None,
+    building_ids: Optional[set] = None,
+    allow_buy: bool = True,
+    sell_surplus: bool = True,
+    integer: bool = True,
+    fertility_abundance: float = 100.0,
+    total_population: int = 0,
+    include_workforce: bool = True,
+    timeout: float = 5.0
+) -> Dict[str, Any]:
+    """
+    求解基地规划
+
+    Args:
+        index: 游戏数据索引（GameDataIndex）
+        material_prices: 材料价格表
+        targets: 目标产出 {材料ID: 每小时数量}
+        slots: 可用建筑槽位
+        workforce_limits: 各类劳动力上限 [Worker, Technician, Engineer, Scientist]，None表示不限
+        building_ids: 允许使用的建筑ID，None表示全部
+        allow_buy: 是否允许从交易所购买材料
+        sell_surplus: 剩余产出是否按当前价格出售（否则只最小化成本）
+        integer: 建筑数量是否取整数
+        fertility_abundance: 肥力/丰度值（100为标准效率）
+        total_population: 总人口（劳动力扩张惩罚）
+        include_workforce: 是否计入劳动力成本
+        timeout: 求解时间上限（秒），超时返回当前最优可行解
+
+    Returns:
+        规划结果（status 为 optimal / timeLimit / infeasible / unbounded）
+    """
+    if not HAS_NUMPY:
+        raise Exception("Base planner requires numpy")
+
+    started = time.monotonic()
+    deadline = started + timeout
+    model = BasePlanModel(index, material_prices, targets, slots, workforce_limits, building_ids,
+                          allow_buy, sell_surplus, fertility_abundance, total_population, include_workforce)
+
+    solver = 'highs' if HAS_SCIPY else 'simplex'
+    try:
+        if len(model.c) == 0:
+            # 没有目标产出且不出售：空规划
+            empty = LPResult('optimal', np.zeros(0), 0.0, np.zeros(len(model.b_ub)), np.zeros(0))
+            outcome = {'relaxation': empty, 'x': empty.x, 'objective': 0.0,
+                       'status': 'optimal', 'integral': True, 'gap': 0.0, 'nodes': 0}
+        else:
+            outcome = (_solve_scipy if HAS_SCIPY else _solve_builtin)(model, integer, deadline)
+    except PlannerTimeout:
+        outcome = {'relaxation': LPResult('timeLimit'), 'x': None, 'objective': None,
+                   'status': 'timeLimit', 'integral': False, 'gap': None, 'nodes': 0}
+
+    result = {
+        'status': outcome['status'],
+        'solver': solver,
+        'integral': outcome['integral'],
+        'gap': outcome['gap'],
+        'nodes': outcome['nodes'],
+        'variables': len(model.c),
+        'constraints': len(model.b_eq) + len(model.b_ub)
+    }
+    # 超时未得到整数解时，退回LP松弛解
+    if outcome['x'] is None and outcome['relaxation'].x is not None:
+        outcome.update(x=outcome['relaxation'].x, objective=outcome['relaxation'].objective, integral=False)
+        result['integral'] = False
+    if outcome['x'] is not None:
+        result.update(_describe_plan(model, outcome))
+    result['solveTimeMs'] = (time.monotonic() - started) * 1000
+    return result
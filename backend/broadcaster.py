@@ -0,0 +1,202 @@
+"""
+GT2See 快照推送广播
+新的价格/详情快照发布时，向所有 SSE / WebSocket 客户端推送 "版本号 + 变化的 matId"：
+每条消息只编码一次，逐个放入客户端的有界队列；队列已满的慢客户端直接断开（客户端重连后用增量接口补齐），
+空闲客户端只占用一个队列和一个挂起的协程，心跳由单个后台任务统一发送
+"""
+import asyncio
+import json
+from typing import Dict, Any, Optional, Set
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from config import settings
+
+
+class Message:
+    """一条已编码的推送消息（SSE 文本与 WebSocket JSON 各编码一次）"""
+
+    __slots__ = ('event', 'sse', 'text')
+
+    def __init__(self, event: str, data: Optional[Dict[str, Any]] = None, sse: Optional[str] = None):
+        self.event = event
+        self.text = json.dumps({'event': event, **(data or {})}, separators=(',', ':'))
+        self.sse = sse if sse is not None else f"event: {event}\ndata: {self.text}\n\n"
+
+
+# 心跳：SSE 注释行（防止代理因空闲断开连接），WebSocket 由服务器自身的 ping 保活
+_HEARTBEAT = Message('heartbeat', sse=': keepalive\n\n')
+# 慢客户端被断开前收到的最后一条消息
+_OVERFLOW = Message('overflow', {'reason': 'slow consumer'})
+
+
+class Subscriber:
+    """一个客户端的有界消息队列"""
+
+    __slots__ = ('queue', 'closed')
+
+    def __init__(self, queue_size: int):
+        # 至少能容纳断开时的最后一条消息与结束标记
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(queue_size, 2))
+        self.closed = False
+
+    def close(self, final: Optional[Message] = None):
+        """清空队列并放入结束标记（队列中只剩可选的最后一条消息）"""
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        if final is not None:
+            self.queue.put_nowait(final)
+        self.queue.put_nowait(None)
+
+
+class Broadcaster:
+    """
+    单一广播器（只在事件循环中调用）
+
+    - publish 为每个客户端 put_nowait，不等待任何客户端
+    - 队列满的客户端收到 overflow 后断开
+    """
+
+    def __init__(self, queue_size: int = 16, max_subscribers: int = 10000, heartbeat_interval: float = 15.0):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.heartbeat_interval = heartbeat_interval
+        self._subscribers: Set[Subscriber] = set()
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.dropped = 0
+
+    @property
+    def full(self) -> bool:
+        """客户端数是否已达上限"""
+        return len(self._subscribers) >= self.max_subscribers
+
+    def subscribe(self) -> Optional[Subscriber]:
+        """注册新客户端，超过上限时返回None"""
+        if self.full:
+            return None
+        subscriber = Subscriber(self.queue_size)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        """注销客户端（可重复调用）"""
+        if subscriber in self._subscribers:
+            self._subscribers.discard(subscriber)
+            subscriber.close()
+
+    def _fan_out(self, message: Message):
+        slow = []
+        for subscriber in self._subscribers:
+            try:
+                subscriber.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                slow.append(subscriber)
+        for subscriber in slow:
+            self._subscribers.discard(subscriber)
+            subscriber.close(_OVERFLOW)
+            self.dropped += 1
+
+    def publish(self, event: str, data: Dict[str, Any]):
+        """
+        向所有客户端广播一条消息
+
+        Args:
+            event: 事件名称（如 'prices'、'details'）
+            data: 消息内容（会被编码一次后共享）
+        """
+        self.published += 1
+        if self._subscribers:
+            self._fan_out(Message(event, data))
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            if self._subscribers:
+                self._fan_out(_HEARTBEAT)
+
+    def start(self):
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat(), name='broadcaster_heartbeat')
+
+    async def stop(self):
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+        for subscriber in list(self._subscribers):
+            self.unsubscribe(subscriber)
+
+    async def stream_sse(self, hello: Message):
+        """
+        SSE 响应体：开始迭代时才注册客户端，先发送当前版本，然后逐条转发队列中的消息
+
+        响应未被迭代时不会注册；客户端断开时生成器被取消，finally 中注销
+        """
+        subscriber = self.subscribe()
+        if subscriber is None:
+            yield _OVERFLOW.sse
+            return
+        try:
+            yield 'retry: 5000\n' + hello.sse
+            while True:
+                message = await subscriber.queue.get()
+                if message is None:
+                    return
+                yield message.sse
+        finally:
+            self.unsubscribe(subscriber)
+
+    async def relay_websocket(self, websocket: WebSocket, subscriber: Subscriber, hello: Message):
+        """
+        WebSocket 转发：先发送当前版本，然后逐条转发队列中的消息（不处理客户端发来的内容）
+        """
+        async def _watch_disconnect():
+            try:
+                while True:
+                    if (await websocket.receive())['type'] == 'websocket.disconnect':
+                        break
+            except Exception:
+                pass
+            self.unsubscribe(subscriber)
+
+        watcher = asyncio.ensure_future(_watch_disconnect())
+        try:
+            await websocket.send_text(hello.text)
+            while True:
+                message = await subscriber.queue.get()
+                if message is None:
+                    break
+                if message is _HEARTBEAT:
+                    continue
+                await websocket.send_text(message.text)
+                if message is _OVERFLOW:
+                    # 1013: Try Again Later
+                    await websocket.close(code=1013)
+                    break
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            watcher.cancel()
+            self.unsubscribe(subscriber)
+
+    def get_stats(self) -> dict:
+        """获取广播统计信息"""
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "dropped": self.dropped,
+            "queue_size": self.queue_size
+        }
+
+
+# 全局广播器实例
+broadcaster = Broadcaster(
+    queue_size=settings.EVENT_QUEUE_SIZE,
+    max_subscribers=settings.MAX_EVENT_SUBSCRIBERS,
+    heartbeat_interval=settings.EVENT_HEARTBEAT_INTERVAL
+)
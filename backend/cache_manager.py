@@ -1,6 +1,95 @@
+import asyncio
+import functools
 import json
 import time
-from typing import Optional, Any, Dict
+from collections import OrderedDict
+from typing import Optional, Any, Awaitable, Callable, Dict, Hashable, List
+from config import settings
+
+
+class SingleFlight:
+    """
+    并发请求合并（single-flight）
+
+    同一个键同时只执行一次加载/计算，其余并发调用方等待同一个结果；
+    异常同样传递给所有等待者。加载在独立任务中运行，单个调用方被取消不影响其他等待者
+    """
+
+    def __init__(self, name: str = ''):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行 fn()，同一键已有进行中的调用时等待其结果
+
+        Args:
+            key: 合并键
+            fn: 返回协程的无参函数
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self.executions += 1
+            task.add_done_callback(functools.partial(self._finished, key))
+        else:
+            self.coalesced += 1
+        # shield: 单个请求被取消时不影响其他等待者
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 读取异常，避免所有等待者都已取消时出现 "exception was never retrieved"
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def get_stats(self) -> dict:
+        """获取合并统计信息"""
+        calls = self.executions + self.coalesced
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalesce_rate": (self.coalesced / calls) if calls > 0 else 0.0,
+            "errors": self.errors,
+            "in_flight": len(self._inflight)
+        }
+
+
+# 所有具名的 single-flight 实例（用于统计）
+_single_flights: List[SingleFlight] = []
+
+
+def single_flight(key: Optional[Callable[..., Hashable]] = None, name: Optional[str] = None):
+    """
+    single-flight 装饰器：并发调用同一参数的异步函数/方法时只执行一次
+
+    Args:
+        key: 由调用参数计算合并键的函数，默认使用全部参数（必须可哈希）
+        name: 统计名称，默认使用函数的限定名
+    """
+    def decorator(fn):
+        flight = SingleFlight(name or fn.__qualname__)
+        _single_flights.append(flight)
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            flight_key = key(*args, **kwargs) if key is not None else (args, tuple(sorted(kwargs.items())))
+            return await flight.do(flight_key, lambda: fn(*args, **kwargs))
+
+        wrapper.single_flight = flight
+        return wrapper
+    return decorator
+
+
+def single_flight_stats() -> dict:
+    """所有 single-flight 实例的统计信息"""
+    return {flight.name: flight.get_stats() for flight in _single_flights}
+
 
 class CacheManager:
     """简单的内存缓存管理器"""
@@ -47,6 +136,114 @@ class CacheManager:
             "expired_items": len(self.cache) - valid_items
         }
 
+class LRUResultCache:
+    """
+    计算结果缓存（LRU淘汰，按字节预算限制总大小）
+
+    缓存键应包含所依赖数据的版本号（价格表版本、游戏数据版本等），
+    数据更新后旧条目不会再被命中，并随LRU淘汰或 clear() 释放
+    """
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.cache: "OrderedDict[Hashable, tuple[Any, int]]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._flight = SingleFlight('result_cache')
+        _single_flights.append(self._flight)
+    
+    @staticmethod
+    def estimate_size(value: Any) -> int:
+        """估算缓存值大小（按JSON序列化后的字节数）"""
+        try:
+            return len(json.dumps(value, ensure_ascii=False, default=str).encode('utf-8'))
+        except Exception:
+            return 0
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """获取缓存数据（命中时移动到最近使用位置）"""
+        entry = self.cache.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.cache.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+    
+    def set(self, key: Hashable, value: Any, size: Optional[int] = None):
+        """设置缓存数据，超出字节预算时淘汰最久未使用的条目"""
+        if size is None:
+            size = self.estimate_size(value)
+        if size > self.max_bytes:
+            # 单个条目超过预算时不缓存
+            return
+        
+        self.delete(key)
+        self.cache[key] = (value, size)
+        self.total_bytes += size
+        
+        while self.total_bytes > self.max_bytes and self.cache:
+            _, (_, evicted_size) = self.cache.popitem(last=False)
+            self.total_bytes -= evicted_size
+            self.evictions += 1
+    
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+        size: Optional[Callable[[Any], int]] = None,
+        cacheable: Optional[Callable[[Any], bool]] = None
+    ) -> Any:
+        """
+        获取缓存结果，未命中时计算并缓存（并发未命中只计算一次，异常传递给所有等待者）
+
+        Args:
+            key: 缓存键
+            compute: 返回协程的无参计算函数
+            size: 由结果估算字节数的函数，默认按JSON序列化估算
+            cacheable: 判断结果是否可缓存的函数（如超时得到的非最优解），默认全部缓存
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        
+        async def load():
+            result = await compute()
+            if cacheable is None or cacheable(result):
+                self.set(key, result, size(result) if size is not None else None)
+            return result
+        
+        return await self._flight.do(key, load)
+    
+    def delete(self, key: Hashable):
+        """删除缓存数据"""
+        entry = self.cache.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
+    
+    def clear(self):
+        """清空所有缓存"""
+        self.cache.clear()
+        self.total_bytes = 0
+    
+    def get_stats(self) -> dict:
+        """获取缓存统计信息"""
+        lookups = self.hits + self.misses
+        return {
+            "items": len(self.cache),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups > 0 else 0.0,
+            "evictions": self.evictions
+        }
+
 # 全局缓存管理器实例
 cache_manager = CacheManager()
 
+# 全局计算结果缓存实例
+result_cache = LRUResultCache(settings.RESULT_CACHE_MAX_BYTES)
+
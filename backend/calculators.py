@@ -1,5 +1,45 @@
 from typing import Dict, List, Any, Optional
 from constants import get_material_type_name, get_material_name, get_building_name
+from price_table import is_valid_price
+from resource_index import ResourceIndex
+from spatial_index import SpatialIndex, ly_distance
+
+
+def execution_price(
+    mat_id: int,
+    amount: float,
+    material_prices: Dict[int, Dict[str, Any]],
+    depth_index=None
+) -> tuple:
+    """
+    材料的买入单价
+
+    默认取 currentPrice（最低卖价）；提供订单簿深度索引时取买入 amount 个单位的成交均价（VWAP），
+    没有该材料的订单簿数据时回退到 currentPrice
+
+    Args:
+        mat_id: 材料ID
+        amount: 买入数量（仅深度模式使用）
+        material_prices: 材料价格字典 {material_id: price_data}
+        depth_index: 订单簿深度索引（DepthIndex），None表示按 currentPrice 计价
+
+    Returns:
+        (单价, 价格是否可用, 是否因深度不足而不可用)
+    """
+    price_data = material_prices.get(mat_id, {})
+    current_price = price_data.get('currentPrice', 0)
+    price_is_valid = is_valid_price(current_price)
+    if depth_index is None or not price_is_valid:
+        return current_price, price_is_valid, False
+
+    depth = depth_index.get(mat_id)
+    if depth is None or not depth.prices:
+        return current_price, True, False
+    vwap = depth.vwap(amount)
+    if vwap is None:
+        return current_price, False, True
+    return vwap, True, False
+
 
 class BuildingCalculator:
     """建筑成本计算器"""
@@ -7,7 +47,9 @@ class BuildingCalculator:
     @staticmethod
     def calculate_building_cost(
         building: Dict[str, Any], 
-        material_prices: Dict[int, Dict[str, Any]]
+        material_prices: Dict[int, Dict[str, Any]],
+        depth_index=None,
+        quantity: int = 1
     ) -> Dict[str, Any]:
         """
         计算建筑建造成本
@@ -15,9 +57,11 @@ class BuildingCalculator:
         Args:
             building: 建筑数据
             material_prices: 材料价格字典 {material_id: price_data}
+            depth_index: 订单簿深度索引（DepthIndex），提供时按订单簿深度计价
+            quantity: 建造数量（深度模式下按 材料数量 × 建造数量 吃单计算成交均价）
         
         Returns:
-            成本详情
+            成本详情（每栋建筑的成本）
         """
         # 获取建造材料列表
         # 注意：'cost' 字段是整数（金钱成本），'constructionMaterials' 才是材料列表
@@ -37,27 +81,28 @@ class BuildingCalculator:
             # 字段可能是 'am' 或 'amount'（优先使用 'am'，这是官方API的标准字段）
             amount = material.get('am', material.get('amount', 0))
             
-            # 获取材料当前价格
-            price_data = material_prices.get(mat_id, {})
-            current_price = price_data.get('currentPrice', 0)
-            
-            # 检查价格是否可用（-1表示无订单，0可能表示无数据，None也表示无数据）
-            price_is_valid = current_price is not None and current_price > 0 and current_price != -1
+            # 获取材料单价（深度模式下为成交均价）
+            current_price, price_is_valid, insufficient_depth = execution_price(
+                mat_id, amount * quantity, material_prices, depth_index
+            )
             
             if not price_is_valid:
                 price_available = False
-                unavailable_materials.append({
+                unavailable = {
                     'materialId': mat_id,
                     'materialName': get_material_name(mat_id, 'en'),
                     'materialNameZh': get_material_name(mat_id, 'zh'),
-                })
+                }
+                if insufficient_depth:
+                    unavailable['insufficientDepth'] = True
+                unavailable_materials.append(unavailable)
                 # 对于无效价格，使用0作为占位符
                 current_price = 0
             
             material_cost = amount * current_price
             total_cost += material_cost
             
-            material_costs.append({
+            material_entry = {
                 'materialId': mat_id,
                 'materialName': get_material_name(mat_id, 'en'),
                 'materialNameZh': get_material_name(mat_id, 'zh'),
@@ -66,7 +111,11 @@ class BuildingCalculator:
                 'priceAvailable': price_is_valid,
                 'totalCost': material_cost,
                 'costPercentage': 0  # 稍后计算
-            })
+            }
+            if depth_index is not None:
+                material_entry['quotePrice'] = material_prices.get(mat_id, {}).get('currentPrice')
+                material_entry['executionQty'] = amount * quantity
+            material_costs.append(material_entry)
         
         # 计算每种材料的成本占比（仅当价格可用时）
         if total_cost > 0 and price_available:
@@ -77,7 +126,7 @@ class BuildingCalculator:
         building_name_en = building.get('sName') or building.get('name') or get_building_name(building_id, 'en')
         building_name_zh = building.get('name') or get_building_name(building_id, 'zh')
         
-        return {
+        result = {
             'buildingId': building_id,
             'buildingName': building_name_en,
             'buildingNameZh': building_name_zh,
@@ -86,6 +135,10 @@ class BuildingCalculator:
             'unavailableMaterials': unavailable_materials,
             'materialCosts': material_costs
         }
+        if depth_index is not None:
+            result['pricing'] = 'depth'
+            result['quantity'] = quantity
+        return result
 
 
 class RecipeCalculator:
@@ -95,7 +148,9 @@ class RecipeCalculator:
     def calculate_recipe_profit(
         recipe: Dict[str, Any],
         material_prices: Dict[int, Dict[str, Any]],
-        fertility_abundance_multiplier: float = 100.0
+        fertility_abundance_multiplier: float = 100.0,
+        depth_index=None,
+        runs: int = 1
     ) -> Dict[str, Any]:
         """
         计算配方收益
@@ -106,9 +161,11 @@ class RecipeCalculator:
             fertility_abundance_multiplier: 肥力/丰度值 (默认100，标准效率)
                 影响生产时间：实际时间 = 原时间 / (multiplier / 100)
                 例如：150表示1.5倍效率，生产时间为原来的67%
+            depth_index: 订单簿深度索引（DepthIndex），提供时输入材料按订单簿深度计价
+            runs: 生产轮数（深度模式下按 输入数量 × 轮数 吃单计算成交均价）
         
         Returns:
-            收益详情
+            收益详情（每轮的收益）
         """
         # 计算输入成本
         inputs = recipe.get('inputs', [])
@@ -126,25 +183,27 @@ class RecipeCalculator:
             mat_id = input_item.get('id')
             amount = input_item.get('am', 0)
             
-            price_data = material_prices.get(mat_id, {})
-            current_price = price_data.get('currentPrice', 0)
-            
-            # 检查价格是否可用
-            price_is_valid = current_price is not None and current_price > 0 and current_price != -1
+            # 获取输入材料单价（深度模式下为成交均价）
+            current_price, price_is_valid, insufficient_depth = execution_price(
+                mat_id, amount * runs, material_prices, depth_index
+            )
             
             if not price_is_valid:
                 price_available = False
-                unavailable_materials.append({
+                unavailable = {
                     'materialId': mat_id,
                     'materialName': get_material_name(mat_id, 'en'),
                     'materialNameZh': get_material_name(mat_id, 'zh'),
-                })
+                }
+                if insufficient_depth:
+                    unavailable['insufficientDepth'] = True
+                unavailable_materials.append(unavailable)
                 current_price = 0
             
             cost = amount * current_price
             input_cost += cost
             
-            input_details.append({
+            input_detail = {
                 'materialId': mat_id,
                 'materialName': get_material_name(mat_id, 'en'),
                 'materialNameZh': get_material_name(mat_id, 'zh'),
@@ -152,9 +211,13 @@ class RecipeCalculator:
                 'unitPrice': current_price,
                 'priceAvailable': price_is_valid,
                 'totalCost': cost
-            })
+            }
+            if depth_index is not None:
+                input_detail['quotePrice'] = material_prices.get(mat_id, {}).get('currentPrice')
+                input_detail['executionQty'] = amount * runs
+            input_details.append(input_detail)
         
-        # 计算输出价值
+        # 计算输出价值（订单簿只有卖单，没有买单深度可用，产出始终按 currentPrice 估值）
         output = recipe.get('output', {})
         
         # 确保 output 是字典
@@ -219,7 +282,7 @@ class RecipeCalculator:
             first_input_name_zh = get_material_name(first_input_id, 'zh')
         recipe_name = f"{output_name_zh}({first_input_name_zh})" if first_input_name_zh else output_name_zh
         
-        return {
+        result = {
             'recipeId': recipe_id,
             'recipeName': recipe_name,
             'buildingId': building_id,
@@ -245,6 +308,10 @@ class RecipeCalculator:
                 'totalValue': output_value if price_available else None
             }
         }
+        if depth_index is not None:
+            result['pricing'] = 'depth'
+            result['runs'] = runs
+        return result
     
     @staticmethod
     def calculate_multiple_recipes(
@@ -281,20 +348,34 @@ class RecipeCalculator:
             )
             results.append(profit_data)
         
-        # 排序（None值排在最后，有效值按降序排列）
-        if sort_by == 'roi':
-            # ROI排序：None值排最后，有效值降序
-            results.sort(key=lambda x: (x['roi'] is None, -(x['roi'] if x['roi'] is not None else 0)))
-        elif sort_by == 'profitPerHour':
-            # 每小时收益排序：None值排最后，有效值降序
-            results.sort(key=lambda x: (x['profitPerHour'] is None, -(x['profitPerHour'] if x['profitPerHour'] is not None else 0)))
-        elif sort_by == 'totalProfit':
-            # 总收益排序：None值排最后，有效值降序
-            results.sort(key=lambda x: (x['totalProfit'] is None, -(x['totalProfit'] if x['totalProfit'] is not None else 0)))
-        else:
-            # 其他字段排序：None值排最后，有效值降序
-            results.sort(key=lambda x: (x.get(sort_by) is None, -(x.get(sort_by) if x.get(sort_by) is not None else 0)))
+        return RecipeCalculator.sort_results(results, sort_by)
+    
+    @staticmethod
+    def sort_key(sort_by: str):
+        """
+        获取排序键函数（None值排在最后，有效值按降序排列）
+        
+        Args:
+            sort_by: 排序依据 ('totalProfit', 'profitPerHour', 'roi' 或其他字段)
+        
+        Returns:
+            可用于 sort/sorted 的键函数
+        """
+        return lambda x: (x.get(sort_by) is None, -(x.get(sort_by) if x.get(sort_by) is not None else 0))
+    
+    @staticmethod
+    def sort_results(results: List[Dict[str, Any]], sort_by: str) -> List[Dict[str, Any]]:
+        """
+        对收益列表原地排序（稳定排序，相同值保持原有顺序）
+        
+        Args:
+            results: 收益列表
+            sort_by: 排序依据
         
+        Returns:
+            排序后的收益列表
+        """
+        results.sort(key=RecipeCalculator.sort_key(sort_by))
         return results
 
 
@@ -305,7 +386,9 @@ class SystemAnalyzer:
     def analyze_system_resources(
         systems: List[Dict[str, Any]], 
         exchange_x: float = 3334.0, 
-        exchange_y: float = 1425.0
+        exchange_y: float = 1425.0,
+        max_distance: Optional[float] = None,
+        spatial_index: Optional[SpatialIndex] = None
     ) -> List[Dict[str, Any]]:
         """
         分析星系资源分布
@@ -313,12 +396,23 @@ class SystemAnalyzer:
         Args:
             systems: 星系数据列表
             exchange_x, exchange_y: 交易所坐标（默认3334.0, 1425.0）
+            max_distance: 最大距离（光年），None表示不限制
+            spatial_index: 与 systems 对应的空间索引（提供时只访问查询圆覆盖的网格）
         
         Returns:
             星系资源分析结果，包含到交易所的距离
         """
         results = []
         
+        if max_distance is not None:
+            if spatial_index is not None:
+                systems = [systems[position] for position, _ in spatial_index.within(exchange_x, exchange_y, max_distance)]
+            else:
+                systems = [
+                    s for s in systems
+                    if SystemAnalyzer.calculate_distance(exchange_x, exchange_y, s.get('x', 0.0), s.get('y', 0.0)) <= max_distance
+                ]
+        
         for system in systems:
             planets = system.get('planets', []) or []
             
@@ -387,8 +481,7 @@ class SystemAnalyzer:
         Returns:
             距离（光年，欧几里得距离除以50）
         """
-        euclidean_distance = ((x2 - x1) ** 2 + (y2 - y1) ** 2) ** 0.5
-        return euclidean_distance / 50.0
+        return ly_distance(x1, y1, x2, y2)
     
     @staticmethod
     def advanced_system_search(
@@ -397,7 +490,10 @@ class SystemAnalyzer:
         exchange_y: float = 0.0,
         max_distance: Optional[float] = None,
         material_filters: Optional[List[Dict[str, Any]]] = None,
-        min_fertility: Optional[float] = None
+        min_fertility: Optional[float] = None,
+        resource_index: Optional[ResourceIndex] = None,
+        spatial_index: Optional[SpatialIndex] = None,
+        route_distances: Optional[Dict[Any, float]] = None
     ) -> List[Dict[str, Any]]:
         """
         高级星系搜索
@@ -408,10 +504,20 @@ class SystemAnalyzer:
             max_distance: 最大距离（光年），None表示不限制
             material_filters: 材料筛选条件列表，每个包含 materialId 和 minAbundance
             min_fertility: 最小肥力阈值，None表示不限制
+            resource_index: 与 systems 对应的资源倒排索引（提供时只访问候选星系）
+            spatial_index: 与 systems 对应的空间索引（与 resource_index 一起提供时用于距离筛选）
+            route_distances: {星系ID: 到交易所的航线距离}，提供时 max_distance 与排序改用航线距离，
+                             并跳过不可达的星系
         
         Returns:
-            符合条件的星系列表，包含距离信息
+            符合条件的星系列表，包含距离信息（按航线距离时另含 routeDistance）
         """
+        if resource_index is not None:
+            return SystemAnalyzer._indexed_system_search(
+                resource_index, exchange_x, exchange_y, max_distance, material_filters, min_fertility,
+                spatial_index, route_distances
+            )
+        
         results = []
         
         for system in systems:
@@ -423,8 +529,15 @@ class SystemAnalyzer:
                 exchange_x, exchange_y, system_x, system_y
             )
             
-            # 距离筛选
-            if max_distance is not None and distance > max_distance:
+            # 距离筛选（按航线距离时不可达的星系跳过）
+            route_distance = None
+            if route_distances is not None:
+                route_distance = route_distances.get(system.get('id'))
+                if route_distance is None:
+                    continue
+                if max_distance is not None and route_distance > max_distance:
+                    continue
+            elif max_distance is not None and distance > max_distance:
                 continue
             
             planets = system.get('planets', []) or []
@@ -506,7 +619,7 @@ class SystemAnalyzer:
                     if abundance > resource_summary[mat_id]['maxAbundance']:
                         resource_summary[mat_id]['maxAbundance'] = abundance
             
-            results.append({
+            result = {
                 'systemId': system.get('id'),
                 'systemName': system.get('name'),
                 'x': system_x,
@@ -515,17 +628,109 @@ class SystemAnalyzer:
                 'planetCount': len(planets),
                 'maxFertility': max_fertility,
                 'resources': list(resource_summary.values())
-            })
+            }
+            if route_distance is not None:
+                result['routeDistance'] = route_distance
+            results.append(result)
         
         # 按距离排序
-        results.sort(key=lambda x: x['distanceToExchange'])
+        SystemAnalyzer._sort_by_distance(results, route_distances is not None)
+        
+        return results
+    
+    @staticmethod
+    def _sort_by_distance(results: List[Dict[str, Any]], by_route: bool = False):
+        """按到交易所的直线距离（或航线距离）稳定排序"""
+        if by_route:
+            results.sort(key=lambda x: x['routeDistance'])
+        else:
+            results.sort(key=lambda x: x['distanceToExchange'])
+    
+    @staticmethod
+    def _indexed_system_search(
+        resource_index: ResourceIndex,
+        exchange_x: float,
+        exchange_y: float,
+        max_distance: Optional[float],
+        material_filters: Optional[List[Dict[str, Any]]],
+        min_fertility: Optional[float],
+        spatial_index: Optional[SpatialIndex] = None,
+        route_distances: Optional[Dict[Any, float]] = None
+    ) -> List[Dict[str, Any]]:
+        """基于倒排索引（及空间索引）的高级星系搜索（结果与逐星系扫描一致）"""
+        candidates = resource_index.search(material_filters, min_fertility)
+        
+        if route_distances is not None:
+            # 航线距离不能用空间网格筛选，只遍历候选星系
+            if candidates is None:
+                positions = [s.position for s in resource_index.summaries if s.planets]
+            else:
+                positions = sorted(candidates)
+            located = []
+            for position in positions:
+                system = resource_index.summaries[position].system
+                route_distance = route_distances.get(system.get('id'))
+                if route_distance is None or (max_distance is not None and route_distance > max_distance):
+                    continue
+                distance = SystemAnalyzer.calculate_distance(
+                    exchange_x, exchange_y, system.get('x', 0.0), system.get('y', 0.0)
+                )
+                located.append((position, distance))
+        elif max_distance is not None and spatial_index is not None:
+            # 距离筛选只访问查询圆覆盖的网格单元
+            located = []
+            for position, distance in spatial_index.within(exchange_x, exchange_y, max_distance):
+                if candidates is None:
+                    if resource_index.summaries[position].planets:
+                        located.append((position, distance))
+                elif position in candidates:
+                    located.append((position, distance))
+        else:
+            if candidates is None:
+                positions = [s.position for s in resource_index.summaries if s.planets]
+            else:
+                positions = sorted(candidates)
+            located = []
+            for position in positions:
+                system = resource_index.summaries[position].system
+                distance = SystemAnalyzer.calculate_distance(
+                    exchange_x, exchange_y, system.get('x', 0.0), system.get('y', 0.0)
+                )
+                if max_distance is not None and distance > max_distance:
+                    continue
+                located.append((position, distance))
+        
+        results = []
+        for position, distance in located:
+            summary = resource_index.summaries[position]
+            system = summary.system
+            system_x = system.get('x', 0.0)
+            system_y = system.get('y', 0.0)
+            
+            result = {
+                'systemId': system.get('id'),
+                'systemName': system.get('name'),
+                'x': system_x,
+                'y': system_y,
+                'distanceToExchange': distance,
+                'planetCount': len(summary.planets),
+                'maxFertility': summary.max_fertility,
+                'resources': summary.resources
+            }
+            if route_distances is not None:
+                result['routeDistance'] = route_distances[system.get('id')]
+            results.append(result)
+        
+        # 按距离排序
+        SystemAnalyzer._sort_by_distance(results, route_distances is not None)
         
         return results
     
     @staticmethod
     def find_best_location_for_material(
         systems: List[Dict[str, Any]],
-        material_id: int
+        material_id: int,
+        resource_index: Optional[ResourceIndex] = None
     ) -> List[Dict[str, Any]]:
         """
         为特定材料找最佳生产位置
@@ -533,10 +738,26 @@ class SystemAnalyzer:
         Args:
             systems: 星系数据列表
             material_id: 材料ID
+            resource_index: 与 systems 对应的资源倒排索引（提供时直接读取预汇总结果）
         
         Returns:
             按资源丰富度排序的星系列表
         """
+        if resource_index is not None:
+            return [
+                {
+                    'systemId': resource_index.summaries[location['position']].system.get('id'),
+                    'systemName': resource_index.summaries[location['position']].system.get('name'),
+                    'materialId': material_id,
+                    'materialName': get_material_name(material_id, 'en'),
+                    'materialNameZh': get_material_name(material_id, 'zh'),
+                    'totalAbundance': location['totalAbundance'],
+                    'planetCount': location['planetCount'],
+                    'avgAbundance': location['totalAbundance'] / location['planetCount'] if location['planetCount'] > 0 else 0
+                }
+                for location in resource_index.best_locations(material_id)
+            ]
+        
         results = []
         
         for system in systems:
@@ -19,6 +19,21 @@ class Settings(BaseSettings):
     # 缓存配置
     CACHE_STATIC_DATA_TTL: int = 3600 * 24  # 静态数据缓存24小时
     CACHE_PRICE_DATA_TTL: int = 60  # 价格数据缓存60秒
+    RESULT_CACHE_MAX_BYTES: int = 32 * 1024 * 1024  # 计算结果缓存上限32MB
+    NEIGHBOR_GRAPH_CACHE_SIZE: int = 8  # 按跳跃半径缓存的相邻关系图数量
+    MAX_NEIGHBOR_RADIUS: float = 20.0  # 按需生成相邻关系图的最大半径（光年）
+    MAX_COORDINATE: float = 100000.0  # 坐标查询参数的绝对值上限（星系坐标约在 0~7500 范围内）
+    MAX_CLUSTER_HOPS: int = 20  # 多跳邻域搜索的最大跳数
+    MAX_CLUSTER_NODES: int = 1000  # 多跳邻域搜索最多返回的星系数
+    PLANNER_TIMEOUT: float = 5.0  # 基地规划默认求解时间上限（秒）
+    MAX_PLANNER_TIMEOUT: float = 30.0  # 基地规划求解时间上限的最大值（秒）
+    PRICE_HISTORY_RETENTION_DAYS: int = 180  # 价格历史保留天数
+    PRICE_HISTORY_COMPACT_INTERVAL: int = 3600 * 24  # 价格历史清理与空间回收间隔（秒）
+    MAX_HISTORY_MATERIALS: int = 200  # 价格历史单次查询的最大材料数
+    SNAPSHOT_DELTA_MAX_VERSIONS: int = 288  # 增量接口保留的快照版本数（按5分钟备份约24小时）
+    EVENT_QUEUE_SIZE: int = 16  # 推送通道每个客户端的消息队列长度（满时断开该客户端）
+    MAX_EVENT_SUBSCRIBERS: int = 10000  # 推送通道最大客户端数
+    EVENT_HEARTBEAT_INTERVAL: float = 15.0  # SSE 心跳间隔（秒）
     
     # CORS配置
     # 默认允许本地开发环境和 GitHub Pages 部署
@@ -0,0 +1,148 @@
+"""
+GT2See 响应数据增强
+为游戏数据/交易所数据附加中英文名称，每个数据版本只构建一次增强视图；
+增强结果均为新对象，不修改共享快照
+"""
+from typing import Dict, Any, List, Optional, Tuple
+
+from constants import get_material_type_name, get_recipe_type_name, get_material_name
+
+
+def _with_material_names(item: Dict[str, Any], key: str = 'id',
+                         zh_field: str = 'name', en_field: str = 'nameEn') -> Dict[str, Any]:
+    """返回附加了材料中英文名称的副本（ID为空时原样复制）"""
+    mat_id = item.get(key)
+    if not mat_id:
+        return dict(item)
+    return {
+        **item,
+        zh_field: get_material_name(mat_id, 'zh'),
+        en_field: get_material_name(mat_id, 'en'),
+    }
+
+
+def enrich_material(material: Dict[str, Any]) -> Dict[str, Any]:
+    """材料：附加类型名称"""
+    material_type = material.get('type')
+    if not material_type:
+        return material
+    return {
+        **material,
+        'typeName': get_material_type_name(material_type, 'zh'),
+        'typeNameEn': get_material_type_name(material_type, 'en'),
+    }
+
+
+def enrich_building(building: Dict[str, Any]) -> Dict[str, Any]:
+    """建筑：为 constructionMaterials 附加材料名称"""
+    construction_materials = building.get('constructionMaterials', [])
+    if not isinstance(construction_materials, list):
+        return building
+    return {
+        **building,
+        'constructionMaterials': [_with_material_names(m) for m in construction_materials],
+    }
+
+
+def enrich_recipe(recipe: Dict[str, Any]) -> Dict[str, Any]:
+    """配方：附加类型名称及输入/输出材料名称"""
+    enriched = dict(recipe)
+    recipe_type = recipe.get('type')
+    if recipe_type:
+        enriched['typeName'] = get_recipe_type_name(recipe_type, 'zh')
+        enriched['typeNameEn'] = get_recipe_type_name(recipe_type, 'en')
+
+    inputs = recipe.get('inputs', [])
+    if inputs:
+        enriched['inputs'] = [_with_material_names(item) for item in inputs]
+
+    output = recipe.get('output', {})
+    if output:
+        enriched['output'] = _with_material_names(output)
+    return enriched
+
+
+def enrich_system(system: Dict[str, Any]) -> Dict[str, Any]:
+    """星系：为每个行星的资源附加材料名称"""
+    planets = system.get('planets', []) or []
+    if not planets:
+        return system
+    return {
+        **system,
+        'planets': [
+            {**planet, 'mats': [_with_material_names(mat) for mat in planet.get('mats', [])]}
+            if planet.get('mats') else planet
+            for planet in planets
+        ],
+    }
+
+
+def enrich_exchange_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """交易所价格/详情记录：附加 matNameZh / matNameEn"""
+    if not isinstance(record, dict):
+        return record
+    return _with_material_names(record, 'matId', 'matNameZh', 'matNameEn')
+
+
+def enrich_exchange_payload(payload: Any, list_key: str) -> Any:
+    """
+    交易所数据：支持 {list_key: [...]}、列表、单条记录三种形态
+
+    Args:
+        payload: 原始数据
+        list_key: 全量数据中的列表字段（'prices' 或 'materials'）
+    """
+    if isinstance(payload, dict) and list_key in payload:
+        return {**payload, list_key: [enrich_exchange_record(r) for r in payload[list_key]]}
+    if isinstance(payload, list):
+        return [enrich_exchange_record(r) for r in payload]
+    if isinstance(payload, dict) and 'matId' in payload:
+        return enrich_exchange_record(payload)
+    return payload
+
+
+class EnrichedGameData:
+    """一个游戏数据版本的增强视图"""
+
+    def __init__(self, index):
+        self.version = index.version
+        self.materials: List[Dict[str, Any]] = [enrich_material(m) for m in index.materials]
+        self.buildings: List[Dict[str, Any]] = [enrich_building(b) for b in index.buildings]
+        self.recipes: List[Dict[str, Any]] = [enrich_recipe(r) for r in index.recipes]
+        self.systems: List[Dict[str, Any]] = [enrich_system(s) for s in index.systems]
+        self.buildings_by_id: Dict[int, Dict[str, Any]] = {b.get('id'): b for b in self.buildings}
+
+
+class EnrichmentLayer:
+    """按数据版本缓存增强视图（每种视图只保留最新版本）"""
+
+    def __init__(self):
+        self._game_view: Optional[EnrichedGameData] = None
+        self._exchange_views: Dict[str, Tuple[Any, Any]] = {}
+
+    def game_data(self, index) -> EnrichedGameData:
+        """获取游戏数据索引对应的增强视图"""
+        if self._game_view is None or self._game_view.version != index.version:
+            self._game_view = EnrichedGameData(index)
+        return self._game_view
+
+    def exchange(self, name: str, version: Any, payload: Any, list_key: str) -> Any:
+        """
+        获取交易所数据的增强视图
+
+        Args:
+            name: 视图名称
+            version: 数据版本（应同时包含游戏数据版本，名称映射随其变化）
+            payload: 原始数据
+            list_key: 全量数据中的列表字段
+        """
+        cached = self._exchange_views.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        view = enrich_exchange_payload(payload, list_key)
+        self._exchange_views[name] = (version, view)
+        return view
+
+
+# 全局增强视图实例
+enrichment = EnrichmentLayer()
@@ -1,9 +1,14 @@
 import httpx
-import json
 import os
 from typing import Optional, List, Dict, Any
 from config import settings
 from cache_manager import cache_manager
+from snapshot import SnapshotLoader
+from price_table import PriceTable
+from order_book import DepthIndex, ExchangeDetailsIndex
+from jsonl_index import JsonlOffsetIndex
+from snapshot_delta import SnapshotChangeLog
+from backup_service import backup_service
 
 class ExchangeAPI:
     """交易所API客户端"""
@@ -15,33 +20,51 @@ class ExchangeAPI:
         self.backup_prices = os.path.join(self.data_dir, 'exchange_prices_backup.json')
         self.backup_details_all = os.path.join(self.data_dir, 'exchange_details_all_backup.json')
         self.backup_details_jsonl = os.path.join(self.data_dir, 'exchange_details_backup.jsonl')
+        self._prices_loader = SnapshotLoader(self.backup_prices, builder=PriceTable.build)
+        self._details_loader = SnapshotLoader(self.backup_details_all, builder=ExchangeDetailsIndex.build)
+        self._details_jsonl_index = JsonlOffsetIndex(self.backup_details_jsonl, key='matId')
+        # 价格/详情快照的变更日志（每个新快照比较一次）
+        self.price_changes = SnapshotChangeLog('prices', max_versions=settings.SNAPSHOT_DELTA_MAX_VERSIONS)
+        self.details_changes = SnapshotChangeLog('materials', max_versions=settings.SNAPSHOT_DELTA_MAX_VERSIONS)
 
-    def _read_json(self, path: str) -> Optional[Dict[str, Any]]:
-        try:
-            if os.path.exists(path):
-                with open(path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-        except Exception:
-            return None
-        return None
+    async def get_price_table(self) -> PriceTable:
+        """获取当前价格备份版本对应的价格表（每个版本只构建一次）"""
+        snapshot = await self._prices_loader.get()
+        if snapshot is None:
+            raise Exception("本地备份缺失：exchange prices 未找到所需数据")
+        return snapshot.index
 
-    def _read_jsonl_find(self, path: str, mat_id: int) -> Optional[Dict[str, Any]]:
-        try:
-            if os.path.exists(path):
-                with open(path, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line:
-                            continue
-                        try:
-                            obj = json.loads(line)
-                            if isinstance(obj, dict) and obj.get('matId') == mat_id:
-                                return obj
-                        except Exception:
-                            continue
-        except Exception:
-            return None
-        return None
+    async def get_depth_index(self) -> DepthIndex:
+        """获取当前详情备份版本对应的订单簿深度索引（每个版本只构建一次）"""
+        snapshot = await self._details_loader.get()
+        if snapshot is None:
+            raise Exception("本地备份缺失：exchange details 未找到所需数据")
+        return snapshot.index.depth
+
+    async def get_price_changes(self) -> SnapshotChangeLog:
+        """获取已与当前价格备份版本同步的价格变更日志"""
+        snapshot = await self._prices_loader.get()
+        if snapshot is None:
+            raise Exception("本地备份缺失：exchange prices 未找到所需数据")
+        self.price_changes.ingest(snapshot.data, snapshot.version)
+        return self.price_changes
+
+    async def get_details_changes(self) -> SnapshotChangeLog:
+        """获取已与当前详情备份版本同步的详情变更日志"""
+        snapshot = await self._details_loader.get()
+        if snapshot is None:
+            raise Exception("本地备份缺失：exchange details 未找到所需数据")
+        self.details_changes.ingest(snapshot.data, snapshot.version)
+        return self.details_changes
+
+    def on_backup_written(self, source: str, payload: Any):
+        """备份服务写入新文件后的回调：直接采用内存中的数据构建新价格表/深度索引，并记录变更"""
+        if source == 'exchange_prices' and isinstance(payload, (dict, list)):
+            snapshot = self._prices_loader.adopt(payload)
+            self.price_changes.ingest(snapshot.data, snapshot.version)
+        elif source == 'exchange_details_all' and isinstance(payload, (dict, list)):
+            snapshot = self._details_loader.adopt(payload)
+            self.details_changes.ingest(snapshot.data, snapshot.version)
 
     async def get_material_prices(self, mat_id: Optional[int] = None) -> Dict[str, Any]:
         """
@@ -58,21 +81,14 @@ class ExchangeAPI:
             cache_key = f'exchange:price:{mat_id}'
             url = f"{self.base_url}/mat-prices/{mat_id}"
         
-        # 优先读取本地备份
-        if mat_id is None:
-            local = self._read_json(self.backup_prices)
-            if local is not None:
-                cache_manager.set(cache_key, local, settings.CACHE_PRICE_DATA_TTL)
-                return local
-        else:
-            all_prices = self._read_json(self.backup_prices)
-            if all_prices:
-                arr = all_prices.get('prices') if isinstance(all_prices, dict) else all_prices
-                if isinstance(arr, list):
-                    found = next((p for p in arr if isinstance(p, dict) and p.get('matId') == mat_id), None)
-                    if found is not None:
-                        cache_manager.set(cache_key, found, settings.CACHE_PRICE_DATA_TTL)
-                        return found
+        # 优先读取本地备份快照
+        snapshot = await self._prices_loader.get()
+        if snapshot is not None:
+            if mat_id is None:
+                return snapshot.data
+            found = snapshot.index.get(mat_id)
+            if found is not None:
+                return found
 
         # 尝试从缓存获取（仅缓存/本地，不再访问官方API）
         cached_data = cache_manager.get(cache_key)
@@ -96,26 +112,19 @@ class ExchangeAPI:
             cache_key = f'exchange:details:{mat_id}'
             url = f"{self.base_url}/mat-details/{mat_id}"
         
-        # 优先读取本地备份
-        if mat_id is None:
-            local = self._read_json(self.backup_details_all)
-            if local is not None:
-                cache_manager.set(cache_key, local, settings.CACHE_PRICE_DATA_TTL)
-                return local
-        else:
-            # 先从全量备份中查找
-            details_all = self._read_json(self.backup_details_all)
-            if details_all and isinstance(details_all, dict):
-                mats = details_all.get('materials')
-                if isinstance(mats, list):
-                    found = next((m for m in mats if isinstance(m, dict) and m.get('matId') == mat_id), None)
-                    if found is not None:
-                        cache_manager.set(cache_key, found, settings.CACHE_PRICE_DATA_TTL)
-                        return found
-            # 再从jsonl兜底
-            found_line = self._read_jsonl_find(self.backup_details_jsonl, mat_id)
+        # 优先读取本地全量备份快照（按 matId 建立索引，每个版本只解析一次）
+        snapshot = await self._details_loader.get()
+        if snapshot is not None:
+            if mat_id is None:
+                return snapshot.data
+            found = snapshot.index.get(mat_id)
+            if found is not None:
+                return found
+
+        # 再从jsonl兜底（字节偏移索引，单条记录一次 seek）
+        if mat_id is not None:
+            found_line = self._details_jsonl_index.get(mat_id)
             if found_line is not None:
-                cache_manager.set(cache_key, found_line, settings.CACHE_PRICE_DATA_TTL)
                 return found_line
 
         # 尝试从缓存获取（仅缓存/本地，不再访问官方API）
@@ -127,4 +136,5 @@ class ExchangeAPI:
 
 # 全局API客户端实例
 exchange_api = ExchangeAPI()
+backup_service.add_listener(exchange_api.on_backup_written)
 
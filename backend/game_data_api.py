@@ -1,9 +1,17 @@
+import asyncio
 import httpx
 import os
 import json
 from typing import Dict, Any, List, Optional
 from config import settings
-from cache_manager import cache_manager
+from cache_manager import single_flight
+from snapshot import Snapshot, SnapshotLoader
+from backup_service import backup_service
+from game_data_model import GameDataIndex
+from neighbor_graph import (
+    DEFAULT_NEIGHBOR_DISTANCE, NeighborGraph, NeighborGraphCache, build_neighbor_graph, load_neighbor_graph
+)
+from spatial_index import SpatialIndex
 from constants import update_material_cache, update_building_cache, update_recipe_cache
 
 class GameDataAPI:
@@ -16,47 +24,49 @@ class GameDataAPI:
         self.data_dir = os.path.join(os.path.dirname(__file__), 'data')
         self.backup_game_data = os.path.join(self.data_dir, 'game_data_backup.json')
         self.system_neighbors_path = os.path.join(self.data_dir, 'systems', 'system_neighbors.json')
-        self._system_neighbors_cache = None
+        self._neighbor_graph: Optional[NeighborGraph] = None
+        self._generated_graphs = NeighborGraphCache(settings.NEIGHBOR_GRAPH_CACHE_SIZE)
+        self._loader = SnapshotLoader(self.backup_game_data, builder=GameDataIndex.build)
+        self._names_version = 0
     
+    async def get_snapshot(self) -> Snapshot:
+        """获取当前游戏数据快照（带版本号，只读）"""
+        snapshot = await self._loader.get()
+        if snapshot is None:
+            # 不再访问官方API：仅允许从本地备份或已有快照获取
+            raise Exception("本地备份缺失：game data 未找到所需数据")
+
+        if snapshot.version != self._names_version:
+            self._initialize_name_caches(snapshot.data)
+            self._names_version = snapshot.version
+        return snapshot
+
     async def get_game_data(self) -> Dict[str, Any]:
-        """获取完整的游戏数据"""
-        cache_key = 'gamedata:full'
+        """获取完整的游戏数据（共享快照，调用方不得修改）"""
+        snapshot = await self.get_snapshot()
+        return snapshot.data
 
-        # 优先读取本地备份
-        try:
-            if os.path.exists(self.backup_game_data):
-                with open(self.backup_game_data, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                cache_manager.set(cache_key, data, settings.CACHE_STATIC_DATA_TTL)
-                if not self._cache_initialized:
-                    self._initialize_name_caches(data)
-                return data
-        except Exception:
-            pass
+    async def get_index(self) -> GameDataIndex:
+        """获取当前快照对应的游戏数据索引"""
+        snapshot = await self.get_snapshot()
+        return snapshot.index
+
+    def on_backup_written(self, source: str, payload: Any):
+        """备份服务写入新文件后的回调：直接采用内存中的数据，无需重新解析"""
+        if source == 'game_data' and isinstance(payload, dict):
+            self._loader.adopt(payload)
 
-        # 尝试从缓存获取
-        cached_data = cache_manager.get(cache_key)
-        if cached_data is not None:
-            # 如果还没初始化名称缓存，现在初始化
-            if not self._cache_initialized:
-                self._initialize_name_caches(cached_data)
-            return cached_data
-        
-        # 不再访问官方API：仅允许从本地备份或已有缓存获取
-        raise Exception("本地备份缺失：game data 未找到所需数据")
-    
     def _initialize_name_caches(self, game_data: Dict[str, Any]):
-        """初始化名称缓存"""
-        if not self._cache_initialized:
-            materials = game_data.get('materials', [])
-            buildings = game_data.get('buildings', [])
-            recipes = game_data.get('recipes', [])
-            
-            update_material_cache(materials)
-            update_building_cache(buildings)
-            update_recipe_cache(recipes)
-            
-            self._cache_initialized = True
+        """初始化名称缓存（每个快照版本刷新一次）"""
+        materials = game_data.get('materials', [])
+        buildings = game_data.get('buildings', [])
+        recipes = game_data.get('recipes', [])
+        
+        update_material_cache(materials)
+        update_building_cache(buildings)
+        update_recipe_cache(recipes)
+        
+        self._cache_initialized = True
     
     async def get_materials(self) -> List[Dict[str, Any]]:
         """获取材料列表"""
@@ -80,43 +90,67 @@ class GameDataAPI:
     
     async def get_material_by_id(self, material_id: int) -> Optional[Dict[str, Any]]:
         """根据ID获取材料"""
-        materials = await self.get_materials()
-        return next((m for m in materials if m.get('id') == material_id), None)
+        index = await self.get_index()
+        return index.materials_by_id.get(material_id)
     
     async def get_building_by_id(self, building_id: int) -> Optional[Dict[str, Any]]:
         """根据ID获取建筑"""
-        buildings = await self.get_buildings()
-        return next((b for b in buildings if b.get('id') == building_id), None)
+        index = await self.get_index()
+        return index.buildings_by_id.get(building_id)
     
     async def get_recipe_by_id(self, recipe_id: int) -> Optional[Dict[str, Any]]:
         """根据ID获取配方"""
-        recipes = await self.get_recipes()
-        return next((r for r in recipes if r.get('id') == recipe_id), None)
+        index = await self.get_index()
+        return index.recipes_by_id.get(recipe_id)
     
-    def get_system_neighbors(self) -> Dict[str, Any]:
-        """获取星系相邻关系表"""
-        if self._system_neighbors_cache is not None:
-            return self._system_neighbors_cache
+    def get_neighbor_graph(self) -> Optional[NeighborGraph]:
+        """获取星系相邻关系图（预计算的4光年表，CSR格式）"""
+        if self._neighbor_graph is not None:
+            return self._neighbor_graph
         
         try:
-            if os.path.exists(self.system_neighbors_path):
-                with open(self.system_neighbors_path, 'r', encoding='utf-8') as f:
-                    self._system_neighbors_cache = json.load(f)
-                return self._system_neighbors_cache
+            self._neighbor_graph = load_neighbor_graph(self.system_neighbors_path)
         except Exception as e:
             print(f"警告：无法加载星系相邻关系表: {e}")
         
-        return {}
+        return self._neighbor_graph
+    
+    async def get_neighbor_graph_for_radius(self, radius: Optional[float] = None) -> NeighborGraph:
+        """
+        获取指定跳跃半径的相邻关系图
+
+        Args:
+            radius: 跳跃半径（光年），None 表示预计算的4光年表
+                    （预计算表缺失时同样按坐标生成）
+        """
+        if radius is None or radius == DEFAULT_NEIGHBOR_DISTANCE:
+            graph = self.get_neighbor_graph()
+            if graph is not None:
+                return graph
+            radius = DEFAULT_NEIGHBOR_DISTANCE
+        
+        index = await self.get_index()
+        graph = self._generated_graphs.lookup(index, radius)
+        if graph is None:
+            graph = await self._generate_neighbor_graph(index, radius)
+        return graph
+    
+    @single_flight(key=lambda self, index, radius: (index.version, float(radius)))
+    async def _generate_neighbor_graph(self, index: GameDataIndex, radius: float) -> NeighborGraph:
+        """在线程中按坐标生成相邻关系图（并发请求同一半径时只生成一次）"""
+        spatial_index = index.derived('spatial', SpatialIndex.from_index)
+        graph = await asyncio.to_thread(build_neighbor_graph, index.systems, radius, spatial_index)
+        self._generated_graphs.store(index, radius, graph)
+        return graph
     
     def get_neighbor_system_ids(self, system_id: int) -> List[int]:
         """获取指定星系的相邻星系ID列表"""
-        neighbors_map = self.get_system_neighbors()
-        system_key = str(system_id)
-        if system_key in neighbors_map:
-            neighbor_list = neighbors_map[system_key].get('neighbors', [])
-            return [neighbor.get('systemId') for neighbor in neighbor_list if neighbor.get('systemId')]
-        return []
+        graph = self.get_neighbor_graph()
+        if graph is None:
+            return []
+        return graph.neighbor_ids(system_id) or []
 
 # 全局游戏数据API客户端实例
 game_data_api = GameDataAPI()
+backup_service.add_listener(game_data_api.on_backup_written)
 
@@ -0,0 +1,128 @@
+"""
+GT2See 游戏数据索引模型
+每个游戏数据快照构建一次，提供按ID的O(1)查找
+"""
+import threading
+from typing import Dict, Any, Callable, List, Optional, TypedDict
+
+
+class MaterialAmount(TypedDict, total=False):
+    """配方/建造材料条目"""
+    id: int
+    am: float
+
+
+class Material(TypedDict, total=False):
+    id: int
+    sName: str
+    name: str
+    type: int
+    tier: int
+    source: int
+
+
+class Building(TypedDict, total=False):
+    id: int
+    name: str
+    constructionMaterials: List[MaterialAmount]
+    workersNeeded: List[int]
+    recipesIds: List[int]
+
+
+class Recipe(TypedDict, total=False):
+    id: int
+    producedIn: int
+    type: int
+    timeMinutes: float
+    inputs: List[MaterialAmount]
+    output: MaterialAmount
+
+
+class Planet(TypedDict, total=False):
+    id: int
+    sId: int
+    tier: int
+    fert: float
+    mats: List[Dict[str, Any]]
+
+
+class StarSystem(TypedDict, total=False):
+    id: int
+    name: str
+    x: float
+    y: float
+    planets: Optional[List[Planet]]
+
+
+class GameDataIndex:
+    """
+    游戏数据索引
+
+    所有映射都引用快照中的原始对象（不复制），调用方必须视为只读
+    """
+
+    def __init__(self, game_data: Dict[str, Any], version: int = 0):
+        self.version = version
+        self.raw = game_data
+
+        self.materials: List[Material] = game_data.get('materials', []) or []
+        self.buildings: List[Building] = game_data.get('buildings', []) or []
+        self.recipes: List[Recipe] = game_data.get('recipes', []) or []
+        self.systems: List[StarSystem] = game_data.get('systems', []) or []
+        self.galaxy_config: Dict[str, Any] = game_data.get('galaxyConfig', {}) or {}
+
+        self.materials_by_id: Dict[int, Material] = {}
+        self.materials_by_name: Dict[str, Material] = {}
+        for material in self.materials:
+            self.materials_by_id[material.get('id')] = material
+            # 与劳动力消耗品配置一致：优先使用 sName（短名称），其次 name
+            name = material.get('sName') or material.get('name')
+            if name:
+                self.materials_by_name[name] = material
+
+        self.buildings_by_id: Dict[int, Building] = {b.get('id'): b for b in self.buildings}
+        self.recipes_by_id: Dict[int, Recipe] = {r.get('id'): r for r in self.recipes}
+        self.systems_by_id: Dict[int, StarSystem] = {s.get('id'): s for s in self.systems}
+
+        # 配方按生产建筑、按产出材料索引（保持原始顺序）
+        self.recipes_by_building: Dict[int, List[Recipe]] = {}
+        self.recipes_by_output: Dict[int, List[Recipe]] = {}
+        for recipe in self.recipes:
+            self.recipes_by_building.setdefault(recipe.get('producedIn'), []).append(recipe)
+            output = recipe.get('output')
+            if isinstance(output, dict):
+                self.recipes_by_output.setdefault(output.get('id'), []).append(recipe)
+
+        # 按需构建的派生索引（资源倒排索引、空间索引等），随本快照一起失效
+        self._derived: Dict[str, Any] = {}
+        # 派生索引可能在工作线程中构建；可重入，factory 内可以再访问其他派生索引
+        self._derived_lock = threading.RLock()
+
+    @classmethod
+    def build(cls, game_data: Dict[str, Any], version: int = 0) -> 'GameDataIndex':
+        """从原始游戏数据构建索引"""
+        return cls(game_data, version)
+
+    def get_recipes_for_building(self, building_id: Optional[int]) -> List[Recipe]:
+        """获取指定建筑的配方；building_id 为空时返回全部配方"""
+        if not building_id:
+            return self.recipes
+        return self.recipes_by_building.get(building_id, [])
+
+    def derived(self, key: str, factory: Callable[['GameDataIndex'], Any]) -> Any:
+        """
+        获取派生索引，首次访问时调用 factory(self) 构建并缓存（线程安全，每个键只构建一次）
+
+        Args:
+            key: 派生索引名称
+            factory: 构建函数
+        """
+        value = self._derived.get(key)
+        if value is not None:
+            return value
+        with self._derived_lock:
+            value = self._derived.get(key)
+            if value is None:
+                value = factory(self)
+                self._derived[key] = value
+            return value
@@ -0,0 +1,378 @@
+"""
+GT2See 星系群搜索引擎
+星系群 = 中心星系 + 相邻关系图中的相邻星系。
+每个 (资源倒排索引, 相邻关系图) 组合构建一次：成员列表、各星系的资源矩阵、
+群内资源出现顺序；每个筛选条件转化为满足条件的星系位图（Python int），
+中心星系为各位图的按位与，资源聚合为一次 reduceat 归约。
+同一引擎还提供多跳邻域（k 跳以内）和按筛选条件的连通区域搜索
+"""
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy 为可选依赖，缺失时回退到纯Python聚合
+    np = None
+
+from neighbor_graph import NeighborGraph, bfs_hops, connected_components
+from resource_index import ResourceIndex
+from spatial_index import ly_distance
+
+HAS_NUMPY = np is not None
+
+# 每个引擎缓存的筛选位图数量
+MAX_CACHED_BITSETS = 256
+
+
+def iter_bits(mask: int):
+    """按升序遍历位图中置位的位置"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class SystemGroupSearch:
+    """
+    星系群搜索引擎（只读，可在请求间共享）
+
+    结果与逐星系扫描完全一致：中心星系按行星（排除指定等级后）判断筛选条件，
+    聚合包含群内所有行星，资源按首次出现顺序排列
+    """
+
+    def __init__(self, resource_index: ResourceIndex, graph: NeighborGraph):
+        self.resource_index = resource_index
+        self.graph = graph
+        summaries = resource_index.summaries
+        n = len(summaries)
+
+        # 星系ID → 星系位置（与 systems_by_id 一致，重复ID时后者覆盖）
+        position_by_id = {s.system.get('id'): s.position for s in summaries}
+        # 图节点位置 → 星系位置（星系数据中不存在的节点为None）
+        self.node_systems: List[Optional[int]] = [position_by_id.get(i) for i in graph.ids]
+
+        # members[p] = [中心位置, 相邻星系位置...]；无法成群的星系为None
+        self.members: List[Optional[List[int]]] = [None] * n
+        grouped_mask = 0
+        for summary in summaries:
+            center_id = summary.system.get('id')
+            if center_id is None:
+                continue
+            neighbor_ids = graph.neighbor_ids(center_id)
+            if not neighbor_ids:
+                continue
+            neighbor_positions = [position_by_id[i] for i in neighbor_ids if i in position_by_id]
+            if not neighbor_positions:
+                continue
+            self.members[summary.position] = [summary.position] + neighbor_positions
+            grouped_mask |= 1 << summary.position
+        self.grouped_mask = grouped_mask
+
+        # 群内的资源出现顺序（按需计算）
+        self._material_orders: Dict[int, List[Any]] = {}
+        self._bitsets: "OrderedDict[Tuple[Any, Any, frozenset], int]" = OrderedDict()
+
+        self._build_matrices()
+
+    @classmethod
+    def from_index(cls, index, graph: NeighborGraph) -> 'SystemGroupSearch':
+        """从游戏数据索引与相邻关系图构建（供 GraphEngineCache 使用）"""
+        return cls(index.derived('resources', ResourceIndex.from_index), graph)
+
+    def _build_matrices(self):
+        """构建 星系 × 材料 的总丰度/行星数/最大丰度矩阵（仅整数丰度时启用）"""
+        self.material_columns: Dict[Any, int] = {}
+        self.totals = self.counts = self.maxima = None
+        if not HAS_NUMPY:
+            return
+
+        summaries = self.resource_index.summaries
+        for summary in summaries:
+            for resource in summary.resources:
+                if type(resource['totalAbundance']) is not int or type(resource['maxAbundance']) is not int:
+                    # 浮点丰度的求和顺序会影响结果，回退到逐行星累加
+                    self.material_columns = {}
+                    return
+                self.material_columns.setdefault(resource['materialId'], len(self.material_columns))
+
+        shape = (len(summaries), len(self.material_columns))
+        self.totals = np.zeros(shape, dtype=np.int64)
+        self.counts = np.zeros(shape, dtype=np.int64)
+        self.maxima = np.zeros(shape, dtype=np.int64)
+        for summary in summaries:
+            for resource in summary.resources:
+                column = self.material_columns[resource['materialId']]
+                self.totals[summary.position, column] = resource['totalAbundance']
+                self.counts[summary.position, column] = resource['planetCount']
+                self.maxima[summary.position, column] = resource['maxAbundance']
+
+    def filter_bitset(self, material_id: Any, min_abundance: float, excluded_tiers: frozenset) -> int:
+        """满足单个材料筛选条件（排除指定行星等级）的星系位图"""
+        key = (material_id, min_abundance, excluded_tiers)
+        mask = self._bitsets.get(key)
+        if mask is not None:
+            self._bitsets.move_to_end(key)
+            return mask
+
+        mask = 0
+        for position in self.resource_index.systems_with_material(material_id, min_abundance, excluded_tiers):
+            mask |= 1 << position
+        self._bitsets[key] = mask
+        while len(self._bitsets) > MAX_CACHED_BITSETS:
+            self._bitsets.popitem(last=False)
+        return mask
+
+    def matching_centers(
+        self,
+        material_filters: List[Dict[str, Any]],
+        excluded_tiers: Optional[Set[Any]] = None
+    ) -> List[int]:
+        """
+        满足全部筛选条件且可以成群的中心星系位置（升序）
+
+        Args:
+            material_filters: 材料筛选条件列表（非空）
+            excluded_tiers: 排除的行星等级
+        """
+        return list(iter_bits(self.filters_mask(material_filters, excluded_tiers, self.grouped_mask)))
+
+    def filters_mask(
+        self,
+        material_filters: List[Dict[str, Any]],
+        excluded_tiers: Optional[Set[Any]] = None,
+        mask: Optional[int] = None
+    ) -> int:
+        """
+        满足全部材料筛选条件的星系位图
+
+        Args:
+            material_filters: 材料筛选条件列表
+            excluded_tiers: 排除的行星等级
+            mask: 初始位图，None表示全部星系
+        """
+        if mask is None:
+            mask = (1 << len(self.members)) - 1
+        excluded = frozenset(excluded_tiers or ())
+        for filter_item in material_filters:
+            if not mask:
+                break
+            mask &= self.filter_bitset(
+                filter_item.get('materialId'), filter_item.get('minAbundance', 0), excluded
+            )
+        return mask
+
+    def material_order(self, center: int) -> List[Any]:
+        """群内资源的首次出现顺序（中心星系在前，相邻星系按相邻关系表顺序）"""
+        order = self._material_orders.get(center)
+        if order is None:
+            seen = {}
+            summaries = self.resource_index.summaries
+            for position in self.members[center]:
+                for resource in summaries[position].resources:
+                    seen.setdefault(resource['materialId'], None)
+            order = list(seen)
+            self._material_orders[center] = order
+        return order
+
+    def _aggregate_python(self, center: int) -> List[Dict[str, Any]]:
+        """逐行星累加（与原始实现相同的求和顺序）"""
+        resource_summary = {}
+        summaries = self.resource_index.summaries
+        for position in self.members[center]:
+            for planet in summaries[position].planets:
+                resources = planet.get('mats', [])
+                if not isinstance(resources, list):
+                    resources = []
+                for resource in resources:
+                    mat_id = resource.get('id')
+                    abundance = resource.get('ab', 0)
+                    if mat_id not in resource_summary:
+                        resource_summary[mat_id] = {
+                            'materialId': mat_id,
+                            'totalAbundance': 0,
+                            'planetCount': 0,
+                            'maxAbundance': 0
+                        }
+                    resource_summary[mat_id]['totalAbundance'] += abundance
+                    resource_summary[mat_id]['planetCount'] += 1
+                    if abundance > resource_summary[mat_id]['maxAbundance']:
+                        resource_summary[mat_id]['maxAbundance'] = abundance
+        return list(resource_summary.values())
+
+    def _aggregate_vectorized(self, centers: List[int]) -> List[List[Dict[str, Any]]]:
+        """对所有中心星系的成员行一次性做 reduceat 归约"""
+        rows = []
+        starts = []
+        for center in centers:
+            starts.append(len(rows))
+            rows.extend(self.members[center])
+        rows = np.asarray(rows, dtype=np.intp)
+        starts = np.asarray(starts, dtype=np.intp)
+        totals = np.add.reduceat(self.totals[rows], starts, axis=0).tolist()
+        counts = np.add.reduceat(self.counts[rows], starts, axis=0).tolist()
+        maxima = np.maximum.reduceat(self.maxima[rows], starts, axis=0).tolist()
+
+        columns = self.material_columns
+        aggregated = []
+        for i, center in enumerate(centers):
+            total_row, count_row, max_row = totals[i], counts[i], maxima[i]
+            resources = []
+            for mat_id in self.material_order(center):
+                column = columns[mat_id]
+                resources.append({
+                    'materialId': mat_id,
+                    'totalAbundance': total_row[column],
+                    'planetCount': count_row[column],
+                    'maxAbundance': max_row[column]
+                })
+            aggregated.append(resources)
+        return aggregated
+
+    def search(
+        self,
+        material_filters: List[Dict[str, Any]],
+        excluded_tiers: Optional[Set[Any]] = None,
+        exchange_x: float = 3334.0,
+        exchange_y: float = 1425.0
+    ) -> List[Dict[str, Any]]:
+        """
+        星系群搜索
+
+        Args:
+            material_filters: 材料筛选条件列表，每个包含 materialId 和 minAbundance
+            excluded_tiers: 中心星系判断筛选条件时排除的行星等级
+            exchange_x, exchange_y: 交易所坐标
+
+        Returns:
+            星系群列表，按中心星系到交易所的距离排序
+        """
+        centers = self.matching_centers(material_filters, excluded_tiers)
+        if not centers:
+            return []
+
+        if self.totals is not None:
+            aggregated = self._aggregate_vectorized(centers)
+        else:
+            aggregated = [self._aggregate_python(center) for center in centers]
+
+        summaries = self.resource_index.summaries
+        results = []
+        for center, resources in zip(centers, aggregated):
+            members = self.members[center]
+            center_system = summaries[center].system
+            center_id = center_system.get('id')
+            center_x = center_system.get('x', 0.0)
+            center_y = center_system.get('y', 0.0)
+            results.append({
+                'systemId': center_id,
+                'systemName': center_system.get('name', f'System {center_id}'),
+                'x': center_x,
+                'y': center_y,
+                'distanceToExchange': ly_distance(exchange_x, exchange_y, center_x, center_y),
+                'planetCount': sum(len(summaries[p].planets) for p in members),
+                'maxFertility': max(summaries[p].max_fertility for p in members),
+                'resources': resources,
+                'neighborSystemIds': [summaries[p].system.get('id') for p in members[1:]],
+                'neighborCount': len(members) - 1
+            })
+
+        # 按距离排序
+        results.sort(key=lambda x: x['distanceToExchange'])
+        return results
+
+    def _node_filter(self, mask: Optional[int] = None):
+        """图节点过滤函数：节点对应的星系存在，且（给定位图时）在位图中"""
+        node_systems = self.node_systems
+        if mask is None:
+            return lambda node: node_systems[node] is not None
+
+        def allowed(node: int) -> bool:
+            position = node_systems[node]
+            return position is not None and (mask >> position) & 1 == 1
+        return allowed
+
+    def _describe_region(self, positions: List[int], hops: Optional[Dict[int, int]] = None) -> Dict[str, Any]:
+        """区域内星系列表及资源汇总"""
+        summaries = self.resource_index.summaries
+        systems = []
+        for position in positions:
+            system = summaries[position].system
+            entry = {
+                'systemId': system.get('id'),
+                'systemName': system.get('name'),
+                'x': system.get('x', 0.0),
+                'y': system.get('y', 0.0)
+            }
+            if hops is not None:
+                entry['hops'] = hops[position]
+            systems.append(entry)
+        return {
+            'systems': systems,
+            'systemCount': len(systems),
+            **self.resource_index.aggregate(positions)
+        }
+
+    def k_hop_region(
+        self,
+        system_ids: List[int],
+        max_hops: int,
+        max_nodes: Optional[int] = None,
+        material_filters: Optional[List[Dict[str, Any]]] = None,
+        excluded_tiers: Optional[Set[Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        多源 BFS：距离任一起点不超过 max_hops 跳的所有星系，并汇总资源
+
+        Args:
+            system_ids: 起点星系ID列表
+            max_hops: 最大跳数
+            max_nodes: 最多返回的星系数，达到后提前结束
+            material_filters: 可选，只经过满足筛选条件的星系（起点同样需要满足）
+            excluded_tiers: 筛选时排除的行星等级
+
+        Returns:
+            {'sourceIds', 'systems'（含跳数）, 'systemCount', 'planetCount', 'maxFertility',
+             'resources', 'truncated'}
+        """
+        graph = self.graph
+        node_systems = self.node_systems
+        sources = [graph.position_of[i] for i in system_ids if i in graph.position_of]
+
+        mask = self.filters_mask(material_filters, excluded_tiers) if material_filters else None
+        hops, truncated = bfs_hops(graph, sources, max_hops, max_nodes, self._node_filter(mask))
+        system_hops = {node_systems[node]: hop for node, hop in hops.items()}
+        region = self._describe_region(list(system_hops), system_hops)
+        return {
+            'sourceIds': [graph.ids[node] for node in sources if node in hops],
+            **region,
+            'truncated': truncated
+        }
+
+    def connected_regions(
+        self,
+        material_filters: List[Dict[str, Any]],
+        excluded_tiers: Optional[Set[Any]] = None,
+        min_size: int = 2,
+        limit: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        每个星系都满足筛选条件的连通区域（按相邻关系图连通）
+
+        Args:
+            material_filters: 材料筛选条件列表
+            excluded_tiers: 排除的行星等级
+            min_size: 最小区域星系数
+            limit: 最多返回的区域数（按星系数降序）
+
+        Returns:
+            (区域列表, 区域总数)
+        """
+        mask = self.filters_mask(material_filters, excluded_tiers)
+        node_systems = self.node_systems
+        components = connected_components(self.graph, self._node_filter(mask), min_size)
+        # 区域按星系数降序，相同大小按起始节点顺序
+        components.sort(key=len, reverse=True)
+        total = len(components)
+        if limit is not None:
+            components = components[:limit]
+        return [self._describe_region([node_systems[node] for node in c]) for c in components], total
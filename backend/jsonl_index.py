@@ -0,0 +1,140 @@
+"""
+GT2See JSONL 字节偏移索引
+为 JSONL 备份建立 键 → (字节偏移, 长度) 的索引并缓存到同目录的 .idx 旁路文件，
+单条记录只需一次 seek + read；已读取的记录缓存在内存中，文件变化（size/mtime）时整体失效
+"""
+import json
+import os
+import time
+from typing import Dict, Any, Optional, Tuple
+
+_SIDECAR_FORMAT_VERSION = 1
+
+
+class JsonlOffsetIndex:
+    """
+    JSONL 文件的按键偏移索引
+
+    - 首次访问时优先加载旁路索引文件，与源文件 size/mtime_ns 不一致时重新扫描并覆写
+    - 文件状态检查按 min_check_interval 节流，热缓存命中时不访问磁盘
+    - 同一个键出现多次时取第一条（与逐行查找的结果一致）
+    """
+
+    def __init__(self, path: str, key: str = 'matId', sidecar_path: Optional[str] = None,
+                 min_check_interval: float = 1.0):
+        self.path = path
+        self.key = key
+        self.sidecar_path = sidecar_path or path + '.idx'
+        self.min_check_interval = min_check_interval
+        self._stat: Optional[Tuple[int, int]] = None
+        self._offsets: Dict[Any, Tuple[int, int]] = {}
+        self._records: Dict[Any, Dict[str, Any]] = {}
+        self._last_check = 0.0
+        self.build_count = 0
+
+    def _source_stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+            return st.st_size, st.st_mtime_ns
+        except OSError:
+            return None
+
+    def _load_sidecar(self, stat: Tuple[int, int]) -> Optional[Dict[Any, Tuple[int, int]]]:
+        """读取旁路索引，过期或格式不符时返回None"""
+        try:
+            with open(self.sidecar_path, 'r', encoding='utf-8') as f:
+                sidecar = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (not isinstance(sidecar, dict) or sidecar.get('version') != _SIDECAR_FORMAT_VERSION
+                or sidecar.get('key') != self.key
+                or [sidecar.get('size'), sidecar.get('mtimeNs')] != list(stat)):
+            return None
+        return {entry[0]: (entry[1], entry[2]) for entry in sidecar.get('offsets', [])}
+
+    def _scan(self) -> Dict[Any, Tuple[int, int]]:
+        """逐行扫描源文件，记录每个键第一次出现的偏移与长度"""
+        offsets: Dict[Any, Tuple[int, int]] = {}
+        with open(self.path, 'rb') as f:
+            offset = 0
+            for line in f:
+                length = len(line)
+                if line.strip():
+                    try:
+                        obj = json.loads(line)
+                    except ValueError:
+                        obj = None
+                    if isinstance(obj, dict):
+                        key = obj.get(self.key)
+                        if key is not None and key not in offsets:
+                            offsets[key] = (offset, length)
+                offset += length
+        return offsets
+
+    def _write_sidecar(self, stat: Tuple[int, int], offsets: Dict[Any, Tuple[int, int]]):
+        """原子写入旁路索引（失败时仅提示，不影响查询）"""
+        tmp_path = self.sidecar_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': _SIDECAR_FORMAT_VERSION,
+                    'key': self.key,
+                    'size': stat[0],
+                    'mtimeNs': stat[1],
+                    'offsets': [[key, offset, length] for key, (offset, length) in offsets.items()]
+                }, f, separators=(',', ':'))
+            os.replace(tmp_path, self.sidecar_path)
+        except Exception as e:
+            print(f"警告：无法写入JSONL偏移索引: {e}")
+
+    def _ensure_fresh(self) -> bool:
+        """确保索引与源文件一致；源文件不存在时返回False"""
+        now = time.monotonic()
+        if self._stat is not None and now - self._last_check < self.min_check_interval:
+            return True
+        self._last_check = now
+
+        stat = self._source_stat()
+        if stat is None:
+            self._stat = None
+            self._offsets = {}
+            self._records = {}
+            return False
+        if stat == self._stat:
+            return True
+
+        offsets = self._load_sidecar(stat)
+        if offsets is None:
+            offsets = self._scan()
+            self._write_sidecar(stat, offsets)
+            self.build_count += 1
+        self._stat = stat
+        self._offsets = offsets
+        self._records = {}
+        return True
+
+    def get(self, key: Any) -> Optional[Dict[str, Any]]:
+        """
+        按键读取一条记录
+
+        Returns:
+            记录（共享对象，调用方必须视为只读）；文件不存在或没有该键时返回None
+        """
+        if not self._ensure_fresh():
+            return None
+        record = self._records.get(key)
+        if record is not None:
+            return record
+
+        location = self._offsets.get(key)
+        if location is None:
+            return None
+        offset, length = location
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                record = json.loads(f.read(length))
+        except (OSError, ValueError):
+            return None
+        self._records[key] = record
+        return record
@@ -1,8 +1,9 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from typing import Optional, List, Dict, Any
 import uvicorn
+import asyncio
 import json
 import os
 
@@ -10,13 +11,23 @@ from config import settings
 from exchange_api import exchange_api
 from game_data_api import game_data_api
 from calculators import BuildingCalculator, RecipeCalculator, SystemAnalyzer, ComprehensiveAnalyzer
+from resource_index import ResourceIndex
+from spatial_index import SpatialIndex
+from group_search import SystemGroupSearch
+from neighbor_graph import GraphEngineCache
+from routing import RouteEngine
+from production_chain import ProductionChainSolution, solve_production_chain
+from base_planner import plan_base
+from recipe_engine import RecipeProfitResults, compute_recipe_profits, sweep_recipe_profits
 from backup_service import backup_service
+from price_history import price_history, ROLLUP_RESOLUTIONS
+from broadcaster import broadcaster, Message
 from rate_limiter import rate_limiter
-from cache_manager import cache_manager
+from cache_manager import cache_manager, result_cache, single_flight_stats
+from prerendered import prerendered_cache
+from enrichment import enrichment, enrich_exchange_payload
 from constants import (
     MATERIAL_TYPES, RECIPE_TYPES, 
-    get_material_type_name, get_recipe_type_name,
-    get_material_name, get_building_name, get_recipe_name,
     get_all_material_names, get_all_building_names, get_all_recipe_names
 )
 
@@ -26,15 +37,49 @@ app = FastAPI(
     version="1.0.0"
 )
 # ==================== 应用生命周期：启动定时备份 ====================
+def _on_backup_written(source: str, payload: Any) -> None:
+    # 新备份落地后，依赖旧版本数据的计算结果全部失效
+    if source in ('game_data', 'exchange_prices'):
+        result_cache.clear()
+
+
+backup_service.add_listener(_on_backup_written)
+
+
+def _publish_changes(event: str):
+    # 新快照版本发布后只推送版本号与变化的 matId，客户端再通过增量接口获取数据
+    def _publish(change) -> None:
+        version, changed, removed = change
+        broadcaster.publish(event, {'version': version, 'changed': sorted(changed), 'removed': sorted(removed)})
+    return _publish
+
+
+exchange_api.price_changes.add_listener(_publish_changes('prices'))
+exchange_api.details_changes.add_listener(_publish_changes('details'))
+
+# 星系群搜索 / 航线规划引擎（按游戏数据版本与相邻关系图缓存）
+group_search_engines = GraphEngineCache(SystemGroupSearch.from_index, settings.NEIGHBOR_GRAPH_CACHE_SIZE)
+route_engines = GraphEngineCache(RouteEngine.from_index, settings.NEIGHBOR_GRAPH_CACHE_SIZE)
+
+
 @app.on_event("startup")
 async def _startup() -> None:
+    # 把已有的备份快照写入价格历史（未变化的材料不会重复写入）
+    await asyncio.to_thread(
+        price_history.seed_from_backups,
+        [exchange_api.backup_prices, exchange_api.backup_details_all]
+    )
     # 启动后台备份任务（每5分钟覆写备份文件）
     backup_service.start()
+    broadcaster.start()
 
 
 @app.on_event("shutdown")
 async def _shutdown() -> None:
     await backup_service.stop()
+    await broadcaster.stop()
+    await price_history.flush()
+    price_history.close()
 
 
 # CORS配置
@@ -77,11 +122,12 @@ async def health_check():
 # ==================== 游戏数据API ====================
 
 @app.get("/api/gamedata")
-async def get_game_data():
-    """获取完整的游戏数据"""
+async def get_game_data(request: Request):
+    """获取完整的游戏数据（每个数据版本预渲染一次，支持 ETag/304 与 gzip/brotli）"""
     try:
-        data = await game_data_api.get_game_data()
-        return data
+        snapshot = await game_data_api.get_snapshot()
+        payload = await prerendered_cache.get('gamedata', snapshot.version, lambda: snapshot.data)
+        return payload.response(request)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -89,16 +135,8 @@ async def get_game_data():
 async def get_materials():
     """获取材料列表（增强版，包含类型名称）"""
     try:
-        materials = await game_data_api.get_materials()
-        
-        # 为每个材料添加类型名称
-        for material in materials:
-            material_type = material.get('type')
-            if material_type:
-                material['typeName'] = get_material_type_name(material_type, 'zh')
-                material['typeNameEn'] = get_material_type_name(material_type, 'en')
-        
-        return {"materials": materials}
+        index = await game_data_api.get_index()
+        return {"materials": enrichment.game_data(index).materials}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -119,24 +157,8 @@ async def get_material(material_id: int):
 async def get_buildings():
     """获取建筑列表（增强版，包含材料名称）"""
     try:
-        # 确保名称缓存已初始化
-        await game_data_api.get_game_data()
-        
-        buildings = await game_data_api.get_buildings()
-        
-        # 为每个建筑的 constructionMaterials 添加名称
-        for building in buildings:
-            construction_materials = building.get('constructionMaterials', [])
-            
-            # 确保 construction_materials 是列表
-            if isinstance(construction_materials, list):
-                for material in construction_materials:
-                    mat_id = material.get('id')
-                    if mat_id:
-                        material['name'] = get_material_name(mat_id, 'zh')
-                        material['nameEn'] = get_material_name(mat_id, 'en')
-        
-        return {"buildings": buildings}
+        index = await game_data_api.get_index()
+        return {"buildings": enrichment.game_data(index).buildings}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -144,24 +166,10 @@ async def get_buildings():
 async def get_building(building_id: int):
     """获取单个建筑信息（增强版，包含材料名称）"""
     try:
-        # 确保名称缓存已初始化
-        await game_data_api.get_game_data()
-        
-        building = await game_data_api.get_building_by_id(building_id)
+        index = await game_data_api.get_index()
+        building = enrichment.game_data(index).buildings_by_id.get(building_id)
         if building is None:
             raise HTTPException(status_code=404, detail="Building not found")
-        
-        # 为 constructionMaterials 添加名称
-        construction_materials = building.get('constructionMaterials', [])
-        
-        # 确保 construction_materials 是列表
-        if isinstance(construction_materials, list):
-            for material in construction_materials:
-                mat_id = material.get('id')
-                if mat_id:
-                    material['name'] = get_material_name(mat_id, 'zh')
-                    material['nameEn'] = get_material_name(mat_id, 'en')
-        
         return building
     except HTTPException:
         raise
@@ -228,62 +236,26 @@ async def debug_buildings():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/recipes")
-async def get_recipes():
-    """获取配方列表（增强版，包含类型和材料名称）"""
+async def get_recipes(request: Request):
+    """获取配方列表（增强版，包含类型和材料名称；每个数据版本预渲染一次）"""
     try:
-        # 确保名称缓存已初始化
-        await game_data_api.get_game_data()
-        
-        recipes = await game_data_api.get_recipes()
-        
-        # 为每个配方添加类型名称和材料名称
-        for recipe in recipes:
-            recipe_type = recipe.get('type')
-            if recipe_type:
-                recipe['typeName'] = get_recipe_type_name(recipe_type, 'zh')
-                recipe['typeNameEn'] = get_recipe_type_name(recipe_type, 'en')
-            
-            # 为 inputs 添加材料名称
-            inputs = recipe.get('inputs', [])
-            for input_item in inputs:
-                mat_id = input_item.get('id')
-                if mat_id:
-                    input_item['name'] = get_material_name(mat_id, 'zh')
-                    input_item['nameEn'] = get_material_name(mat_id, 'en')
-            
-            # 为 output 添加材料名称
-            output = recipe.get('output', {})
-            if output:
-                mat_id = output.get('id')
-                if mat_id:
-                    output['name'] = get_material_name(mat_id, 'zh')
-                    output['nameEn'] = get_material_name(mat_id, 'en')
-        
-        return {"recipes": recipes}
+        index = await game_data_api.get_index()
+        payload = await prerendered_cache.get(
+            'recipes', index.version, lambda: {"recipes": enrichment.game_data(index).recipes}
+        )
+        return payload.response(request)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/systems")
-async def get_systems():
-    """获取星系列表（增强版，包含材料名称）"""
+async def get_systems(request: Request):
+    """获取星系列表（增强版，包含材料名称；每个数据版本预渲染一次）"""
     try:
-        # 确保名称缓存已初始化
-        await game_data_api.get_game_data()
-        
-        systems = await game_data_api.get_systems()
-        
-        # 为每个星系的行星资源添加材料名称
-        for system in systems:
-            planets = system.get('planets', []) or []
-            for planet in planets:
-                mats = planet.get('mats', [])
-                for mat in mats:
-                    mat_id = mat.get('id')
-                    if mat_id:
-                        mat['name'] = get_material_name(mat_id, 'zh')
-                        mat['nameEn'] = get_material_name(mat_id, 'en')
-        
-        return {"systems": systems}
+        index = await game_data_api.get_index()
+        payload = await prerendered_cache.get(
+            'systems', index.version, lambda: {"systems": enrichment.game_data(index).systems}
+        )
+        return payload.response(request)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -294,31 +266,30 @@ async def get_material_prices(mat_id: Optional[int] = None):
     """获取材料价格（增强版，包含中英文名称）"""
     try:
         # 确保名称缓存已初始化
-        await game_data_api.get_game_data()
+        index = await game_data_api.get_index()
         
         prices = await exchange_api.get_material_prices(mat_id)
         
-        # 为价格数据添加中英文名称
-        if isinstance(prices, dict) and 'prices' in prices:
-            for price in prices['prices']:
-                mat_id_val = price.get('matId')
-                if mat_id_val:
-                    price['matNameZh'] = get_material_name(mat_id_val, 'zh')
-                    price['matNameEn'] = get_material_name(mat_id_val, 'en')
-        elif isinstance(prices, list):
-            for price in prices:
-                mat_id_val = price.get('matId')
-                if mat_id_val:
-                    price['matNameZh'] = get_material_name(mat_id_val, 'zh')
-                    price['matNameEn'] = get_material_name(mat_id_val, 'en')
-        elif isinstance(prices, dict) and 'matId' in prices:
-            # 单个材料价格
-            mat_id_val = prices.get('matId')
-            if mat_id_val:
-                prices['matNameZh'] = get_material_name(mat_id_val, 'zh')
-                prices['matNameEn'] = get_material_name(mat_id_val, 'en')
-        
-        return prices
+        # 为价格数据添加中英文名称（全量数据每个版本只构建一次，不修改共享数据）
+        if mat_id is None:
+            material_prices = await exchange_api.get_price_table()
+            changes = await exchange_api.get_price_changes()
+            view = enrichment.exchange('prices', (material_prices.version, index.version), prices, 'prices')
+            # 附带版本号，客户端之后可通过增量接口只获取变化的材料
+            return {**view, 'version': changes.version} if isinstance(view, dict) else view
+        return enrich_exchange_payload(prices, 'prices')
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/exchange/prices/delta")
+async def get_material_prices_delta(
+    since: int = Query(..., ge=0, description="客户端已有的价格版本号")
+):
+    """获取指定版本之后变化的材料价格（版本过旧时返回全量，full=true）"""
+    try:
+        await game_data_api.get_index()
+        changes = await exchange_api.get_price_changes()
+        return enrich_exchange_payload(changes.delta(since), 'prices')
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -331,50 +302,96 @@ async def get_material_details(mat_id: Optional[int] = None):
         
         details = await exchange_api.get_material_details(mat_id)
         
-        # 为详情数据添加中英文名称
-        if isinstance(details, dict) and 'materials' in details:
-            # 全材料详情
-            for detail in details['materials']:
-                mat_id_val = detail.get('matId')
-                if mat_id_val:
-                    detail['matNameZh'] = get_material_name(mat_id_val, 'zh')
-                    detail['matNameEn'] = get_material_name(mat_id_val, 'en')
-        elif isinstance(details, dict) and 'matId' in details:
-            # 单个材料详情
-            mat_id_val = details.get('matId')
-            if mat_id_val:
-                details['matNameZh'] = get_material_name(mat_id_val, 'zh')
-                details['matNameEn'] = get_material_name(mat_id_val, 'en')
-        
-        return details
+        # 为详情数据添加中英文名称（返回副本，不修改原始数据）
+        if mat_id is None and isinstance(details, dict):
+            changes = await exchange_api.get_details_changes()
+            return {**enrich_exchange_payload(details, 'materials'), 'version': changes.version}
+        return enrich_exchange_payload(details, 'materials')
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/exchange/details/delta")
+async def get_material_details_delta(
+    since: int = Query(..., ge=0, description="客户端已有的详情版本号")
+):
+    """获取指定版本之后变化的材料详情（版本过旧时返回全量，full=true）"""
+    try:
+        await game_data_api.get_game_data()
+        changes = await exchange_api.get_details_changes()
+        return enrich_exchange_payload(changes.delta(since), 'materials')
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/exchange/history")
+async def get_price_history(
+    mat_ids: str = Query(..., description="材料ID列表，逗号分隔"),
+    resolution: str = Query('1h', description="汇总粒度：5m/1h/1d"),
+    start: Optional[int] = Query(None, description="起始时间（Unix秒）"),
+    end: Optional[int] = Query(None, description="结束时间（Unix秒）")
+):
+    """价格历史 OHLC + 成交量汇总（多个材料一次查询，流式返回）"""
+    try:
+        if resolution not in ROLLUP_RESOLUTIONS:
+            raise HTTPException(
+                status_code=400, detail=f"resolution must be one of: {', '.join(ROLLUP_RESOLUTIONS)}"
+            )
+        try:
+            ids = list(dict.fromkeys(int(i.strip()) for i in mat_ids.split(',') if i.strip()))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid mat_ids")
+        if not ids or len(ids) > settings.MAX_HISTORY_MATERIALS:
+            raise HTTPException(
+                status_code=400, detail=f"mat_ids must contain 1-{settings.MAX_HISTORY_MATERIALS} materials"
+            )
+        return StreamingResponse(
+            price_history.iter_history_json(ids, resolution, start, end), media_type="application/json"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/exchange/depth/{mat_id}")
+async def get_material_depth(
+    mat_id: int,
+    quantity: float = Query(..., gt=0, description="买入数量")
+):
+    """按订单簿深度计算买入指定数量的总成本与成交均价（VWAP）"""
+    try:
+        depth_index = await exchange_api.get_depth_index()
+        depth = depth_index.get(mat_id)
+        if depth is None:
+            raise HTTPException(status_code=404, detail="Material not found")
+        return {'matId': mat_id, **depth.quote(quantity)}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # ==================== 建筑成本计算API ====================
 
 @app.get("/api/calculator/building-cost/{building_id}")
-async def calculate_building_cost(building_id: int):
-    """计算单个建筑的建造成本"""
+async def calculate_building_cost(
+    building_id: int,
+    quantity: Optional[int] = Query(None, ge=1, le=100000, description="建造数量，指定时按订单簿深度计价")
+):
+    """计算单个建筑的建造成本（指定 quantity 时按订单簿吃单的成交均价计价）"""
     try:
         # 获取建筑数据
         building = await game_data_api.get_building_by_id(building_id)
         if building is None:
             raise HTTPException(status_code=404, detail="Building not found")
         
-        # 获取价格数据
-        prices_response = await exchange_api.get_material_prices()
+        # 获取价格表（每个价格备份版本构建一次）
+        material_prices = await exchange_api.get_price_table()
         
-        # 转换价格数据为字典格式
-        material_prices = {}
-        if isinstance(prices_response, list):
-            for price in prices_response:
-                material_prices[price.get('matId')] = price
-        elif isinstance(prices_response, dict) and 'prices' in prices_response:
-            for price in prices_response['prices']:
-                material_prices[price.get('matId')] = price
+        # 按数量计价时使用订单簿深度索引（每个详情备份版本构建一次）
+        depth_index = await exchange_api.get_depth_index() if quantity else None
         
         # 计算成本
-        cost_data = BuildingCalculator.calculate_building_cost(building, material_prices)
+        cost_data = BuildingCalculator.calculate_building_cost(
+            building, material_prices, depth_index=depth_index, quantity=quantity or 1
+        )
         return cost_data
     
     except HTTPException:
@@ -383,36 +400,35 @@ async def calculate_building_cost(building_id: int):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/calculator/building-costs")
-async def calculate_multiple_building_costs(building_ids: Optional[str] = Query(None)):
-    """计算多个建筑的建造成本"""
+async def calculate_multiple_building_costs(
+    building_ids: Optional[str] = Query(None),
+    quantity: Optional[int] = Query(None, ge=1, le=100000, description="每种建筑的建造数量，指定时按订单簿深度计价")
+):
+    """计算多个建筑的建造成本（指定 quantity 时按订单簿吃单的成交均价计价）"""
     try:
-        # 获取建筑列表
+        # 获取建筑列表（按ID索引查找）
+        index = await game_data_api.get_index()
         if building_ids:
             ids = [int(id.strip()) for id in building_ids.split(',')]
             buildings = []
             for bid in ids:
-                building = await game_data_api.get_building_by_id(bid)
+                building = index.buildings_by_id.get(bid)
                 if building:
                     buildings.append(building)
         else:
-            buildings = await game_data_api.get_buildings()
+            buildings = index.buildings
         
-        # 获取价格数据
-        prices_response = await exchange_api.get_material_prices()
+        # 获取价格表（每个价格备份版本构建一次）
+        material_prices = await exchange_api.get_price_table()
         
-        # 转换价格数据
-        material_prices = {}
-        if isinstance(prices_response, list):
-            for price in prices_response:
-                material_prices[price.get('matId')] = price
-        elif isinstance(prices_response, dict) and 'prices' in prices_response:
-            for price in prices_response['prices']:
-                material_prices[price.get('matId')] = price
+        depth_index = await exchange_api.get_depth_index() if quantity else None
         
         # 计算成本（包括所有建筑，即使没有建造材料）
         results = []
         for building in buildings:
-            cost_data = BuildingCalculator.calculate_building_cost(building, material_prices)
+            cost_data = BuildingCalculator.calculate_building_cost(
+                building, material_prices, depth_index=depth_index, quantity=quantity or 1
+            )
             # 即使没有材料成本，也要包含该建筑
             results.append(cost_data)
         
@@ -427,28 +443,26 @@ async def calculate_multiple_building_costs(building_ids: Optional[str] = Query(
 # ==================== 配方收益计算API ====================
 
 @app.get("/api/calculator/recipe-profit/{recipe_id}")
-async def calculate_recipe_profit(recipe_id: int):
-    """计算单个配方的收益"""
+async def calculate_recipe_profit(
+    recipe_id: int,
+    runs: Optional[int] = Query(None, ge=1, le=100000, description="生产轮数，指定时输入材料按订单簿深度计价")
+):
+    """计算单个配方的收益（指定 runs 时输入材料按订单簿吃单的成交均价计价）"""
     try:
         # 获取配方数据
         recipe = await game_data_api.get_recipe_by_id(recipe_id)
         if recipe is None:
             raise HTTPException(status_code=404, detail="Recipe not found")
         
-        # 获取价格数据
-        prices_response = await exchange_api.get_material_prices()
+        # 获取价格表（每个价格备份版本构建一次）
+        material_prices = await exchange_api.get_price_table()
         
-        # 转换价格数据
-        material_prices = {}
-        if isinstance(prices_response, list):
-            for price in prices_response:
-                material_prices[price.get('matId')] = price
-        elif isinstance(prices_response, dict) and 'prices' in prices_response:
-            for price in prices_response['prices']:
-                material_prices[price.get('matId')] = price
+        depth_index = await exchange_api.get_depth_index() if runs else None
         
         # 计算收益
-        profit_data = RecipeCalculator.calculate_recipe_profit(recipe, material_prices)
+        profit_data = RecipeCalculator.calculate_recipe_profit(
+            recipe, material_prices, depth_index=depth_index, runs=runs or 1
+        )
         return profit_data
     
     except HTTPException:
@@ -472,61 +486,274 @@ async def calculate_recipe_profits(
     fertility_abundance: 肥力/丰度值 (默认100，表示标准，范围0-1000)
     """
     try:
-        # 获取配方数据
-        recipes = await game_data_api.get_recipes()
+        profits = await _get_recipe_profits(building_id, fertility_abundance)
         
-        # 获取价格数据
-        prices_response = await exchange_api.get_material_prices()
+        # 使用预先排好的顺序，限制返回数量（仅在明确指定时）
+        results = profits.ordered(sort_by, limit)
         
-        # 转换价格数据
-        material_prices = {}
-        if isinstance(prices_response, list):
-            for price in prices_response:
-                material_prices[price.get('matId')] = price
-        elif isinstance(prices_response, dict) and 'prices' in prices_response:
-            for price in prices_response['prices']:
-                material_prices[price.get('matId')] = price
+        return {"recipeProfits": results, "total": profits.total}
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _get_recipe_profits(building_id: Optional[int], fertility_abundance: float) -> RecipeProfitResults:
+    """
+    获取配方收益计算结果（按价格表版本、游戏数据版本、肥力/丰度、建筑筛选缓存）
+    
+    结果对象保存每种排序方式的预排序顺序，字典结果按需构建
+    """
+    index = await game_data_api.get_index()
+    material_prices = await exchange_api.get_price_table()
+    
+    cache_key = ('recipe-profits', material_prices.version, index.version, fertility_abundance, building_id or None)
+    # 在线程中计算；并发的相同请求只计算一次
+    return await result_cache.get_or_compute(
+        cache_key,
+        lambda: asyncio.to_thread(compute_recipe_profits, index, material_prices, fertility_abundance, building_id),
+        size=lambda profits: profits.approx_size()
+    )
+
+MAX_SWEEP_MULTIPLIERS = 200
+
+@app.get("/api/calculator/recipe-profits/sweep")
+async def sweep_recipe_profit_multipliers(
+    multipliers: Optional[str] = Query(None, description="肥力/丰度值列表，逗号分隔，例如 60,100,250"),
+    start: Optional[float] = Query(None, ge=0, le=1000, description="范围起点"),
+    stop: Optional[float] = Query(None, ge=0, le=1000, description="范围终点（包含）"),
+    step: Optional[float] = Query(None, gt=0, description="范围步长"),
+    building_id: Optional[int] = None
+):
+    """
+    批量计算多个肥力/丰度值下的配方每小时收益（配方 × 乘数矩阵）
+    
+    multipliers: 逗号分隔的乘数列表；或使用 start/stop/step 指定范围
+    building_id: 筛选特定建筑的配方
+    """
+    # 解析乘数列表
+    if multipliers:
+        try:
+            values = [float(m.strip()) for m in multipliers.split(',') if m.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid multipliers")
+    elif start is not None and stop is not None and step is not None:
+        count = int((stop - start) / step + 1e-9) + 1 if stop >= start else 0
+        if count > MAX_SWEEP_MULTIPLIERS:
+            raise HTTPException(status_code=400, detail=f"Too many multipliers (max {MAX_SWEEP_MULTIPLIERS})")
+        values = [round(start + i * step, 6) for i in range(count)]
+    else:
+        raise HTTPException(status_code=400, detail="Either multipliers or start/stop/step is required")
+    
+    if not values:
+        raise HTTPException(status_code=400, detail="No multipliers given")
+    if len(values) > MAX_SWEEP_MULTIPLIERS:
+        raise HTTPException(status_code=400, detail=f"Too many multipliers (max {MAX_SWEEP_MULTIPLIERS})")
+    if any(v < 0 or v > 1000 for v in values):
+        raise HTTPException(status_code=400, detail="Multipliers must be within 0-1000")
+    
+    try:
+        index = await game_data_api.get_index()
+        material_prices = await exchange_api.get_price_table()
         
-        # 计算收益
-        results = RecipeCalculator.calculate_multiple_recipes(
-            recipes, 
-            material_prices, 
-            sort_by=sort_by,
-            building_filter=building_id,
-            fertility_abundance_multiplier=fertility_abundance
+        cache_key = ('recipe-profits-sweep', material_prices.version, index.version, tuple(values), building_id or None)
+        sweep = await result_cache.get_or_compute(
+            cache_key,
+            lambda: asyncio.to_thread(sweep_recipe_profits, index, material_prices, values, building_id)
         )
         
-        # 限制返回数量（仅在明确指定时）
-        total_count = len(results)
-        if limit and limit > 0:
-            results = results[:limit]
-        
-        return {"recipeProfits": results, "total": total_count}
+        return {**sweep, "total": len(sweep['recipes'])}
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _get_production_chain(total_population: int, include_workforce: bool) -> ProductionChainSolution:
+    """获取生产链求解结果（按价格表版本、游戏数据版本、人口、是否计入劳动力缓存）"""
+    index = await game_data_api.get_index()
+    material_prices = await exchange_api.get_price_table()
+    
+    cache_key = ('production-chain', material_prices.version, index.version, total_population, include_workforce)
+    return await result_cache.get_or_compute(
+        cache_key,
+        lambda: asyncio.to_thread(solve_production_chain, index, material_prices, total_population, include_workforce),
+        size=lambda solution: solution.approx_size()
+    )
+
+@app.get("/api/calculator/production-chain")
+async def calculate_production_chain(
+    total_population: int = Query(0, ge=0, le=100000, description="总人口（劳动力扩张惩罚）"),
+    include_workforce: bool = Query(True, description="是否计入劳动力成本"),
+    decision: Optional[str] = Query(None, pattern='^(buy|produce|unavailable)$', description="只返回指定决策的材料")
+):
+    """
+    所有材料的最低获取成本（自产 vs 购买）
+    
+    自产成本 = 最便宜配方的输入材料最低成本之和 / 产出数量 + 每单位劳动力成本
+    """
+    try:
+        solution = await _get_production_chain(total_population, include_workforce)
+        materials = solution.materials()
+        if decision:
+            materials = [m for m in materials if m['decision'] == decision]
+        return {"materials": materials, "total": len(materials)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/calculator/production-chain/{material_id}")
+async def calculate_material_production_chain(
+    material_id: int,
+    quantity: float = Query(1.0, gt=0, description="需要的数量"),
+    total_population: int = Query(0, ge=0, le=100000, description="总人口（劳动力扩张惩罚）"),
+    include_workforce: bool = Query(True, description="是否计入劳动力成本")
+):
+    """单个材料的最低成本生产树、采购清单及各配方生产轮数"""
+    try:
+        solution = await _get_production_chain(total_population, include_workforce)
+        if material_id not in solution.buy_prices:
+            raise HTTPException(status_code=404, detail="Material not found")
+        return {
+            "material": solution.material_entry(material_id),
+            **solution.expand(material_id, quantity)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _parse_json_list(value: Optional[str], name: str) -> Optional[list]:
+    """解析可选的JSON列表参数"""
+    if not value:
+        return None
+    try:
+        parsed = json.loads(value)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON format for {name}")
+    if not isinstance(parsed, list):
+        raise HTTPException(status_code=400, detail=f"{name} must be a list")
+    return parsed
+
+@app.get("/api/calculator/base-plan")
+async def calculate_base_plan(
+    targets: Optional[str] = Query(None, description="目标产出，JSON格式：[{\"materialId\": 1, \"amountPerHour\": 10}]"),
+    bases: int = Query(1, ge=1, le=100, description="基地数量（槽位 = 基地数 × slotsPerBase）"),
+    slots: Optional[int] = Query(None, ge=0, le=10000, description="可用建筑槽位，指定时覆盖 bases"),
+    workforce_limits: Optional[str] = Query(None, description="劳动力上限，JSON格式：[Worker, Technician, Engineer, Scientist]，null表示不限"),
+    building_ids: Optional[str] = Query(None, description="允许使用的建筑ID，JSON格式：[1, 2]"),
+    allow_buy: bool = Query(True, description="是否允许从交易所购买材料"),
+    sell_surplus: bool = Query(True, description="剩余产出是否按当前价格出售"),
+    integer: bool = Query(True, description="建筑数量是否取整数"),
+    fertility_abundance: float = Query(100.0, gt=0, le=1000, description="肥力/丰度值"),
+    total_population: int = Query(0, ge=0, le=100000, description="总人口（劳动力扩张惩罚）"),
+    include_workforce: bool = Query(True, description="是否计入劳动力成本"),
+    timeout: float = Query(settings.PLANNER_TIMEOUT, gt=0, le=settings.MAX_PLANNER_TIMEOUT, description="求解时间上限（秒）")
+):
+    """
+    基地规划：在槽位与劳动力约束下求每种配方运行的建筑数量（线性规划 / 混合整数规划）
+    
+    满足每小时目标产出的前提下最小化 劳动力成本 + 购买成本 - 出售收入；
+    返回建筑清单、材料流量及影子价格，超时返回当前最优可行解（status = timeLimit）
+    """
+    parsed_targets: Dict[int, float] = {}
+    for item in _parse_json_list(targets, 'targets') or []:
+        try:
+            mat_id = int(item['materialId'])
+            amount = float(item['amountPerHour'])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Each target needs materialId and amountPerHour")
+        if amount < 0:
+            raise HTTPException(status_code=400, detail="amountPerHour must be non-negative")
+        parsed_targets[mat_id] = parsed_targets.get(mat_id, 0.0) + amount
+    
+    parsed_limits = _parse_json_list(workforce_limits, 'workforce_limits')
+    if parsed_limits is not None:
+        if len(parsed_limits) != 4 or any(v is not None and (not isinstance(v, (int, float)) or v < 0) for v in parsed_limits):
+            raise HTTPException(status_code=400, detail="workforce_limits must be 4 non-negative numbers or null")
+    parsed_buildings = _parse_json_list(building_ids, 'building_ids')
+    if parsed_buildings is not None and any(type(v) is not int for v in parsed_buildings):
+        raise HTTPException(status_code=400, detail="building_ids must be a list of integers")
+    
+    try:
+        index = await game_data_api.get_index()
+        material_prices = await exchange_api.get_price_table()
+        
+        unknown = [mat_id for mat_id in parsed_targets if mat_id not in index.materials_by_id]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown target materialId: {unknown}")
+        
+        if slots is None:
+            slots = bases * int(index.galaxy_config.get('slotsPerBase', 0) or 0)
+        
+        cache_key = (
+            'base-plan', material_prices.version, index.version,
+            tuple(sorted(parsed_targets.items())), slots,
+            tuple(parsed_limits) if parsed_limits is not None else None,
+            tuple(sorted(parsed_buildings)) if parsed_buildings else None,
+            allow_buy, sell_surplus, integer, fertility_abundance, total_population, include_workforce, timeout
+        )
+        # 求解为CPU密集型，放到线程中避免阻塞事件循环；并发的相同请求只求解一次
+        # 超时得到的当前最优解不缓存，之后的相同请求重新求解
+        return await result_cache.get_or_compute(cache_key, lambda: asyncio.to_thread(
+            plan_base, index, material_prices, parsed_targets, slots,
+            workforce_limits=parsed_limits,
+            building_ids=set(parsed_buildings) if parsed_buildings else None,
+            allow_buy=allow_buy, sell_surplus=sell_surplus, integer=integer,
+            fertility_abundance=fertility_abundance, total_population=total_population,
+            include_workforce=include_workforce, timeout=timeout
+        ), cacheable=lambda plan: plan.get('status') == 'optimal')
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # ==================== 星系资源分析API ====================
 
 @app.get("/api/analyzer/systems")
 async def analyze_systems(
     exchange_x: float = Query(3334.0, description="交易所X坐标"),
-    exchange_y: float = Query(1425.0, description="交易所Y坐标")
+    exchange_y: float = Query(1425.0, description="交易所Y坐标"),
+    max_distance: Optional[float] = Query(None, ge=0, description="最大距离（光年），不填表示全部星系")
 ):
     """分析所有星系的资源分布"""
     try:
-        systems = await game_data_api.get_systems()
-        analysis = SystemAnalyzer.analyze_system_resources(systems, exchange_x, exchange_y)
+        index = await game_data_api.get_index()
+        analysis = SystemAnalyzer.analyze_system_resources(
+            index.systems, exchange_x, exchange_y,
+            max_distance=max_distance,
+            spatial_index=index.derived('spatial', SpatialIndex.from_index)
+        )
         return {"systemAnalysis": analysis}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/analyzer/nearest-systems")
+async def nearest_systems(
+    x: float = Query(3334.0, ge=-settings.MAX_COORDINATE, le=settings.MAX_COORDINATE, description="查询点X坐标"),
+    y: float = Query(1425.0, ge=-settings.MAX_COORDINATE, le=settings.MAX_COORDINATE, description="查询点Y坐标"),
+    k: int = Query(10, ge=1, le=1000, description="返回数量")
+):
+    """距离指定坐标最近的 k 个星系"""
+    try:
+        index = await game_data_api.get_index()
+        spatial_index = index.derived('spatial', SpatialIndex.from_index)
+        results = []
+        for position, distance in spatial_index.nearest(x, y, k):
+            system = index.systems[position]
+            results.append({
+                'systemId': system.get('id'),
+                'systemName': system.get('name'),
+                'x': system.get('x', 0.0),
+                'y': system.get('y', 0.0),
+                'distance': distance
+            })
+        return {"results": results, "total": len(results)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/analyzer/best-location/{material_id}")
 async def find_best_location(material_id: int):
     """为特定材料找最佳生产位置"""
     try:
-        systems = await game_data_api.get_systems()
-        locations = SystemAnalyzer.find_best_location_for_material(systems, material_id)
+        index = await game_data_api.get_index()
+        resource_index = index.derived('resources', ResourceIndex.from_index)
+        locations = SystemAnalyzer.find_best_location_for_material(index.systems, material_id, resource_index)
         return {"materialId": material_id, "bestLocations": locations}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -536,8 +763,10 @@ async def advanced_system_search(
     max_distance: Optional[float] = Query(None, ge=0, description="最大距离（光年）"),
     material_filters: Optional[str] = Query(None, description="材料筛选条件，JSON格式：[{\"materialId\": 1, \"minAbundance\": 100}]"),
     min_fertility: Optional[float] = Query(None, ge=0, le=1000, description="最小肥力阈值"),
-    exchange_x: float = Query(0.0, description="交易所X坐标"),
-    exchange_y: float = Query(0.0, description="交易所Y坐标")
+    exchange_x: float = Query(0.0, ge=-settings.MAX_COORDINATE, le=settings.MAX_COORDINATE, description="交易所X坐标"),
+    exchange_y: float = Query(0.0, ge=-settings.MAX_COORDINATE, le=settings.MAX_COORDINATE, description="交易所Y坐标"),
+    distance_mode: str = Query('straight', pattern='^(straight|route)$', description="距离计算方式：straight 直线距离，route 沿相邻关系图的航线距离"),
+    radius: Optional[float] = Query(None, gt=0, le=settings.MAX_NEIGHBOR_RADIUS, description="航线模式下的跳跃半径（光年），默认使用预计算的4光年表")
 ):
     """
     高级星系搜索
@@ -546,9 +775,10 @@ async def advanced_system_search(
     material_filters: 材料筛选条件，JSON字符串格式
     min_fertility: 最小肥力阈值，None表示不限制
     exchange_x, exchange_y: 交易所坐标
+    distance_mode: route 时按到交易所（最近的星系）的最短航线筛选和排序，不可达的星系不返回
     """
     try:
-        systems = await game_data_api.get_systems()
+        index = await game_data_api.get_index()
         
         # 解析材料筛选条件
         parsed_material_filters = None
@@ -560,13 +790,25 @@ async def advanced_system_search(
             except json.JSONDecodeError:
                 raise HTTPException(status_code=400, detail="Invalid JSON format for material_filters")
         
+        # 航线模式：到交易所星系的最短路径树（每个相邻关系图版本计算一次）
+        route_distances = None
+        if distance_mode == 'route':
+            route_engine = await _get_route_engine(index, radius)
+            exchange_node = route_engine.nearest_node(exchange_x, exchange_y)
+            if exchange_node is None:
+                raise HTTPException(status_code=404, detail="Exchange system not found")
+            route_distances = route_engine.route_distances(exchange_node)
+        
         results = SystemAnalyzer.advanced_system_search(
-            systems,
+            index.systems,
             exchange_x=exchange_x,
             exchange_y=exchange_y,
             max_distance=max_distance,
             material_filters=parsed_material_filters,
-            min_fertility=min_fertility
+            min_fertility=min_fertility,
+            resource_index=index.derived('resources', ResourceIndex.from_index),
+            spatial_index=index.derived('spatial', SpatialIndex.from_index),
+            route_distances=route_distances
         )
         
         return {
@@ -576,7 +818,8 @@ async def advanced_system_search(
                 "maxDistance": max_distance,
                 "materialFilters": parsed_material_filters,
                 "minFertility": min_fertility,
-                "exchangeLocation": {"x": exchange_x, "y": exchange_y}
+                "exchangeLocation": {"x": exchange_x, "y": exchange_y},
+                "distanceMode": distance_mode
             }
         }
     except HTTPException:
@@ -584,181 +827,63 @@ async def advanced_system_search(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _parse_material_filters(material_filters: str) -> List[Dict[str, Any]]:
+    """解析星系群/区域搜索的材料筛选条件（非空JSON列表）"""
+    try:
+        parsed_material_filters = json.loads(material_filters)
+        if not isinstance(parsed_material_filters, list) or len(parsed_material_filters) == 0:
+            raise ValueError("material_filters must be a non-empty list")
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON format for material_filters")
+    return parsed_material_filters
+
+def _parse_excluded_tiers(excluded_planet_tiers: Optional[str]) -> set:
+    """解析排除的行星等级（JSON列表）"""
+    excluded_tiers_set = set()
+    if excluded_planet_tiers:
+        try:
+            parsed_excluded_tiers = json.loads(excluded_planet_tiers)
+            if isinstance(parsed_excluded_tiers, list):
+                excluded_tiers_set = set(parsed_excluded_tiers)
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid JSON format for excluded_planet_tiers")
+    return excluded_tiers_set
+
 @app.get("/api/analyzer/system-group-search")
 async def system_group_search(
     material_filters: str = Query(..., description="材料筛选条件，JSON格式：[{\"materialId\": 1, \"minAbundance\": 100}]"),
     excluded_planet_tiers: Optional[str] = Query(None, description="排除的行星等级，JSON格式：[3, 4]"),
     exchange_x: float = Query(3334.0, description="交易所X坐标"),
-    exchange_y: float = Query(1425.0, description="交易所Y坐标")
+    exchange_y: float = Query(1425.0, description="交易所Y坐标"),
+    radius: Optional[float] = Query(None, gt=0, le=settings.MAX_NEIGHBOR_RADIUS, description="相邻星系的跳跃半径（光年），默认使用预计算的4光年表")
 ):
     """
-    星系群搜索（使用预计算的相邻关系表，4光年）
+    星系群搜索（默认使用预计算的相邻关系表，4光年；指定 radius 时按坐标生成相邻关系）
     
     material_filters: 材料筛选条件，JSON字符串格式（必需）
     exchange_x, exchange_y: 交易所坐标
+    radius: 跳跃半径（光年）
     """
     try:
-        systems = await game_data_api.get_systems()
-        systems_by_id = {system.get('id'): system for system in systems}
-        
-        # 解析材料筛选条件
-        try:
-            parsed_material_filters = json.loads(material_filters)
-            if not isinstance(parsed_material_filters, list) or len(parsed_material_filters) == 0:
-                raise ValueError("material_filters must be a non-empty list")
-        except json.JSONDecodeError:
-            raise HTTPException(status_code=400, detail="Invalid JSON format for material_filters")
+        index = await game_data_api.get_index()
         
-        # 解析排除的行星等级
-        excluded_tiers_set = set()
-        if excluded_planet_tiers:
-            try:
-                parsed_excluded_tiers = json.loads(excluded_planet_tiers)
-                if isinstance(parsed_excluded_tiers, list):
-                    excluded_tiers_set = set(parsed_excluded_tiers)
-            except json.JSONDecodeError:
-                raise HTTPException(status_code=400, detail="Invalid JSON format for excluded_planet_tiers")
+        # 解析筛选条件
+        parsed_material_filters = _parse_material_filters(material_filters)
+        excluded_tiers_set = _parse_excluded_tiers(excluded_planet_tiers)
         
-        # 获取相邻关系表
-        neighbors_map = game_data_api.get_system_neighbors()
-        if not neighbors_map:
+        # 获取相邻关系图
+        neighbor_graph = await game_data_api.get_neighbor_graph_for_radius(radius)
+        if not neighbor_graph:
             raise HTTPException(status_code=500, detail="无法加载星系相邻关系表")
         
-        # 检查单个星系是否满足材料筛选条件（基于单个星球的丰度）
-        def check_system_meets_filters(system: Dict[str, Any]) -> bool:
-            planets = system.get('planets', []) or []
-            if not isinstance(planets, list) or len(planets) == 0:
-                return False
-            
-            # 过滤掉被排除的行星等级
-            filtered_planets = []
-            for planet in planets:
-                planet_tier = planet.get('tier')
-                if planet_tier is None or planet_tier not in excluded_tiers_set:
-                    filtered_planets.append(planet)
-            
-            # 如果没有符合条件的行星，返回False
-            if len(filtered_planets) == 0:
-                return False
-            
-            # 检查每个材料筛选条件
-            for filter_item in parsed_material_filters:
-                material_id = filter_item.get('materialId')
-                min_abundance = filter_item.get('minAbundance', 0)
-                
-                # 检查是否有至少一个符合条件的行星满足该材料的丰度要求
-                found = False
-                for planet in filtered_planets:
-                    resources = planet.get('mats', [])
-                    if not isinstance(resources, list):
-                        resources = []
-                    for resource in resources:
-                        if resource.get('id') == material_id:
-                            abundance = resource.get('ab', 0)
-                            if abundance >= min_abundance:
-                                found = True
-                                break
-                    if found:
-                        break
-                
-                if not found:
-                    return False
-            
-            return True
-        
-        results = []
-        
-        # 遍历所有星系作为潜在的中心星系
-        for center_system in systems:
-            center_id = center_system.get('id')
-            if center_id is None:
-                continue
-            
-            # 检查中心星系是否满足材料筛选条件
-            if not check_system_meets_filters(center_system):
-                continue
-            
-            # 从相邻关系表获取相邻星系ID
-            system_key = str(center_id)
-            if system_key not in neighbors_map:
-                continue
-            
-            neighbor_data = neighbors_map[system_key]
-            neighbor_list = neighbor_data.get('neighbors', [])
-            
-            if len(neighbor_list) == 0:
-                continue
-            
-            # 获取相邻星系的完整数据
-            neighbor_systems = []
-            for neighbor_info in neighbor_list:
-                neighbor_id = neighbor_info.get('systemId')
-                if neighbor_id and neighbor_id in systems_by_id:
-                    neighbor_systems.append(systems_by_id[neighbor_id])
-            
-            if len(neighbor_systems) == 0:
-                continue
-            
-            # 计算中心星系到交易所的距离
-            center_x = center_system.get('x', 0.0)
-            center_y = center_system.get('y', 0.0)
-            distance_to_exchange = SystemAnalyzer.calculate_distance(
-                exchange_x, exchange_y, center_x, center_y
-            )
-            
-            # 聚合资源（中心星系 + 相邻星系）
-            all_systems = [center_system] + neighbor_systems
-            resource_summary = {}
-            total_planets = 0
-            max_fertility = 0
-            
-            for system in all_systems:
-                planets = system.get('planets', []) or []
-                if not isinstance(planets, list):
-                    planets = []
-                total_planets += len(planets)
-                
-                for planet in planets:
-                    resources = planet.get('mats', [])
-                    if not isinstance(resources, list):
-                        resources = []
-                    
-                    fertility = planet.get('fert', 0)
-                    if fertility > max_fertility:
-                        max_fertility = fertility
-                    
-                    for resource in resources:
-                        mat_id = resource.get('id')
-                        abundance = resource.get('ab', 0)
-                        
-                        if mat_id not in resource_summary:
-                            resource_summary[mat_id] = {
-                                'materialId': mat_id,
-                                'totalAbundance': 0,
-                                'planetCount': 0,
-                                'maxAbundance': 0
-                            }
-                        
-                        resource_summary[mat_id]['totalAbundance'] += abundance
-                        resource_summary[mat_id]['planetCount'] += 1
-                        if abundance > resource_summary[mat_id]['maxAbundance']:
-                            resource_summary[mat_id]['maxAbundance'] = abundance
-            
-            results.append({
-                'systemId': center_id,
-                'systemName': center_system.get('name', f'System {center_id}'),
-                'x': center_x,
-                'y': center_y,
-                'distanceToExchange': distance_to_exchange,
-                'planetCount': total_planets,
-                'maxFertility': max_fertility,
-                'resources': list(resource_summary.values()),
-                'neighborSystemIds': [s.get('id') for s in neighbor_systems],
-                'neighborCount': len(neighbor_systems)
-            })
-        
-        # 按距离排序
-        results.sort(key=lambda x: x['distanceToExchange'])
+        # 中心星系筛选（位图求交）与群内资源聚合由搜索引擎完成
+        engine = group_search_engines.get(index, neighbor_graph)
+        results = engine.search(
+            parsed_material_filters,
+            excluded_tiers=excluded_tiers_set,
+            exchange_x=exchange_x,
+            exchange_y=exchange_y
+        )
         
         return {
             "results": results,
@@ -766,7 +891,7 @@ async def system_group_search(
             "filters": {
                 "materialFilters": parsed_material_filters,
                 "exchangeLocation": {"x": exchange_x, "y": exchange_y},
-                "neighborDistance": 4.0
+                "neighborDistance": neighbor_graph.radius
             }
         }
     except HTTPException:
@@ -774,18 +899,228 @@ async def system_group_search(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/analyzer/cluster-search")
+async def cluster_search(
+    system_ids: str = Query(..., description="起点星系ID，逗号分隔"),
+    hops: int = Query(3, ge=0, le=settings.MAX_CLUSTER_HOPS, description="最大跳数"),
+    material_filters: Optional[str] = Query(None, description="可选，只经过满足条件的星系，JSON格式：[{\"materialId\": 1, \"minAbundance\": 100}]"),
+    excluded_planet_tiers: Optional[str] = Query(None, description="排除的行星等级，JSON格式：[3, 4]"),
+    radius: Optional[float] = Query(None, gt=0, le=settings.MAX_NEIGHBOR_RADIUS, description="相邻星系的跳跃半径（光年），默认使用预计算的4光年表"),
+    max_nodes: int = Query(settings.MAX_CLUSTER_NODES, ge=1, le=settings.MAX_CLUSTER_NODES, description="最多返回的星系数")
+):
+    """
+    多跳邻域搜索：距离任一起点不超过 hops 跳的所有星系，并汇总资源
+    
+    system_ids: 起点星系ID（多个起点时为多源BFS）
+    material_filters: 指定时只经过满足条件的星系（"每个星系都有X"的区域）
+    """
+    try:
+        index = await game_data_api.get_index()
+        try:
+            source_ids = [int(i.strip()) for i in system_ids.split(',') if i.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid system_ids")
+        parsed_material_filters = _parse_material_filters(material_filters) if material_filters else None
+        excluded_tiers_set = _parse_excluded_tiers(excluded_planet_tiers)
+        
+        neighbor_graph = await game_data_api.get_neighbor_graph_for_radius(radius)
+        if not neighbor_graph:
+            raise HTTPException(status_code=500, detail="无法加载星系相邻关系表")
+        if not any(i in neighbor_graph for i in source_ids):
+            raise HTTPException(status_code=404, detail="Start systems not found")
+        
+        engine = group_search_engines.get(index, neighbor_graph)
+        region = engine.k_hop_region(
+            source_ids, hops, max_nodes,
+            material_filters=parsed_material_filters,
+            excluded_tiers=excluded_tiers_set
+        )
+        return {
+            **region,
+            "filters": {
+                "hops": hops,
+                "materialFilters": parsed_material_filters,
+                "neighborDistance": neighbor_graph.radius,
+                "maxNodes": max_nodes
+            }
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/analyzer/connected-regions")
+async def connected_regions(
+    material_filters: str = Query(..., description="材料筛选条件，JSON格式：[{\"materialId\": 1, \"minAbundance\": 100}]"),
+    excluded_planet_tiers: Optional[str] = Query(None, description="排除的行星等级，JSON格式：[3, 4]"),
+    radius: Optional[float] = Query(None, gt=0, le=settings.MAX_NEIGHBOR_RADIUS, description="相邻星系的跳跃半径（光年），默认使用预计算的4光年表"),
+    min_size: int = Query(2, ge=1, description="最小区域星系数"),
+    limit: int = Query(50, ge=1, le=500, description="最多返回的区域数")
+):
+    """
+    连通区域搜索：区域内每个星系都满足材料筛选条件，按相邻关系图连通
+    
+    结果按区域星系数降序
+    """
+    try:
+        index = await game_data_api.get_index()
+        parsed_material_filters = _parse_material_filters(material_filters)
+        excluded_tiers_set = _parse_excluded_tiers(excluded_planet_tiers)
+        
+        neighbor_graph = await game_data_api.get_neighbor_graph_for_radius(radius)
+        if not neighbor_graph:
+            raise HTTPException(status_code=500, detail="无法加载星系相邻关系表")
+        
+        engine = group_search_engines.get(index, neighbor_graph)
+        regions, total = engine.connected_regions(
+            parsed_material_filters, excluded_tiers_set, min_size, limit
+        )
+        return {
+            "regions": regions,
+            "total": total,
+            "filters": {
+                "materialFilters": parsed_material_filters,
+                "neighborDistance": neighbor_graph.radius,
+                "minSize": min_size
+            }
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ==================== 航线规划API ====================
+
+async def _get_route_engine(index, radius: Optional[float] = None) -> RouteEngine:
+    """获取指定跳跃半径的航线规划引擎"""
+    neighbor_graph = await game_data_api.get_neighbor_graph_for_radius(radius)
+    if not neighbor_graph:
+        raise HTTPException(status_code=500, detail="无法加载星系相邻关系表")
+    return route_engines.get(index, neighbor_graph)
+
+@app.get("/api/routing/path")
+async def find_route(
+    from_id: int = Query(..., description="起点星系ID"),
+    to_id: int = Query(..., description="终点星系ID"),
+    radius: Optional[float] = Query(None, gt=0, le=settings.MAX_NEIGHBOR_RADIUS, description="跳跃半径（光年），默认使用预计算的4光年表")
+):
+    """两个星系之间的最短航线（A*，按光年计）"""
+    try:
+        index = await game_data_api.get_index()
+        route_engine = await _get_route_engine(index, radius)
+        if route_engine.node_of(from_id) is None or route_engine.node_of(to_id) is None:
+            raise HTTPException(status_code=404, detail="System not found")
+        
+        route = route_engine.shortest_path(from_id, to_id)
+        if route is None:
+            raise HTTPException(status_code=404, detail="No route between systems")
+        return {"fromId": from_id, "toId": to_id, "neighborDistance": route_engine.graph.radius, **route}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/routing/to-exchange")
+async def routes_to_exchange(
+    system_ids: str = Query(..., description="起点星系ID，逗号分隔"),
+    exchange_x: float = Query(3334.0, ge=-settings.MAX_COORDINATE, le=settings.MAX_COORDINATE, description="交易所X坐标"),
+    exchange_y: float = Query(1425.0, ge=-settings.MAX_COORDINATE, le=settings.MAX_COORDINATE, description="交易所Y坐标"),
+    radius: Optional[float] = Query(None, gt=0, le=settings.MAX_NEIGHBOR_RADIUS, description="跳跃半径（光年），默认使用预计算的4光年表"),
+    include_path: bool = Query(True, description="是否返回途经星系")
+):
+    """多个星系到交易所（距离交易所坐标最近的星系）的最短航线"""
+    try:
+        index = await game_data_api.get_index()
+        try:
+            ids = [int(i.strip()) for i in system_ids.split(',') if i.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid system_ids")
+        
+        route_engine = await _get_route_engine(index, radius)
+        exchange_node = route_engine.nearest_node(exchange_x, exchange_y)
+        if exchange_node is None:
+            raise HTTPException(status_code=404, detail="Exchange system not found")
+        
+        routes = []
+        for system_id in ids:
+            route = route_engine.path_in_tree(exchange_node, system_id)
+            if route is None:
+                routes.append({"systemId": system_id, "reachable": False})
+                continue
+            if not include_path:
+                route.pop('path')
+            routes.append({"systemId": system_id, "reachable": True, **route})
+        
+        return {
+            "exchangeSystemId": route_engine.graph.ids[exchange_node],
+            "neighborDistance": route_engine.graph.radius,
+            "routes": routes
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # ==================== 缓存管理API ====================
 
 @app.post("/api/cache/clear")
 async def clear_cache():
     """清空所有缓存"""
     cache_manager.clear()
+    result_cache.clear()
+    prerendered_cache.clear()
     return {"message": "Cache cleared successfully"}
 
 @app.get("/api/cache/stats")
 async def get_cache_stats():
     """获取缓存统计信息"""
-    return cache_manager.get_stats()
+    return {
+        **cache_manager.get_stats(),
+        "result_cache": result_cache.get_stats(),
+        "prerendered": prerendered_cache.get_stats(),
+        "single_flight": single_flight_stats()
+    }
+
+# ==================== 快照推送API ====================
+
+def _hello_message() -> Message:
+    """新连接收到的第一条消息：当前价格/详情版本号（与本地版本不一致时应先调用增量接口）"""
+    return Message('hello', {
+        'prices': exchange_api.price_changes.version,
+        'details': exchange_api.details_changes.version
+    })
+
+@app.get("/api/events")
+async def stream_events():
+    """Server-Sent Events：新的价格/详情快照发布时推送版本号与变化的 matId"""
+    if broadcaster.full:
+        raise HTTPException(status_code=503, detail="Too many subscribers")
+    return StreamingResponse(
+        broadcaster.stream_sse(_hello_message()),
+        media_type="text/event-stream",
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.websocket("/api/ws/events")
+async def websocket_events(websocket: WebSocket):
+    """WebSocket：推送内容与 /api/events 相同"""
+    # 先完成握手再关闭，客户端才能收到关闭码（握手前关闭会被当作 HTTP 403 拒绝）
+    await websocket.accept()
+    subscriber = broadcaster.subscribe()
+    if subscriber is None:
+        # 1013: Try Again Later
+        await websocket.close(code=1013)
+        return
+    await broadcaster.relay_websocket(websocket, subscriber, _hello_message())
+
+@app.get("/api/events/stats")
+async def get_event_stats():
+    """获取推送通道统计信息"""
+    return {
+        **broadcaster.get_stats(),
+        "prices": exchange_api.price_changes.get_stats(),
+        "details": exchange_api.details_changes.get_stats()
+    }
 
 # ==================== 速率限制API ====================
 
@@ -884,32 +1219,16 @@ async def analyze_comprehensive_recipe_profits(
     debug: 开启调试模式，显示详细信息
     """
     try:
-        # 获取游戏数据
-        recipes = await game_data_api.get_recipes()
-        buildings = await game_data_api.get_buildings()
-        materials = await game_data_api.get_materials()
-        
-        # 获取价格数据
-        prices_response = await exchange_api.get_material_prices()
-        
-        # 转换价格数据
-        material_prices = {}
-        if isinstance(prices_response, list):
-            for price in prices_response:
-                material_prices[price.get('matId')] = price
-        elif isinstance(prices_response, dict) and 'prices' in prices_response:
-            for price in prices_response['prices']:
-                material_prices[price.get('matId')] = price
-        
-        # 创建材料名称映射
-        materials_by_name = {}
-        for material in materials:
-            name = material.get('sName') or material.get('name')
-            if name:
-                materials_by_name[name] = material
-        
-        # 创建建筑ID映射
-        buildings_by_id = {b.get('id'): b for b in buildings}
+        # 获取游戏数据索引
+        index = await game_data_api.get_index()
+        recipes = index.get_recipes_for_building(building_id)
+        
+        # 获取价格表（每个价格备份版本构建一次）
+        material_prices = await exchange_api.get_price_table()
+        
+        # 材料名称映射、建筑ID映射（快照索引中预先构建）
+        materials_by_name = index.materials_by_name
+        buildings_by_id = index.buildings_by_id
         
         # 调试信息
         debug_info = {
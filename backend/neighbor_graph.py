@@ -0,0 +1,460 @@
+"""
+GT2See 星系相邻关系图（CSR 压缩邻接表）
+offsets / neighbors / distances 三个连续数组代替 system_neighbors.json 的嵌套字典；
+预计算表首次加载后写入紧凑的二进制缓存文件，之后通过 mmap 直接映射。
+其它跳跃半径的相邻关系图由星系坐标按需生成，并按半径做 LRU 缓存
+"""
+import array
+import itertools
+import json
+import mmap
+import os
+import struct
+import sys
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from spatial_index import SpatialIndex
+
+# 预计算相邻关系表的跳跃距离（光年）
+DEFAULT_NEIGHBOR_DISTANCE = 4.0
+
+# 二进制缓存文件格式：
+#   头部（64字节）：魔数、格式版本、字节序、节点数、边数、半径、源文件 size / mtime_ns
+#   int32 ids[n] | int32 offsets[n+1] | int32 neighbors[m] | float32 distances[m]
+_MAGIC = b'GTNG'
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct('<4sIBxxxIIdqq')
+_HEADER_SIZE = 64
+_BYTE_ORDER = 0 if sys.byteorder == 'little' else 1
+
+# 图版本号（每构建/加载一次递增，便于依赖图的结果按版本缓存）
+_graph_version_counter = itertools.count(1)
+
+
+class NeighborGraph:
+    """
+    CSR 格式的星系邻接图
+
+    节点按位置编号：ids[i] 为星系ID，节点 i 的邻居为
+    neighbors[offsets[i]:offsets[i+1]]（节点位置），对应距离为 distances 的同一区间
+    """
+
+    def __init__(
+        self,
+        ids: Sequence[int],
+        offsets: Sequence[int],
+        neighbors: Sequence[int],
+        distances: Sequence[float],
+        radius: float = DEFAULT_NEIGHBOR_DISTANCE,
+        source: str = 'memory'
+    ):
+        self.ids = ids
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.distances = distances
+        self.radius = radius
+        self.source = source
+        self.version = next(_graph_version_counter)
+        self.position_of: Dict[int, int] = {system_id: i for i, system_id in enumerate(ids)}
+
+    @classmethod
+    def from_adjacency(
+        cls,
+        adjacency: List[Tuple[int, List[Tuple[int, float]]]],
+        radius: float = DEFAULT_NEIGHBOR_DISTANCE,
+        source: str = 'memory'
+    ) -> 'NeighborGraph':
+        """
+        从邻接列表构建
+
+        Args:
+            adjacency: [(星系ID, [(邻居星系ID, 距离), ...]), ...]，保持原始顺序
+            radius: 跳跃距离（光年）
+        """
+        ids = array.array('i', (system_id for system_id, _ in adjacency))
+        position_of = {system_id: i for i, system_id in enumerate(ids)}
+
+        offsets = array.array('i', [0])
+        neighbors = array.array('i')
+        distances = array.array('f')
+        for _, neighbor_list in adjacency:
+            for neighbor_id, distance in neighbor_list:
+                position = position_of.get(neighbor_id)
+                # 邻居不在节点表中时忽略（无法参与遍历）
+                if position is None:
+                    continue
+                neighbors.append(position)
+                distances.append(distance)
+            offsets.append(len(neighbors))
+        return cls(ids, offsets, neighbors, distances, radius, source)
+
+    @classmethod
+    def from_neighbors_json(cls, neighbors_map: Dict[str, Any]) -> 'NeighborGraph':
+        """从 system_neighbors.json 的字典结构构建"""
+        adjacency = []
+        for key, entry in neighbors_map.items():
+            system_id = entry.get('systemId', int(key))
+            neighbor_list = [
+                (neighbor.get('systemId'), neighbor.get('distance', 0.0))
+                for neighbor in entry.get('neighbors', [])
+                if neighbor.get('systemId')
+            ]
+            adjacency.append((system_id, neighbor_list))
+        return cls.from_adjacency(adjacency, DEFAULT_NEIGHBOR_DISTANCE, 'json')
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.neighbors)
+
+    def __contains__(self, system_id: int) -> bool:
+        return system_id in self.position_of
+
+    def neighbor_positions(self, position: int) -> Sequence[int]:
+        """节点的邻居位置（CSR 区间切片）"""
+        return self.neighbors[self.offsets[position]:self.offsets[position + 1]]
+
+    def neighbor_ids(self, system_id: int) -> Optional[List[int]]:
+        """
+        获取星系的相邻星系ID列表
+
+        Returns:
+            邻居星系ID列表（保持原始顺序）；星系不在图中时返回None
+        """
+        position = self.position_of.get(system_id)
+        if position is None:
+            return None
+        ids = self.ids
+        return [ids[p] for p in self.neighbor_positions(position)]
+
+    def iter_edges(self, position: int) -> Iterator[Tuple[int, float]]:
+        """遍历节点的 (邻居位置, 距离)"""
+        start = self.offsets[position]
+        end = self.offsets[position + 1]
+        return zip(self.neighbors[start:end], self.distances[start:end])
+
+    def nbytes(self) -> int:
+        """CSR 数组占用的字节数"""
+        return sum(
+            len(a) * 4 for a in (self.ids, self.offsets, self.neighbors, self.distances)
+        )
+
+    def to_bytes(self, source_size: int = 0, source_mtime_ns: int = 0) -> bytes:
+        """序列化为二进制缓存格式"""
+        header = _HEADER.pack(
+            _MAGIC, _FORMAT_VERSION, _BYTE_ORDER,
+            len(self.ids), len(self.neighbors), float(self.radius),
+            source_size, source_mtime_ns
+        ).ljust(_HEADER_SIZE, b'\0')
+        return b''.join([
+            header,
+            array.array('i', self.ids).tobytes(),
+            array.array('i', self.offsets).tobytes(),
+            array.array('i', self.neighbors).tobytes(),
+            array.array('f', self.distances).tobytes(),
+        ])
+
+    @classmethod
+    def from_buffer(
+        cls,
+        buffer,
+        source_size: Optional[int] = None,
+        source_mtime_ns: Optional[int] = None,
+        source: str = 'binary'
+    ) -> Optional['NeighborGraph']:
+        """
+        从二进制缓存（bytes 或 mmap）构建，数组直接引用缓冲区不复制
+
+        Args:
+            buffer: 缓存内容
+            source_size, source_mtime_ns: 源 JSON 的 size / mtime_ns，不一致时视为过期
+
+        Returns:
+            邻接图；格式不符或已过期时返回None
+        """
+        view = memoryview(buffer)
+        if len(view) < _HEADER_SIZE:
+            return None
+        magic, format_version, byte_order, n, m, radius, size, mtime_ns = _HEADER.unpack_from(view, 0)
+        if magic != _MAGIC or format_version != _FORMAT_VERSION or byte_order != _BYTE_ORDER:
+            return None
+        if source_size is not None and (size != source_size or mtime_ns != source_mtime_ns):
+            return None
+        if len(view) != _HEADER_SIZE + 4 * (n + (n + 1) + m + m):
+            return None
+
+        offset = _HEADER_SIZE
+        sections = []
+        for length, fmt in ((n, 'i'), (n + 1, 'i'), (m, 'i'), (m, 'f')):
+            sections.append(view[offset:offset + 4 * length].cast(fmt))
+            offset += 4 * length
+        ids, offsets, neighbors, distances = sections
+        return cls(ids, offsets, neighbors, distances, radius, source)
+
+
+def _map_file(path: str):
+    """只读映射文件（空文件无法映射时直接读取）"""
+    with open(path, 'rb') as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return f.read()
+
+
+def load_neighbor_graph(json_path: str, cache_path: Optional[str] = None) -> Optional[NeighborGraph]:
+    """
+    加载预计算的相邻关系图
+
+    优先映射与源 JSON 匹配的二进制缓存；缓存缺失或过期时解析 JSON，
+    并尽量写入新的缓存（写入失败不影响返回结果）
+
+    Args:
+        json_path: system_neighbors.json 路径
+        cache_path: 二进制缓存路径，默认与 JSON 同目录的 .bin 文件
+
+    Returns:
+        邻接图；两种数据源都不可用时返回None
+    """
+    if cache_path is None:
+        cache_path = os.path.splitext(json_path)[0] + '.bin'
+
+    source_stat = os.stat(json_path) if os.path.exists(json_path) else None
+
+    if os.path.exists(cache_path):
+        try:
+            buffer = _map_file(cache_path)
+            if source_stat is None:
+                # 只有缓存时不做过期检查
+                graph = NeighborGraph.from_buffer(buffer)
+            else:
+                graph = NeighborGraph.from_buffer(buffer, source_stat.st_size, source_stat.st_mtime_ns)
+            if graph is not None:
+                return graph
+        except Exception as e:
+            print(f"警告：无法读取星系相邻关系缓存: {e}")
+
+    if source_stat is None:
+        return None
+
+    with open(json_path, 'r', encoding='utf-8') as f:
+        graph = NeighborGraph.from_neighbors_json(json.load(f))
+
+    try:
+        tmp_path = cache_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(graph.to_bytes(source_stat.st_size, source_stat.st_mtime_ns))
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        print(f"警告：无法写入星系相邻关系缓存: {e}")
+
+    return graph
+
+
+def bfs_hops(
+    graph: NeighborGraph,
+    sources: Iterable[int],
+    max_hops: int,
+    max_nodes: Optional[int] = None,
+    allowed: Optional[Callable[[int], bool]] = None
+) -> Tuple[Dict[int, int], bool]:
+    """
+    多源广度优先搜索（按跳数分层）
+
+    Args:
+        graph: 相邻关系图
+        sources: 起点节点位置
+        max_hops: 最大跳数
+        max_nodes: 最多访问的节点数，达到后提前结束
+        allowed: 节点过滤函数，不满足的节点既不访问也不经过
+
+    Returns:
+        ({节点位置: 跳数}（按访问顺序）, 是否因 max_nodes 提前结束)
+    """
+    hops: Dict[int, int] = {}
+    frontier = []
+    for source in sources:
+        if source in hops or (allowed is not None and not allowed(source)):
+            continue
+        if max_nodes is not None and len(hops) >= max_nodes:
+            return hops, True
+        hops[source] = 0
+        frontier.append(source)
+
+    depth = 0
+    while frontier and depth < max_hops:
+        depth += 1
+        next_frontier = []
+        for node in frontier:
+            for neighbor in graph.neighbor_positions(node):
+                if neighbor in hops or (allowed is not None and not allowed(neighbor)):
+                    continue
+                if max_nodes is not None and len(hops) >= max_nodes:
+                    return hops, True
+                hops[neighbor] = depth
+                next_frontier.append(neighbor)
+        frontier = next_frontier
+    return hops, False
+
+
+def connected_components(
+    graph: NeighborGraph,
+    allowed: Callable[[int], bool],
+    min_size: int = 1
+) -> List[List[int]]:
+    """
+    只由满足 allowed 的节点组成的连通分量
+
+    Args:
+        graph: 相邻关系图
+        allowed: 节点过滤函数
+        min_size: 最小分量大小
+
+    Returns:
+        分量列表（每个分量为按BFS顺序的节点位置），按起始节点位置排列
+    """
+    visited = bytearray(len(graph))
+    components = []
+    for start in range(len(graph)):
+        if visited[start] or not allowed(start):
+            continue
+        visited[start] = 1
+        component = [start]
+        i = 0
+        while i < len(component):
+            for neighbor in graph.neighbor_positions(component[i]):
+                if not visited[neighbor] and allowed(neighbor):
+                    visited[neighbor] = 1
+                    component.append(neighbor)
+            i += 1
+        if len(component) >= min_size:
+            components.append(component)
+    return components
+
+
+def build_neighbor_graph(
+    systems: List[Dict[str, Any]],
+    radius: float,
+    spatial_index: Optional[SpatialIndex] = None
+) -> NeighborGraph:
+    """
+    由星系坐标生成指定跳跃半径的相邻关系图
+
+    每个星系只查询空间网格中与半径圆相交的单元，整体接近线性；
+    距离与 SystemAnalyzer.calculate_distance 一致（坐标距离除以50），
+    邻居按星系ID升序（与预计算表一致）
+
+    Args:
+        systems: 星系数据列表
+        radius: 跳跃半径（光年，包含边界）
+        spatial_index: 与 systems 对应的空间索引，None时临时构建
+    """
+    if spatial_index is None:
+        spatial_index = SpatialIndex(systems)
+
+    adjacency = []
+    for position, system in enumerate(systems):
+        system_id = system.get('id')
+        if system_id is None:
+            continue
+        neighbor_list = []
+        for neighbor_position, distance in spatial_index.within(
+            spatial_index.xs[position], spatial_index.ys[position], radius
+        ):
+            neighbor_id = systems[neighbor_position].get('id')
+            if neighbor_position != position and neighbor_id is not None:
+                neighbor_list.append((neighbor_id, distance))
+        neighbor_list.sort()
+        adjacency.append((system_id, neighbor_list))
+    return NeighborGraph.from_adjacency(adjacency, radius, 'generated')
+
+
+class NeighborGraphCache:
+    """按 (游戏数据版本, 跳跃半径) 缓存生成的相邻关系图（LRU）"""
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self._graphs: "OrderedDict[Tuple[int, float], NeighborGraph]" = OrderedDict()
+        self.builds = 0
+
+    def get(self, index, radius: float) -> NeighborGraph:
+        """
+        获取游戏数据索引在指定半径下的相邻关系图，缺失时生成
+
+        Args:
+            index: 游戏数据索引（GameDataIndex）
+            radius: 跳跃半径（光年）
+        """
+        graph = self.lookup(index, radius)
+        if graph is None:
+            graph = build_neighbor_graph(
+                index.systems, radius, index.derived('spatial', SpatialIndex.from_index)
+            )
+            self.store(index, radius, graph)
+        return graph
+
+    def lookup(self, index, radius: float) -> Optional[NeighborGraph]:
+        """获取已缓存的相邻关系图，不存在时返回None（不生成）"""
+        key = (index.version, float(radius))
+        graph = self._graphs.get(key)
+        if graph is not None:
+            self._graphs.move_to_end(key)
+        return graph
+
+    def store(self, index, radius: float, graph: NeighborGraph):
+        """缓存生成的相邻关系图"""
+        self.builds += 1
+        self._graphs[(index.version, float(radius))] = graph
+        while len(self._graphs) > self.max_entries:
+            self._graphs.popitem(last=False)
+
+    def clear(self):
+        self._graphs.clear()
+
+    def get_stats(self) -> dict:
+        return {
+            "graphs": [
+                {"version": version, "radius": radius, "edges": graph.edge_count, "bytes": graph.nbytes()}
+                for (version, radius), graph in self._graphs.items()
+            ],
+            "builds": self.builds,
+        }
+
+
+class GraphEngineCache:
+    """按 (游戏数据版本, 相邻关系图版本) 缓存基于相邻关系图的计算引擎（LRU）"""
+
+    def __init__(self, factory: Callable[[Any, NeighborGraph], Any], max_entries: int = 8):
+        """
+        Args:
+            factory: 构建函数 factory(index, graph)
+            max_entries: 最多缓存的引擎数量
+        """
+        self.factory = factory
+        self.max_entries = max_entries
+        self._engines: "OrderedDict[Tuple[int, int], Any]" = OrderedDict()
+
+    def get(self, index, graph: NeighborGraph) -> Any:
+        """
+        获取游戏数据索引与相邻关系图对应的引擎，缺失时构建
+
+        Args:
+            index: 游戏数据索引（GameDataIndex）
+            graph: 相邻关系图
+        """
+        key = (index.version, graph.version)
+        engine = self._engines.get(key)
+        if engine is not None:
+            self._engines.move_to_end(key)
+            return engine
+
+        engine = self.factory(index, graph)
+        self._engines[key] = engine
+        while len(self._engines) > self.max_entries:
+            self._engines.popitem(last=False)
+        return engine
+
+    def clear(self):
+        self._engines.clear()
@@ -0,0 +1,160 @@
+"""
+GT2See 交易所详情索引与订单簿深度索引
+每个交易所详情备份版本构建一次：详情记录按 matId 索引；按材料把卖单按价格排序并计算
+累计数量/累计金额前缀和，买入 Q 个单位的成本与成交均价（VWAP）通过二分查找在 O(log n) 内得到
+"""
+from bisect import bisect_left
+from typing import Dict, Any, List, Optional
+
+
+class MaterialDepth:
+    """单个材料的卖单深度（价格升序）"""
+
+    __slots__ = ('mat_id', 'prices', 'cumulative_qty', 'cumulative_cost')
+
+    def __init__(self, mat_id: int, orders: List[Dict[str, Any]]):
+        self.mat_id = mat_id
+        levels = sorted(
+            (o.get('unitPrice'), o.get('qty')) for o in orders
+            if isinstance(o, dict) and (o.get('unitPrice') or 0) > 0 and (o.get('qty') or 0) > 0
+        )
+        self.prices: List[float] = []
+        self.cumulative_qty: List[float] = []
+        self.cumulative_cost: List[float] = []
+        total_qty = 0
+        total_cost = 0
+        for price, qty in levels:
+            total_qty += qty
+            total_cost += price * qty
+            self.prices.append(price)
+            self.cumulative_qty.append(total_qty)
+            self.cumulative_cost.append(total_cost)
+
+    @property
+    def total_qty(self) -> float:
+        """订单簿上可买入的总数量"""
+        return self.cumulative_qty[-1] if self.cumulative_qty else 0
+
+    @property
+    def best_price(self) -> Optional[float]:
+        """最低卖价"""
+        return self.prices[0] if self.prices else None
+
+    def cost_to_buy(self, quantity: float) -> Optional[float]:
+        """
+        按价格从低到高吃单买入 quantity 个单位的总成本
+
+        Returns:
+            总成本；深度不足时返回None
+        """
+        if quantity <= 0:
+            return 0
+        level = bisect_left(self.cumulative_qty, quantity)
+        if level >= len(self.prices):
+            return None
+        filled_qty = self.cumulative_qty[level - 1] if level > 0 else 0
+        filled_cost = self.cumulative_cost[level - 1] if level > 0 else 0
+        return filled_cost + (quantity - filled_qty) * self.prices[level]
+
+    def vwap(self, quantity: float) -> Optional[float]:
+        """买入 quantity 个单位的成交均价；深度不足时返回None"""
+        if quantity <= 0:
+            return self.best_price
+        cost = self.cost_to_buy(quantity)
+        return cost / quantity if cost is not None else None
+
+    def quote(self, quantity: float) -> Dict[str, Any]:
+        """买入报价详情（总成本、均价、最差成交价、吃掉的价位数）"""
+        level = bisect_left(self.cumulative_qty, quantity) if quantity > 0 else 0
+        sufficient = level < len(self.prices)
+        cost = self.cost_to_buy(quantity) if sufficient else None
+        best_price = self.best_price
+        vwap = (cost / quantity if quantity > 0 else best_price) if cost is not None else None
+        return {
+            'quantity': quantity,
+            'sufficientDepth': sufficient,
+            'availableQty': self.total_qty,
+            'cost': cost,
+            'vwap': vwap,
+            'bestPrice': best_price,
+            'worstPrice': self.prices[level] if sufficient and self.prices else None,
+            'levelsUsed': level + 1 if sufficient and quantity > 0 else 0,
+            # 相对最低卖价的滑点（百分比）
+            'slippage': (vwap / best_price - 1) * 100 if vwap is not None and best_price else None
+        }
+
+
+class ExchangeDetailsIndex:
+    """
+    交易所详情快照 {matId: 详情记录}（每个详情备份版本构建一次）
+
+    记录引用快照中的原始对象（不复制），调用方必须视为只读；订单簿深度索引首次使用时构建
+    """
+
+    def __init__(self, materials: List[Dict[str, Any]], version: int = 0):
+        self.version = version
+        self._records: Dict[int, Dict[str, Any]] = {}
+        for material in materials:
+            if isinstance(material, dict):
+                self._records.setdefault(material.get('matId'), material)
+        self._depth: Optional['DepthIndex'] = None
+
+    @classmethod
+    def build(cls, payload: Any, version: int = 0) -> 'ExchangeDetailsIndex':
+        """从交易所详情备份（{'materials': [...]} 或列表）构建索引"""
+        if isinstance(payload, dict):
+            materials = payload.get('materials') or []
+        elif isinstance(payload, list):
+            materials = payload
+        else:
+            materials = []
+        return cls(materials, version)
+
+    def get(self, mat_id: int) -> Optional[Dict[str, Any]]:
+        """按 matId 获取详情记录"""
+        return self._records.get(mat_id)
+
+    @property
+    def depth(self) -> 'DepthIndex':
+        """订单簿深度索引"""
+        if self._depth is None:
+            self._depth = DepthIndex(list(self._records.values()), self.version)
+        return self._depth
+
+
+class DepthIndex:
+    """所有材料的订单簿深度索引 {matId: MaterialDepth}（只读）"""
+
+    def __init__(self, materials: List[Dict[str, Any]], version: int = 0):
+        self.version = version
+        self._depths: Dict[int, MaterialDepth] = {}
+        for material in materials:
+            if not isinstance(material, dict):
+                continue
+            mat_id = material.get('matId')
+            self._depths[mat_id] = MaterialDepth(mat_id, material.get('orders') or [])
+
+    @classmethod
+    def build(cls, payload: Any, version: int = 0) -> 'DepthIndex':
+        """从交易所详情备份（{'materials': [...]} 或列表）构建深度索引"""
+        if isinstance(payload, dict):
+            materials = payload.get('materials') or []
+        elif isinstance(payload, list):
+            materials = payload
+        else:
+            materials = []
+        return cls(materials, version)
+
+    def get(self, mat_id: int) -> Optional[MaterialDepth]:
+        """获取材料的深度，无订单簿数据时返回None"""
+        return self._depths.get(mat_id)
+
+    def cost_to_buy(self, mat_id: int, quantity: float) -> Optional[float]:
+        """买入 quantity 个单位的总成本；无数据或深度不足时返回None"""
+        depth = self._depths.get(mat_id)
+        return depth.cost_to_buy(quantity) if depth is not None else None
+
+    def vwap(self, mat_id: int, quantity: float) -> Optional[float]:
+        """买入 quantity 个单位的成交均价；无数据或深度不足时返回None"""
+        depth = self._depths.get(mat_id)
+        return depth.vwap(quantity) if depth is not None else None
@@ -0,0 +1,164 @@
+"""
+GT2See 预渲染响应
+大体积静态数据每个数据版本只序列化一次，同时保存 gzip / brotli 压缩版本，
+并使用强 ETag 支持 304 Not Modified
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+from typing import Any, Callable, Dict, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，缺失时仅提供 gzip
+    brotli = None
+
+# 压缩级别：每个数据版本只压缩一次，可以使用较高的级别
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9
+
+
+def render_json(content: Any) -> bytes:
+    """与 FastAPI JSONResponse 相同的序列化方式"""
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def _accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    """解析 Accept-Encoding 请求头 {编码: q值}"""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, params = part.partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+class PrerenderedPayload:
+    """一份预渲染的响应体（原始、gzip、brotli 三种编码）"""
+
+    def __init__(self, body: bytes):
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.variants: Dict[str, Tuple[bytes, str]] = {
+            'identity': (body, f'"{digest}"'),
+            'gzip': (gzip.compress(body, compresslevel=GZIP_LEVEL), f'"{digest}-gz"'),
+        }
+        if brotli is not None:
+            self.variants['br'] = (brotli.compress(body, quality=BROTLI_QUALITY), f'"{digest}-br"')
+
+    @classmethod
+    def from_content(cls, content: Any) -> 'PrerenderedPayload':
+        return cls(render_json(content))
+
+    def _select_encoding(self, accept_encoding: str) -> str:
+        accepted = _accepted_encodings(accept_encoding)
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and accepted.get(encoding, accepted.get('*', 0)) > 0:
+                return encoding
+        return 'identity'
+
+    def _not_modified(self, if_none_match: str, etag: str) -> bool:
+        """If-None-Match 是否匹配本次返回编码的 ETag（不同编码的 ETag 不互相匹配）"""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == '*':
+            return True
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag.startswith('W/'):
+                # If-None-Match 使用弱比较
+                tag = tag[2:]
+            if tag == etag:
+                return True
+        return False
+
+    def response(self, request: Request) -> Response:
+        """根据请求头返回压缩后的响应或 304"""
+        encoding = self._select_encoding(request.headers.get('accept-encoding', ''))
+        body, etag = self.variants[encoding]
+        headers = {
+            'ETag': etag,
+            'Vary': 'Accept-Encoding',
+            'Cache-Control': 'no-cache',
+        }
+
+        if self._not_modified(request.headers.get('if-none-match', ''), etag):
+            return Response(status_code=304, headers=headers)
+
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return Response(content=body, media_type='application/json', headers=headers)
+
+
+class PrerenderedCache:
+    """按名称保存最新版本的预渲染响应（每个名称只保留一个版本）"""
+
+    def __init__(self):
+        self._payloads: Dict[str, Tuple[Any, PrerenderedPayload]] = {}
+        self._pending: Dict[Tuple[str, Any], asyncio.Task] = {}
+
+    async def get(self, name: str, version: Any, build: Callable[[], Any]) -> PrerenderedPayload:
+        """
+        获取预渲染响应，版本变化时重新渲染（并发请求共享同一次渲染）
+
+        Args:
+            name: 响应名称
+            version: 数据版本
+            build: 构建响应内容的函数（返回可JSON序列化的对象）
+        """
+        cached = self._payloads.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        key = (name, version)
+        task = self._pending.get(key)
+        if task is None:
+            content = build()
+            task = asyncio.ensure_future(asyncio.to_thread(PrerenderedPayload.from_content, content))
+            self._pending[key] = task
+
+            def _finished(done: asyncio.Task):
+                # 渲染任务自身完成时清理与保存结果，与等待者是否被取消无关
+                if self._pending.get(key) is done:
+                    del self._pending[key]
+                if not done.cancelled() and done.exception() is None:
+                    self._payloads[name] = (version, done.result())
+
+            task.add_done_callback(_finished)
+        return await asyncio.shield(task)
+
+    def get_stats(self) -> dict:
+        """获取预渲染缓存统计信息"""
+        return {
+            name: {
+                "version": version,
+                "bytes": {encoding: len(body) for encoding, (body, _) in payload.variants.items()}
+            }
+            for name, (version, payload) in self._payloads.items()
+        }
+
+    def clear(self):
+        """清空所有预渲染响应"""
+        self._payloads.clear()
+
+
+# 全局预渲染响应缓存实例
+prerendered_cache = PrerenderedCache()
@@ -0,0 +1,423 @@
+"""
+GT2See 价格历史存储
+每次备份写入新的价格/详情快照时，把 (时间戳, matId, currentPrice, avgPrice, totalQtyAvailable) 追加到 SQLite：
+按 (matId, ts) 聚簇的 WITHOUT ROWID 表即覆盖索引，按材料+时间范围扫描无需回表；
+只追加相对上一条记录有变化的材料，超过保留期的数据定期删除并增量回收空间；
+写入时同步增量更新 5m/1h/1d 的 OHLC + 成交量汇总，查询历史时只读汇总表
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+from config import settings
+from price_table import is_valid_price
+from backup_service import backup_service
+
+# 每个材料的一条记录：(currentPrice, avgPrice, totalQtyAvailable)
+PricePoint = Tuple[Optional[float], Optional[float], Optional[int]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_points (
+    mat_id INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    current_price REAL,
+    avg_price REAL,
+    total_qty INTEGER,
+    PRIMARY KEY (mat_id, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS price_points_ts ON price_points (ts);
+CREATE TABLE IF NOT EXISTS price_rollups (
+    resolution INTEGER NOT NULL,
+    mat_id INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL,
+    volume INTEGER NOT NULL,
+    samples INTEGER NOT NULL,
+    PRIMARY KEY (resolution, mat_id, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# 范围扫描每批读取的行数
+_SCAN_BATCH = 2000
+
+# 汇总粒度：名称 → (桶宽秒数, 保留天数；None 表示不清理)
+ROLLUP_RESOLUTIONS: Dict[str, Tuple[int, Optional[int]]] = {
+    '5m': (300, 14),
+    '1h': (3600, 180),
+    '1d': (86400, None),
+}
+
+# 汇总桶的字段顺序
+ROLLUP_COLUMNS = ('bucket', 'open', 'high', 'low', 'close', 'volume', 'samples')
+
+# 汇总表结构版本（不一致时从原始记录重建）
+_ROLLUP_FORMAT_VERSION = 1
+
+# 同一个桶内：open 取第一条，close 取最后一条，high/low 忽略 NULL，成交量与样本数累加
+_ROLLUP_UPSERT = """
+INSERT INTO price_rollups (resolution, mat_id, bucket, open, high, low, close, volume, samples)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (resolution, mat_id, bucket) DO UPDATE SET
+    open = COALESCE(open, excluded.open),
+    high = CASE WHEN high IS NULL OR excluded.high > high THEN excluded.high ELSE high END,
+    low = CASE WHEN low IS NULL OR excluded.low < low THEN excluded.low ELSE low END,
+    close = COALESCE(excluded.close, close),
+    volume = volume + excluded.volume,
+    samples = samples + excluded.samples
+"""
+
+
+def _rollup_rows(mat_id: int, ts: int, price: Optional[float], volume: int, samples: int = 1) -> List[Tuple]:
+    """一条价格记录在每个汇总粒度上的 upsert 参数"""
+    return [
+        (width, mat_id, ts - ts % width, price, price, price, price, volume, samples)
+        for width, _ in ROLLUP_RESOLUTIONS.values()
+    ]
+
+
+def _sold_between(previous_qty: Optional[int], total_qty: Optional[int]) -> int:
+    """
+    两次快照之间的成交量估算：挂单总量的减少量
+
+    新挂单与成交同时发生时会被抵消，因此这是成交量的下界近似
+    """
+    if previous_qty is None or total_qty is None or total_qty >= previous_qty:
+        return 0
+    return previous_qty - total_qty
+
+
+@contextmanager
+def _transaction(conn: sqlite3.Connection):
+    """显式事务（连接为 autocommit 模式）：出错时回滚，避免事务一直挂在共享连接上"""
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+class PriceHistoryStore:
+    """
+    价格历史存储（SQLite，首次使用时打开）
+
+    - 追加：每个快照一次事务，只写入有变化的材料
+    - 查询：按材料 + 时间范围扫描（主键有序）
+    - 容量：超过保留期的记录按 ts 索引删除，按间隔执行增量 VACUUM
+    """
+
+    def __init__(self, path: str, retention_days: int, compact_interval: int):
+        self.path = path
+        self.retention_seconds = retention_days * 86400
+        self.compact_interval = compact_interval
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        # 每个材料最后一次写入的值（用于只追加变化）
+        self._latest: Dict[int, PricePoint] = {}
+        self._latest_ts: Dict[int, int] = {}
+        self.appended = 0
+        # 最近一次排队的后台写入（后续写入在其完成后执行）
+        self._ingest_task: Optional[asyncio.Future] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            # auto_vacuum 必须在建表前设置才对新库生效
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.executescript(_SCHEMA)
+            self._latest = {}
+            self._latest_ts = {}
+            for mat_id, ts, current_price, avg_price, total_qty in conn.execute(
+                # SQLite 对 MAX() 聚合的裸列取最大值所在行
+                "SELECT mat_id, MAX(ts), current_price, avg_price, total_qty FROM price_points GROUP BY mat_id"
+            ):
+                self._latest[mat_id] = (current_price, avg_price, total_qty)
+                self._latest_ts[mat_id] = ts
+            row = conn.execute("SELECT value FROM meta WHERE key = 'rollup_version'").fetchone()
+            if row is None or int(row[0]) != _ROLLUP_FORMAT_VERSION:
+                self._rebuild_rollups(conn)
+            self._conn = conn
+        return self._conn
+
+    def _rebuild_rollups(self, conn: sqlite3.Connection):
+        """从原始记录重建全部汇总（汇总表新建或结构版本变化时）"""
+        with _transaction(conn):
+            conn.execute("DELETE FROM price_rollups")
+            previous_mat_id = None
+            previous_qty = None
+            for mat_id, ts, current_price, total_qty in conn.execute(
+                "SELECT mat_id, ts, current_price, total_qty FROM price_points ORDER BY mat_id, ts"
+            ).fetchall():
+                if mat_id != previous_mat_id:
+                    previous_mat_id, previous_qty = mat_id, None
+                conn.executemany(
+                    _ROLLUP_UPSERT, _rollup_rows(mat_id, ts, current_price, _sold_between(previous_qty, total_qty))
+                )
+                previous_qty = total_qty
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('rollup_version', ?)", (str(_ROLLUP_FORMAT_VERSION),)
+            )
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @staticmethod
+    def _extract(payload: Any) -> List[Dict[str, Any]]:
+        """价格备份（{'prices': [...]}）或详情备份（{'materials': [...]}）中的材料记录"""
+        if isinstance(payload, dict):
+            records = payload.get('prices') or payload.get('materials') or []
+        elif isinstance(payload, list):
+            records = payload
+        else:
+            records = []
+        return [r for r in records if isinstance(r, dict) and r.get('matId') is not None]
+
+    def ingest(self, payload: Any, ts: Optional[int] = None) -> int:
+        """
+        追加一个价格/详情快照
+
+        价格备份不含 totalQtyAvailable，沿用该材料上一条记录的值；
+        只有 (currentPrice, avgPrice, totalQtyAvailable) 相对上一条记录有变化的材料才会写入，
+        并在同一事务内更新这些材料所在的 5m/1h/1d 汇总桶
+
+        Args:
+            payload: 价格或详情备份数据
+            ts: 快照时间（Unix秒），默认当前时间
+
+        Returns:
+            写入的记录数
+        """
+        ts = int(ts if ts is not None else time.time())
+        with self._lock:
+            conn = self._connect()
+            rows = []
+            rollups = []
+            # 本次写入后的最新值；事务提交成功后才替换内存状态，失败时下一次写入会重新记录这些材料
+            latest: Dict[int, PricePoint] = {}
+            for record in self._extract(payload):
+                mat_id = record['matId']
+                previous = latest.get(mat_id) or self._latest.get(mat_id, (None, None, None))
+                current_price = record.get('currentPrice')
+                avg_price = record.get('avgPrice')
+                total_qty = record.get('totalQtyAvailable', previous[2])
+                point = (
+                    current_price if is_valid_price(current_price) else None,
+                    avg_price if is_valid_price(avg_price) else None,
+                    total_qty
+                )
+                if point != previous:
+                    rows.append((mat_id, ts) + point)
+                    # 同一时间戳的记录会被覆盖（价格与详情快照同时写入），不重复计入样本数
+                    samples = 0 if mat_id in latest or self._latest_ts.get(mat_id) == ts else 1
+                    rollups.extend(_rollup_rows(mat_id, ts, point[0], _sold_between(previous[2], total_qty), samples))
+                    latest[mat_id] = point
+            if rows:
+                with _transaction(conn):
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO price_points (mat_id, ts, current_price, avg_price, total_qty) "
+                        "VALUES (?, ?, ?, ?, ?)", rows
+                    )
+                    conn.executemany(_ROLLUP_UPSERT, rollups)
+                self._latest.update(latest)
+                self._latest_ts.update(dict.fromkeys(latest, ts))
+                self.appended += len(rows)
+            self._maybe_compact(conn, ts)
+        return len(rows)
+
+    def _maybe_compact(self, conn: sqlite3.Connection, now: int):
+        """距上次压缩超过间隔时删除过期记录并回收空间"""
+        row = conn.execute("SELECT value FROM meta WHERE key = 'last_compaction'").fetchone()
+        if row is not None and now - int(row[0]) < self.compact_interval:
+            return
+        self._compact(conn, now)
+
+    def _compact(self, conn: sqlite3.Connection, now: int) -> int:
+        cutoff = now - self.retention_seconds
+        # 保留每个材料在截止时间之前的最后一条记录，作为范围起点的基准值
+        deleted = conn.execute(
+            "DELETE FROM price_points WHERE ts < ? AND ts < ("
+            "SELECT MAX(p.ts) FROM price_points p WHERE p.mat_id = price_points.mat_id AND p.ts < ?)",
+            (cutoff, cutoff)
+        ).rowcount
+        for width, retention_days in ROLLUP_RESOLUTIONS.values():
+            if retention_days is not None:
+                conn.execute(
+                    "DELETE FROM price_rollups WHERE resolution = ? AND bucket < ?",
+                    (width, now - retention_days * 86400)
+                )
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_compaction', ?)", (str(now),))
+        conn.execute("PRAGMA incremental_vacuum")
+        return deleted
+
+    def compact(self, now: Optional[int] = None) -> int:
+        """立即执行保留期清理与空间回收，返回删除的记录数"""
+        with self._lock:
+            return self._compact(self._connect(), int(now if now is not None else time.time()))
+
+    def iter_range(self, mat_id: int, start: Optional[int] = None, end: Optional[int] = None) -> Iterator[Tuple]:
+        """
+        按时间顺序遍历材料在 [start, end] 内的记录（分批读取）
+
+        Yields:
+            (ts, currentPrice, avgPrice, totalQtyAvailable)
+        """
+        last_ts = (start - 1) if start is not None else -1
+        end = end if end is not None else 2 ** 62
+        while True:
+            with self._lock:
+                batch = self._connect().execute(
+                    "SELECT ts, current_price, avg_price, total_qty FROM price_points "
+                    "WHERE mat_id = ? AND ts > ? AND ts <= ? ORDER BY ts LIMIT ?",
+                    (mat_id, last_ts, end, _SCAN_BATCH)
+                ).fetchall()
+            yield from batch
+            if len(batch) < _SCAN_BATCH:
+                return
+            last_ts = batch[-1][0]
+
+    def range(self, mat_id: int, start: Optional[int] = None, end: Optional[int] = None) -> List[Tuple]:
+        """材料在 [start, end] 内的全部记录"""
+        return list(self.iter_range(mat_id, start, end))
+
+    def iter_rollups(self, mat_id: int, resolution: str, start: Optional[int] = None,
+                     end: Optional[int] = None) -> Iterator[Tuple]:
+        """
+        按时间顺序遍历材料在 [start, end] 内的汇总桶（分批读取）
+
+        Args:
+            mat_id: 材料ID
+            resolution: 汇总粒度（'5m'/'1h'/'1d'）
+            start: 起始时间（Unix秒，含），按桶起点比较
+            end: 结束时间（Unix秒，含）
+
+        Yields:
+            (bucket, open, high, low, close, volume, samples)
+        """
+        width = ROLLUP_RESOLUTIONS[resolution][0]
+        last_bucket = (start - start % width - 1) if start is not None else -1
+        end = end if end is not None else 2 ** 62
+        while True:
+            with self._lock:
+                batch = self._connect().execute(
+                    "SELECT bucket, open, high, low, close, volume, samples FROM price_rollups "
+                    "WHERE resolution = ? AND mat_id = ? AND bucket > ? AND bucket <= ? ORDER BY bucket LIMIT ?",
+                    (width, mat_id, last_bucket, end, _SCAN_BATCH)
+                ).fetchall()
+            yield from batch
+            if len(batch) < _SCAN_BATCH:
+                return
+            last_bucket = batch[-1][0]
+
+    def iter_history_json(self, mat_ids: List[int], resolution: str, start: Optional[int] = None,
+                          end: Optional[int] = None) -> Iterator[str]:
+        """
+        多个材料的汇总历史，逐段生成 JSON 文本（用于流式响应，不在内存中拼接完整结果）
+
+        格式：{"resolution": ..., "columns": [...], "series": {"<matId>": [[bucket, open, ...], ...]}}
+        """
+        yield '{"resolution":%s,"start":%s,"end":%s,"columns":%s,"series":{' % (
+            json.dumps(resolution), json.dumps(start), json.dumps(end),
+            json.dumps(list(ROLLUP_COLUMNS), separators=(',', ':'))
+        )
+        for i, mat_id in enumerate(mat_ids):
+            yield '%s"%d":[' % (',' if i else '', mat_id)
+            chunk = []
+            for j, row in enumerate(self.iter_rollups(mat_id, resolution, start, end)):
+                chunk.append(('[' if j == 0 else ',[') + ','.join(json.dumps(v) for v in row) + ']')
+                if len(chunk) >= _SCAN_BATCH:
+                    yield ''.join(chunk)
+                    chunk = []
+            yield ''.join(chunk) + ']'
+        yield '}}'
+
+    def get_stats(self) -> dict:
+        """获取存储统计信息"""
+        with self._lock:
+            conn = self._connect()
+            rows, materials, oldest, newest = conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT mat_id), MIN(ts), MAX(ts) FROM price_points"
+            ).fetchone()
+            rollups = conn.execute("SELECT COUNT(*) FROM price_rollups").fetchone()[0]
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        return {
+            "rows": rows,
+            "rollups": rollups,
+            "materials": materials,
+            "oldest": oldest,
+            "newest": newest,
+            "bytes": page_count * page_size,
+            "appended": self.appended
+        }
+
+    def on_backup_written(self, source: str, payload: Any):
+        """
+        备份服务写入新的价格/详情快照后的回调
+
+        SQLite 写入与定期清理放到工作线程执行，不阻塞事件循环；
+        每次写入排在上一次之后，保持快照顺序
+        """
+        if source not in ('exchange_prices', 'exchange_details_all'):
+            return
+        ts = int(time.time())
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # 不在事件循环中（如脚本直接调用）时同步写入
+            self._ingest_logged(payload, ts)
+            return
+        self._ingest_task = asyncio.ensure_future(self._ingest_after(self._ingest_task, payload, ts))
+
+    def _ingest_logged(self, payload: Any, ts: int):
+        try:
+            self.ingest(payload, ts)
+        except Exception as e:
+            print(f"警告：无法写入价格历史: {e}")
+
+    async def _ingest_after(self, previous: Optional[asyncio.Future], payload: Any, ts: int):
+        if previous is not None:
+            await asyncio.wait([previous])
+        await asyncio.to_thread(self._ingest_logged, payload, ts)
+
+    async def flush(self):
+        """等待已排队的写入完成"""
+        if self._ingest_task is not None:
+            await asyncio.wait([self._ingest_task])
+
+    def seed_from_backups(self, paths: Iterable[str]):
+        """启动时以备份文件的修改时间写入当前快照（与最后一条记录相同的材料不会重复写入）"""
+        for path in paths:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    payload = json.load(f)
+                self.ingest(payload, int(os.path.getmtime(path)))
+            except (OSError, ValueError) as e:
+                print(f"警告：无法从备份写入价格历史: {e}")
+
+
+# 全局价格历史存储实例
+price_history = PriceHistoryStore(
+    os.path.join(os.path.dirname(__file__), 'data', 'history', 'price_history.sqlite3'),
+    retention_days=settings.PRICE_HISTORY_RETENTION_DAYS,
+    compact_interval=settings.PRICE_HISTORY_COMPACT_INTERVAL
+)
+backup_service.add_listener(price_history.on_backup_written)
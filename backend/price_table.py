@@ -0,0 +1,55 @@
+"""
+GT2See 价格表
+每个价格备份版本构建一次，按 matId 索引，供所有计算器共享
+"""
+from typing import Dict, Any, Iterator, List, Optional, Mapping
+
+
+def is_valid_price(price: Any) -> bool:
+    """价格是否可用（-1表示无订单，0可能表示无数据，None也表示无数据）"""
+    return price is not None and price > 0 and price != -1
+
+
+class PriceTable(Mapping):
+    """
+    只读价格表 {matId: price_data}
+
+    实现 Mapping 接口，可直接作为计算器的 material_prices 参数传入；
+    记录引用快照中的原始对象（不复制），调用方必须视为只读
+    """
+
+    def __init__(self, prices: List[Dict[str, Any]], version: int = 0):
+        self.version = version
+        self._records: Dict[int, Dict[str, Any]] = {}
+        self._current: Dict[int, Any] = {}
+        for price in prices:
+            if not isinstance(price, dict):
+                continue
+            mat_id = price.get('matId')
+            self._records[mat_id] = price
+            self._current[mat_id] = price.get('currentPrice')
+
+    @classmethod
+    def build(cls, payload: Any, version: int = 0) -> 'PriceTable':
+        """从价格备份（{'prices': [...]} 或列表）构建价格表"""
+        if isinstance(payload, dict):
+            prices = payload.get('prices') or []
+        elif isinstance(payload, list):
+            prices = payload
+        else:
+            prices = []
+        return cls(prices, version)
+
+    def __getitem__(self, mat_id: int) -> Dict[str, Any]:
+        return self._records[mat_id]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def current_price(self, mat_id: int) -> Optional[float]:
+        """获取可用的当前价格，不可用时返回None"""
+        price = self._current.get(mat_id)
+        return price if is_valid_price(price) else None
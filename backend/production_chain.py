@@ -0,0 +1,360 @@
+"""
+GT2See 生产链成本求解（自产 vs 购买）
+对每种材料求最低获取成本：直接从交易所购买，或用最便宜的配方生产（输入材料递归取最低成本，
+可计入劳动力成本）。材料依赖图按强连通分量缩点后拓扑排序，一次遍历完成求解；
+存在循环的分量在分量内反复松弛直至收敛（成本单调下降且非负，必然收敛）
+"""
+from typing import Dict, Any, List, Optional, Tuple
+
+from calculators import ComprehensiveAnalyzer
+from constants import get_material_name, get_building_name
+from price_table import is_valid_price
+
+INF = float('inf')
+
+# 判断松弛是否仍在改进的相对误差
+_RELATIVE_EPSILON = 1e-12
+
+# 循环分量的最大松弛轮数（配方产出多于输入时按几何级数收敛）
+MAX_CYCLE_PASSES = 1000
+
+
+def _strongly_connected_components(nodes: List[Any], edges: Dict[Any, List[Any]]) -> List[List[Any]]:
+    """
+    Tarjan 强连通分量（迭代实现）
+
+    Args:
+        nodes: 节点列表
+        edges: {节点: 依赖的节点列表}
+
+    Returns:
+        分量列表，依赖在前（拓扑顺序）
+    """
+    index_of: Dict[Any, int] = {}
+    low: Dict[Any, int] = {}
+    on_stack = set()
+    stack: List[Any] = []
+    components: List[List[Any]] = []
+    counter = 0
+
+    for root in nodes:
+        if root in index_of:
+            continue
+        work = [(root, iter(edges.get(root, ())))]
+        index_of[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, children = work[-1]
+            advanced = False
+            for child in children:
+                if child not in index_of:
+                    index_of[child] = low[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(edges.get(child, ()))))
+                    advanced = True
+                    break
+                if child in on_stack:
+                    low[node] = min(low[node], index_of[child])
+            if advanced:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index_of[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+    return components
+
+
+class ProductionChainGraph:
+    """
+    材料依赖图（每个游戏数据版本构建一次）
+
+    边为 产出材料 → 配方输入材料；components 为按拓扑顺序（输入在前）排列的强连通分量
+    """
+
+    def __init__(self, index):
+        self.version = index.version
+        self.index = index
+
+        material_ids = [m.get('id') for m in index.materials]
+        known = set(material_ids)
+        dependencies: Dict[Any, List[Any]] = {}
+        for output_id, recipes in index.recipes_by_output.items():
+            inputs = []
+            for recipe in recipes:
+                for item in recipe.get('inputs', []) or []:
+                    inputs.append(item.get('id'))
+            dependencies[output_id] = inputs
+            for mat_id in [output_id] + inputs:
+                if mat_id not in known:
+                    known.add(mat_id)
+                    material_ids.append(mat_id)
+
+        self.material_ids: List[Any] = material_ids
+        self.components = _strongly_connected_components(material_ids, dependencies)
+        self.cyclic = set()
+        for component in self.components:
+            if len(component) > 1 or component[0] in dependencies.get(component[0], ()):
+                self.cyclic.update(component)
+
+    @classmethod
+    def from_index(cls, index) -> 'ProductionChainGraph':
+        """从游戏数据索引构建（供 GameDataIndex.derived 使用）"""
+        return cls(index)
+
+
+class ProductionChainSolution:
+    """一次求解的结果：每种材料的最低成本及决策（只读）"""
+
+    def __init__(self, graph: ProductionChainGraph, material_prices: Dict[int, Dict[str, Any]],
+                 total_population: int, include_workforce: bool):
+        self.graph = graph
+        self.total_population = total_population
+        self.include_workforce = include_workforce
+
+        self.buy_prices: Dict[Any, Optional[float]] = {}
+        for mat_id in graph.material_ids:
+            price = material_prices.get(mat_id, {}).get('currentPrice')
+            self.buy_prices[mat_id] = price if is_valid_price(price) else None
+
+        # 每个配方每单位产出的劳动力成本（None表示不可用）
+        self.workforce_per_unit: Dict[Any, Optional[float]] = {}
+        index = graph.index
+        for recipe in index.recipes:
+            output_amount = (recipe.get('output') or {}).get('am', 0)
+            if not include_workforce:
+                self.workforce_per_unit[recipe.get('id')] = 0
+                continue
+            building = index.buildings_by_id.get(recipe.get('producedIn'))
+            if building is None or not output_amount:
+                self.workforce_per_unit[recipe.get('id')] = None
+                continue
+            workforce = ComprehensiveAnalyzer.calculate_workforce_cost_per_cycle(
+                building, recipe, material_prices, index.materials_by_name, total_population
+            )
+            cost = workforce['totalWorkforceCost']
+            self.workforce_per_unit[recipe.get('id')] = cost / output_amount if cost is not None else None
+
+        self.costs: Dict[Any, float] = {}
+        self.best_recipes: Dict[Any, Optional[Tuple[float, Dict[str, Any]]]] = {}
+        self.unconverged = set()
+        self._solve()
+
+    def _best_recipe(self, mat_id: Any) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """按当前成本计算最便宜的生产配方 (单位成本, 配方)，无可用配方时返回None"""
+        best = None
+        for recipe in self.graph.index.recipes_by_output.get(mat_id, []):
+            output_amount = (recipe.get('output') or {}).get('am', 0)
+            workforce = self.workforce_per_unit.get(recipe.get('id'))
+            if not output_amount or output_amount <= 0 or workforce is None:
+                continue
+            input_cost = 0.0
+            for item in recipe.get('inputs', []) or []:
+                input_cost += item.get('am', 0) * self.costs.get(item.get('id'), INF)
+            unit_cost = input_cost / output_amount + workforce
+            if unit_cost < INF and (best is None or unit_cost < best[0]):
+                best = (unit_cost, recipe)
+        return best
+
+    def _relax(self, mat_id: Any) -> bool:
+        """重新计算材料的最低成本，成本下降时返回True"""
+        best_recipe = self._best_recipe(mat_id)
+        self.best_recipes[mat_id] = best_recipe
+        buy_price = self.buy_prices.get(mat_id)
+        cost = buy_price if buy_price is not None else INF
+        if best_recipe is not None and best_recipe[0] < cost:
+            cost = best_recipe[0]
+
+        previous = self.costs.get(mat_id, INF)
+        self.costs[mat_id] = cost
+        return cost < previous and (previous == INF or previous - cost > _RELATIVE_EPSILON * abs(previous))
+
+    def _solve(self):
+        for component in self.graph.components:
+            if len(component) == 1 and component[0] not in self.graph.cyclic:
+                self._relax(component[0])
+                continue
+
+            # 循环分量：从购买价格出发反复松弛直至不再下降
+            for mat_id in component:
+                buy_price = self.buy_prices.get(mat_id)
+                self.costs[mat_id] = buy_price if buy_price is not None else INF
+            for _ in range(MAX_CYCLE_PASSES):
+                changed = False
+                for mat_id in component:
+                    changed = self._relax(mat_id) or changed
+                if not changed:
+                    break
+            else:
+                self.unconverged.update(component)
+
+    def decision(self, mat_id: Any) -> str:
+        """'buy' / 'produce' / 'unavailable'"""
+        cost = self.costs.get(mat_id, INF)
+        if cost == INF:
+            return 'unavailable'
+        buy_price = self.buy_prices.get(mat_id)
+        if buy_price is not None and buy_price <= cost:
+            return 'buy'
+        return 'produce'
+
+    def unit_cost(self, mat_id: Any) -> Optional[float]:
+        cost = self.costs.get(mat_id, INF)
+        return cost if cost != INF else None
+
+    def material_entry(self, mat_id: Any) -> Dict[str, Any]:
+        """单个材料的求解结果"""
+        buy_price = self.buy_prices.get(mat_id)
+        best_recipe = self.best_recipes.get(mat_id)
+        entry = {
+            'materialId': mat_id,
+            'materialName': get_material_name(mat_id, 'en'),
+            'materialNameZh': get_material_name(mat_id, 'zh'),
+            'decision': self.decision(mat_id),
+            'unitCost': self.unit_cost(mat_id),
+            'buyPrice': buy_price,
+            'produceCost': None,
+            'savingsPerUnit': None,
+            'recipeId': None,
+            'buildingId': None,
+            'buildingName': None,
+            'buildingNameZh': None,
+            'outputAmount': None,
+            'workforceCostPerUnit': None,
+            'inputs': [],
+            'inCycle': mat_id in self.graph.cyclic,
+            'converged': mat_id not in self.unconverged
+        }
+        if best_recipe is not None:
+            produce_cost, recipe = best_recipe
+            building_id = recipe.get('producedIn')
+            entry.update({
+                'produceCost': produce_cost,
+                'recipeId': recipe.get('id'),
+                'buildingId': building_id,
+                'buildingName': get_building_name(building_id, 'en'),
+                'buildingNameZh': get_building_name(building_id, 'zh'),
+                'outputAmount': (recipe.get('output') or {}).get('am', 0),
+                'workforceCostPerUnit': self.workforce_per_unit.get(recipe.get('id')),
+                'inputs': [
+                    {
+                        'materialId': item.get('id'),
+                        'amount': item.get('am', 0),
+                        'unitCost': self.unit_cost(item.get('id')),
+                        'decision': self.decision(item.get('id'))
+                    }
+                    for item in recipe.get('inputs', []) or []
+                ]
+            })
+            if buy_price is not None:
+                entry['savingsPerUnit'] = buy_price - produce_cost
+        return entry
+
+    def materials(self) -> List[Dict[str, Any]]:
+        """所有材料的求解结果（按游戏数据中的材料顺序）"""
+        return [self.material_entry(mat_id) for mat_id in self.graph.material_ids]
+
+    def expand(self, mat_id: Any, quantity: float = 1.0, max_depth: int = 16) -> Dict[str, Any]:
+        """
+        展开材料的生产树，并汇总需要购买的材料与各配方的生产轮数
+
+        Args:
+            mat_id: 材料ID
+            quantity: 需要的数量
+            max_depth: 最大展开深度（超过时按购买处理）
+
+        Returns:
+            {'tree', 'shoppingList', 'recipeRuns'}
+        """
+        shopping: Dict[Any, float] = {}
+        runs: Dict[Any, float] = {}
+
+        def visit(current: Any, amount: float, depth: int, path: frozenset) -> Dict[str, Any]:
+            decision = self.decision(current)
+            unit_cost = self.unit_cost(current)
+            node = {
+                'materialId': current,
+                'materialName': get_material_name(current, 'en'),
+                'materialNameZh': get_material_name(current, 'zh'),
+                'quantity': amount,
+                'decision': decision,
+                'unitCost': unit_cost,
+                'totalCost': unit_cost * amount if unit_cost is not None else None,
+                'children': []
+            }
+            best_recipe = self.best_recipes.get(current)
+            # 循环或超过深度时不再展开，按购买处理
+            if decision != 'produce' or best_recipe is None or current in path or depth >= max_depth:
+                if decision == 'produce':
+                    node['decision'] = 'buy'
+                    node['truncated'] = True
+                shopping[current] = shopping.get(current, 0) + amount
+                return node
+
+            recipe = best_recipe[1]
+            output_amount = (recipe.get('output') or {}).get('am', 0)
+            recipe_runs = amount / output_amount
+            runs[recipe.get('id')] = runs.get(recipe.get('id'), 0) + recipe_runs
+            node['recipeId'] = recipe.get('id')
+            node['buildingId'] = recipe.get('producedIn')
+            node['recipeRuns'] = recipe_runs
+            for item in recipe.get('inputs', []) or []:
+                node['children'].append(
+                    visit(item.get('id'), item.get('am', 0) * recipe_runs, depth + 1, path | {current})
+                )
+            return node
+
+        tree = visit(mat_id, quantity, 0, frozenset())
+        return {
+            'tree': tree,
+            'shoppingList': [
+                {
+                    'materialId': m,
+                    'materialName': get_material_name(m, 'en'),
+                    'materialNameZh': get_material_name(m, 'zh'),
+                    'quantity': q,
+                    'unitPrice': self.buy_prices.get(m),
+                    'totalCost': self.buy_prices[m] * q if self.buy_prices.get(m) is not None else None
+                }
+                for m, q in shopping.items()
+            ],
+            'recipeRuns': [
+                {'recipeId': recipe_id, 'runs': r} for recipe_id, r in runs.items()
+            ]
+        }
+
+    def approx_size(self) -> int:
+        """结果缓存的估算字节数"""
+        return 600 * len(self.graph.material_ids)
+
+
+def solve_production_chain(
+    index,
+    material_prices: Dict[int, Dict[str, Any]],
+    total_population: int = 0,
+    include_workforce: bool = True
+) -> ProductionChainSolution:
+    """
+    求解所有材料的最低获取成本
+
+    Args:
+        index: 游戏数据索引（GameDataIndex）
+        material_prices: 材料价格字典（PriceTable）
+        total_population: 总人口（劳动力扩张惩罚）
+        include_workforce: 是否计入劳动力成本
+    """
+    graph = index.derived('production_chain', ProductionChainGraph.from_index)
+    return ProductionChainSolution(graph, material_prices, total_population, include_workforce)
@@ -0,0 +1,476 @@
+"""
+GT2See 配方收益向量化引擎
+将配方集编译为输入矩阵/产出向量/时间向量，按价格向量一次性计算所有配方的收益；
+仅对需要返回的行构建与 RecipeCalculator.calculate_recipe_profit 完全一致的字典结果
+"""
+import threading
+from typing import Dict, List, Any, Optional
+
+try:
+    import numpy as np
+except ImportError:  # numpy 为可选依赖，缺失时回退到纯Python计算
+    np = None
+
+from calculators import RecipeCalculator
+from constants import get_material_name, get_building_name
+from price_table import is_valid_price
+
+HAS_NUMPY = np is not None
+
+RECIPE_PROFIT_SORT_FIELDS = ('totalProfit', 'profitPerHour', 'roi')
+
+
+class RecipeProfitResults:
+    """
+    一组配方收益计算结果（纯Python实现）
+
+    保存未排序的结果及每种排序方式的下标顺序
+    """
+
+    def __init__(self, results: List[Dict[str, Any]]):
+        self.results = results
+        self.total = len(results)
+        self.orderings = {
+            field: self._ordering(field) for field in RECIPE_PROFIT_SORT_FIELDS
+        }
+
+    def _ordering(self, sort_by: str) -> List[int]:
+        # 与 RecipeCalculator.sort_results 相同的稳定排序
+        key = RecipeCalculator.sort_key(sort_by)
+        return sorted(range(self.total), key=lambda i: key(self.results[i]))
+
+    def row(self, i: int) -> Dict[str, Any]:
+        return self.results[i]
+
+    def ordered(self, sort_by: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """按排序方式返回结果，limit 为正数时仅返回前 limit 条"""
+        order = self.orderings[sort_by]
+        if limit and limit > 0:
+            order = order[:limit]
+        return [self.row(i) for i in order]
+
+    def approx_size(self) -> int:
+        """缓存占用的近似字节数"""
+        return self.total * 1200
+
+
+class RecipeEngine:
+    """
+    编译后的配方集（每个游戏数据版本构建一次）
+
+    输入矩阵采用 ELL 格式（每行固定 K 个槽位，不足补零），
+    逐槽位累加以保证与纯Python实现相同的浮点求和顺序
+    """
+
+    def __init__(self, recipes: List[Dict[str, Any]], version: int = 0):
+        self.version = version
+        self.recipes = recipes
+        n = len(recipes)
+
+        self.row_inputs: List[List[Dict[str, Any]]] = []
+        self.row_outputs: List[Dict[str, Any]] = []
+        self.mat_columns: Dict[Any, int] = {}
+        width = 0
+        for recipe in recipes:
+            inputs = recipe.get('inputs', [])
+            if not isinstance(inputs, list):
+                inputs = []
+            output = recipe.get('output', {})
+            if not isinstance(output, dict):
+                output = {}
+            self.row_inputs.append(inputs)
+            self.row_outputs.append(output)
+            width = max(width, len(inputs))
+            for item in inputs:
+                self._column(item.get('id'))
+            self._column(output.get('id'))
+        self.mat_ids = list(self.mat_columns)
+
+        # 输入矩阵（ELL）：材料列、数量；空槽位数量为0，列指向哨兵列（价格恒为0）
+        sentinel = len(self.mat_ids)
+        self.input_cols = np.full((n, width), sentinel, dtype=np.int64)
+        self.input_amounts = np.zeros((n, width), dtype=np.float64)
+        self.input_amount_is_int = np.ones((n, width), dtype=bool)
+        self.output_cols = np.empty(n, dtype=np.int64)
+        self.output_amounts = np.empty(n, dtype=np.float64)
+        self.output_amount_is_int = np.empty(n, dtype=bool)
+        self.time_minutes = np.empty(n, dtype=np.float64)
+        self.rows_by_building: Dict[Any, List[int]] = {}
+
+        for row, recipe in enumerate(recipes):
+            for slot, item in enumerate(self.row_inputs[row]):
+                amount = item.get('am', 0)
+                self.input_cols[row, slot] = self.mat_columns[item.get('id')]
+                self.input_amounts[row, slot] = amount
+                self.input_amount_is_int[row, slot] = isinstance(amount, int)
+            output = self.row_outputs[row]
+            output_amount = output.get('am', 0)
+            self.output_cols[row] = self.mat_columns[output.get('id')]
+            self.output_amounts[row] = output_amount
+            self.output_amount_is_int[row] = isinstance(output_amount, int)
+            self.time_minutes[row] = recipe.get('timeMinutes', 1)
+            self.rows_by_building.setdefault(recipe.get('producedIn'), []).append(row)
+
+        # (价格表版本, 价格向量)：整体替换，并发线程读到的版本与向量总是一致
+        self._price_cache = None
+
+    def _column(self, mat_id: Any) -> int:
+        if mat_id not in self.mat_columns:
+            self.mat_columns[mat_id] = len(self.mat_columns)
+        return self.mat_columns[mat_id]
+
+    def price_vectors(self, material_prices):
+        """
+        按材料列构建价格向量（按价格表版本缓存）
+
+        Returns:
+            (有效价格向量（不可用为0）, 价格是否可用, 价格是否为整数)，末尾附加哨兵列
+        """
+        version = getattr(material_prices, 'version', None)
+        cached = self._price_cache
+        if version is not None and cached is not None and cached[0] == version:
+            return cached[1]
+
+        m = len(self.mat_ids) + 1
+        prices = np.zeros(m, dtype=np.float64)
+        valid = np.zeros(m, dtype=bool)
+        is_int = np.ones(m, dtype=bool)
+        for col, mat_id in enumerate(self.mat_ids):
+            current_price = material_prices.get(mat_id, {}).get('currentPrice', 0)
+            if is_valid_price(current_price):
+                prices[col] = current_price
+                valid[col] = True
+                is_int[col] = isinstance(current_price, int)
+        valid[-1] = True
+
+        vectors = (prices, valid, is_int)
+        if version is not None:
+            self._price_cache = (version, vectors)
+        return vectors
+
+    def evaluate(
+        self,
+        material_prices,
+        fertility_abundance_multiplier: float = 100.0,
+        rows: Optional[List[int]] = None
+    ) -> 'VectorizedRecipeProfitResults':
+        """
+        计算所有（或指定行的）配方收益
+
+        Args:
+            material_prices: 价格表 {material_id: price_data}
+            fertility_abundance_multiplier: 肥力/丰度值
+            rows: 参与计算的行（None表示全部）
+        """
+        return VectorizedRecipeProfitResults(self, material_prices, fertility_abundance_multiplier, rows)
+
+
+class VectorizedRecipeProfitResults(RecipeProfitResults):
+    """配方收益计算结果（向量化实现，字典结果按需构建）"""
+
+    def __init__(self, engine: RecipeEngine, material_prices, multiplier: float, rows: Optional[List[int]]):
+        self.engine = engine
+        self.material_prices = material_prices
+        self.multiplier = multiplier
+        self.rows = np.arange(len(engine.recipes)) if rows is None else np.asarray(rows, dtype=np.int64)
+        self.total = len(self.rows)
+        self._materialized: Dict[int, Dict[str, Any]] = {}
+
+        prices, valid, price_is_int = engine.price_vectors(material_prices)
+        cols = engine.input_cols[self.rows]
+        amounts = engine.input_amounts[self.rows]
+        output_cols = engine.output_cols[self.rows]
+        output_amounts = engine.output_amounts[self.rows]
+        time_minutes = engine.time_minutes[self.rows]
+
+        # 输入成本：逐槽位累加（与逐项 += 的求和顺序一致）
+        input_cost = np.zeros(self.total, dtype=np.float64)
+        for slot in range(cols.shape[1]):
+            input_cost = input_cost + amounts[:, slot] * prices[cols[:, slot]]
+        output_value = output_amounts * prices[output_cols]
+
+        self.input_valid = valid[cols].all(axis=1) if cols.shape[1] else np.ones(self.total, dtype=bool)
+        self.output_valid = valid[output_cols]
+        self.price_available = self.input_valid & self.output_valid
+        # 纯Python实现中整数×整数保持 int，记录每行结果是否应为整数
+        input_is_int = engine.input_amount_is_int[self.rows] & price_is_int[cols]
+        self.input_cost_is_int = input_is_int.all(axis=1) if cols.shape[1] else np.ones(self.total, dtype=bool)
+        self.output_value_is_int = engine.output_amount_is_int[self.rows] & price_is_int[output_cols]
+
+        if multiplier > 0:
+            adjusted_time_minutes = time_minutes / (multiplier / 100.0)
+        else:
+            adjusted_time_minutes = time_minutes
+        adjusted_time_hours = adjusted_time_minutes / 60
+
+        total_profit = output_value - input_cost
+        with np.errstate(divide='ignore', invalid='ignore'):
+            profit_per_hour = np.where(adjusted_time_hours > 0, total_profit / adjusted_time_hours, 0.0)
+            roi = np.where(input_cost > 0, total_profit / input_cost * 100, 0.0)
+
+        self.input_cost = input_cost
+        self.output_value = output_value
+        self.total_profit = total_profit
+        self.profit_per_hour = profit_per_hour
+        self.roi = roi
+        self.roi_available = self.price_available & (input_cost > 0)
+        self.adjusted_time_minutes = adjusted_time_minutes
+        self.adjusted_time_hours = adjusted_time_hours
+
+        self.orderings = {
+            'totalProfit': self._ordering_from(total_profit, self.price_available),
+            'profitPerHour': self._ordering_from(profit_per_hour, self.price_available),
+            'roi': self._ordering_from(roi, self.roi_available),
+        }
+
+    @staticmethod
+    def _ordering_from(values, available) -> List[int]:
+        # 稳定排序：可用值在前并按降序，不可用（None）排在最后
+        keys = np.where(available, -values, 0.0)
+        return np.lexsort((keys, ~available)).tolist()
+
+    def row(self, i: int) -> Dict[str, Any]:
+        result = self._materialized.get(i)
+        if result is None:
+            result = self._materialize(i)
+            self._materialized[i] = result
+        return result
+
+    def _materialize(self, i: int) -> Dict[str, Any]:
+        """构建第 i 行的字典结果（字段与 calculate_recipe_profit 完全一致）"""
+        engine = self.engine
+        row = int(self.rows[i])
+        recipe = engine.recipes[row]
+        material_prices = self.material_prices
+
+        inputs = engine.row_inputs[row]
+        input_details = []
+        unavailable_materials = []
+        for input_item in inputs:
+            mat_id = input_item.get('id')
+            amount = input_item.get('am', 0)
+            current_price = material_prices.get(mat_id, {}).get('currentPrice', 0)
+            price_is_valid = is_valid_price(current_price)
+            if not price_is_valid:
+                unavailable_materials.append({
+                    'materialId': mat_id,
+                    'materialName': get_material_name(mat_id, 'en'),
+                    'materialNameZh': get_material_name(mat_id, 'zh'),
+                })
+                current_price = 0
+            input_details.append({
+                'materialId': mat_id,
+                'materialName': get_material_name(mat_id, 'en'),
+                'materialNameZh': get_material_name(mat_id, 'zh'),
+                'amount': amount,
+                'unitPrice': current_price,
+                'priceAvailable': price_is_valid,
+                'totalCost': amount * current_price
+            })
+
+        output = engine.row_outputs[row]
+        output_mat_id = output.get('id')
+        output_amount = output.get('am', 0)
+        output_unit_price = material_prices.get(output_mat_id, {}).get('currentPrice', 0)
+        output_price_is_valid = is_valid_price(output_unit_price)
+        if not output_price_is_valid:
+            unavailable_materials.append({
+                'materialId': output_mat_id,
+                'materialName': get_material_name(output_mat_id, 'en'),
+                'materialNameZh': get_material_name(output_mat_id, 'zh'),
+            })
+            output_unit_price = 0
+
+        price_available = bool(self.price_available[i])
+        input_cost = self._number(self.input_cost[i], self.input_cost_is_int[i])
+        output_value = self._number(self.output_value[i], self.output_value_is_int[i])
+        if price_available:
+            total_profit = self._number(
+                self.total_profit[i], self.input_cost_is_int[i] and self.output_value_is_int[i]
+            )
+            if self.adjusted_time_hours[i] > 0:
+                profit_per_hour = float(self.profit_per_hour[i])
+            else:
+                profit_per_hour = 0
+            roi = float(self.roi[i]) if self.roi_available[i] else None
+        else:
+            total_profit = None
+            profit_per_hour = None
+            roi = None
+
+        if self.multiplier > 0:
+            adjusted_time_minutes = float(self.adjusted_time_minutes[i])
+        else:
+            adjusted_time_minutes = recipe.get('timeMinutes', 1)
+
+        building_id = recipe.get('producedIn')
+        output_name_zh = get_material_name(output_mat_id, 'zh')
+        first_input_name_zh = ''
+        if inputs:
+            first_input_name_zh = get_material_name(inputs[0].get('id'), 'zh')
+        recipe_name = f"{output_name_zh}({first_input_name_zh})" if first_input_name_zh else output_name_zh
+
+        return {
+            'recipeId': recipe.get('id'),
+            'recipeName': recipe_name,
+            'buildingId': building_id,
+            'buildingName': get_building_name(building_id, 'en'),
+            'buildingNameZh': get_building_name(building_id, 'zh'),
+            'inputCost': input_cost if price_available else None,
+            'outputValue': output_value if price_available else None,
+            'totalProfit': total_profit,
+            'profitPerHour': profit_per_hour,
+            'roi': roi,
+            'timeMinutes': adjusted_time_minutes,
+            'timeHours': float(self.adjusted_time_hours[i]),
+            'priceAvailable': price_available,
+            'unavailableMaterials': unavailable_materials,
+            'inputDetails': input_details,
+            'outputDetails': {
+                'materialId': output_mat_id,
+                'materialName': get_material_name(output_mat_id, 'en'),
+                'materialNameZh': get_material_name(output_mat_id, 'zh'),
+                'amount': output_amount,
+                'unitPrice': output_unit_price,
+                'priceAvailable': output_price_is_valid,
+                'totalValue': output_value if price_available else None
+            }
+        }
+
+    @staticmethod
+    def _number(value, is_int) -> Any:
+        # 纯Python实现中整数价格×整数数量得到 int，这里还原相同的类型
+        return int(value) if is_int else float(value)
+
+    def approx_size(self) -> int:
+        arrays = (
+            self.input_cost, self.output_value, self.total_profit, self.profit_per_hour, self.roi,
+            self.adjusted_time_minutes, self.adjusted_time_hours
+        )
+        return sum(a.nbytes for a in arrays) + self.total * 64 + len(self._materialized) * 1200
+
+
+def _adjusted_time_hours(time_minutes, multiplier: float):
+    """与 calculate_recipe_profit 相同的生产时间换算（小时）"""
+    if multiplier > 0:
+        return time_minutes / (multiplier / 100.0) / 60
+    return time_minutes / 60
+
+
+_engine: Optional[RecipeEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine(index) -> Optional[RecipeEngine]:
+    """获取游戏数据索引对应的配方引擎（每个版本编译一次）；numpy 不可用时返回None"""
+    global _engine
+    if not HAS_NUMPY:
+        return None
+    engine = _engine
+    if engine is not None and engine.version == index.version:
+        return engine
+    # 由 asyncio.to_thread 的工作线程并发调用：同一版本只编译一次
+    with _engine_lock:
+        if _engine is None or _engine.version != index.version:
+            _engine = RecipeEngine(index.recipes, index.version)
+        return _engine
+
+
+def compute_recipe_profits(
+    index,
+    material_prices,
+    fertility_abundance_multiplier: float = 100.0,
+    building_id: Optional[int] = None
+) -> RecipeProfitResults:
+    """
+    计算配方收益（numpy 可用时使用向量化引擎，否则逐个配方计算）
+
+    Args:
+        index: 游戏数据索引
+        material_prices: 价格表
+        fertility_abundance_multiplier: 肥力/丰度值
+        building_id: 筛选特定建筑的配方
+    """
+    engine = get_engine(index)
+    if engine is not None:
+        rows = engine.rows_by_building.get(building_id, []) if building_id else None
+        return engine.evaluate(material_prices, fertility_abundance_multiplier, rows)
+
+    recipes = index.get_recipes_for_building(building_id)
+    return RecipeProfitResults([
+        RecipeCalculator.calculate_recipe_profit(recipe, material_prices, fertility_abundance_multiplier)
+        for recipe in recipes
+    ])
+
+
+def sweep_recipe_profits(
+    index,
+    material_prices,
+    multipliers: List[float],
+    building_id: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    批量计算多个肥力/丰度值下的每小时收益矩阵（配方 × 乘数）
+
+    输入成本与产出价值只计算一次，只有生产时间随乘数变化
+
+    Args:
+        index: 游戏数据索引
+        material_prices: 价格表
+        multipliers: 肥力/丰度值列表
+        building_id: 筛选特定建筑的配方
+
+    Returns:
+        {'multipliers': [...], 'recipes': [...], 'profitPerHour': [[...], ...]}
+        profitPerHour[i][j] 为第 i 个配方在第 j 个乘数下的每小时收益（价格不可用时为None）
+    """
+    base = compute_recipe_profits(index, material_prices, 100.0, building_id)
+    order = base.orderings['profitPerHour']
+
+    if isinstance(base, VectorizedRecipeProfitResults):
+        time_minutes = base.engine.time_minutes[base.rows]
+        hours = np.stack([_adjusted_time_hours(time_minutes, m) for m in multipliers], axis=1) \
+            if multipliers else np.zeros((base.total, 0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            matrix = (base.total_profit[:, None] / hours).tolist()
+        positive_hours = (hours > 0).tolist()
+        available = base.price_available.tolist()
+    else:
+        matrix = []
+        positive_hours = []
+        for result in base.results:
+            recipe = index.recipes_by_id.get(result['recipeId'], {})
+            time_minutes = recipe.get('timeMinutes', 1)
+            hours = [_adjusted_time_hours(time_minutes, m) for m in multipliers]
+            total_profit = result['totalProfit']
+            matrix.append([(total_profit / h) if total_profit is not None and h > 0 else None for h in hours])
+            positive_hours.append([h > 0 for h in hours])
+        available = [result['priceAvailable'] for result in base.results]
+
+    recipes = []
+    profit_per_hour = []
+    for i in order:
+        row = base.row(i)
+        recipes.append({
+            'recipeId': row['recipeId'],
+            'recipeName': row['recipeName'],
+            'buildingId': row['buildingId'],
+            'buildingName': row['buildingName'],
+            'buildingNameZh': row['buildingNameZh'],
+            'priceAvailable': row['priceAvailable'],
+            'totalProfit': row['totalProfit'],
+        })
+        if not available[i]:
+            profit_per_hour.append([None] * len(multipliers))
+        else:
+            # 生产时间为0时与单次计算一致，收益记为0
+            profit_per_hour.append([
+                value if positive else 0
+                for value, positive in zip(matrix[i], positive_hours[i])
+            ])
+
+    return {
+        'multipliers': list(multipliers),
+        'recipes': recipes,
+        'profitPerHour': profit_per_hour
+    }
@@ -0,0 +1,218 @@
+"""
+GT2See 星系资源倒排索引
+每个游戏数据版本构建一次：材料ID → 按丰度降序的 (丰度, 行星, 星系) 倒排表，
+以及每个星系的资源汇总、最大肥力和行星等级列表
+"""
+from bisect import bisect_right
+from typing import Dict, Any, Iterable, List, Optional, Set
+
+
+class SystemResourceSummary:
+    """单个星系的预计算资源汇总（只读）"""
+
+    __slots__ = ('position', 'system', 'planets', 'max_fertility', 'tiers', 'resources', 'resources_by_id')
+
+    def __init__(self, position: int, system: Dict[str, Any]):
+        self.position = position
+        self.system = system
+
+        planets = system.get('planets', []) or []
+        if not isinstance(planets, list):
+            planets = []
+        self.planets: List[Dict[str, Any]] = planets
+
+        max_fertility = 0
+        tiers = set()
+        resource_summary: Dict[Any, Dict[str, Any]] = {}
+        for planet in planets:
+            fertility = planet.get('fert', 0)
+            if fertility > max_fertility:
+                max_fertility = fertility
+            tiers.add(planet.get('tier'))
+
+            resources = planet.get('mats', [])
+            if not isinstance(resources, list):
+                resources = []
+            for resource in resources:
+                mat_id = resource.get('id')
+                abundance = resource.get('ab', 0)
+                if mat_id not in resource_summary:
+                    resource_summary[mat_id] = {
+                        'materialId': mat_id,
+                        'totalAbundance': 0,
+                        'planetCount': 0,
+                        'maxAbundance': 0
+                    }
+                resource_summary[mat_id]['totalAbundance'] += abundance
+                resource_summary[mat_id]['planetCount'] += 1
+                if abundance > resource_summary[mat_id]['maxAbundance']:
+                    resource_summary[mat_id]['maxAbundance'] = abundance
+
+        self.max_fertility = max_fertility
+        self.tiers: List[Any] = sorted(tiers, key=lambda t: (t is None, t if t is not None else 0))
+        # 按首次出现顺序排列，与逐行星累加的结果一致
+        self.resources: List[Dict[str, Any]] = list(resource_summary.values())
+        self.resources_by_id: Dict[Any, Dict[str, Any]] = resource_summary
+
+
+class ResourceIndex:
+    """
+    星系资源倒排索引
+
+    postings[mat_id] 为按丰度降序排列的 (丰度, 行星ID, 星系位置, 行星等级) 列表，
+    多材料的 minAbundance 筛选转化为各倒排表前缀的交集
+    """
+
+    def __init__(self, systems: List[Dict[str, Any]], version: int = 0):
+        self.version = version
+        self.summaries: List[SystemResourceSummary] = [
+            SystemResourceSummary(position, system) for position, system in enumerate(systems)
+        ]
+
+        postings: Dict[Any, List[tuple]] = {}
+        for summary in self.summaries:
+            for planet in summary.planets:
+                resources = planet.get('mats', [])
+                if not isinstance(resources, list):
+                    continue
+                for resource in resources:
+                    postings.setdefault(resource.get('id'), []).append(
+                        (resource.get('ab', 0), planet.get('id'), summary.position, planet.get('tier'))
+                    )
+
+        self.postings: Dict[Any, List[tuple]] = {}
+        # 丰度取负后升序，便于用 bisect 找到“丰度 >= 阈值”的前缀
+        self._negated_abundances: Dict[Any, List[float]] = {}
+        for mat_id, entries in postings.items():
+            entries.sort(key=lambda e: (-e[0], e[2]))
+            self.postings[mat_id] = entries
+            self._negated_abundances[mat_id] = [-e[0] for e in entries]
+
+        # 有行星的星系按最大肥力降序
+        fertile = sorted(
+            (s for s in self.summaries if s.planets),
+            key=lambda s: (-s.max_fertility, s.position)
+        )
+        self._fertile_positions = [s.position for s in fertile]
+        self._negated_fertility = [-s.max_fertility for s in fertile]
+
+        self._best_locations: Dict[Any, List[Dict[str, Any]]] = {}
+
+    @classmethod
+    def from_index(cls, index) -> 'ResourceIndex':
+        """从游戏数据索引构建（供 GameDataIndex.derived 使用）"""
+        return cls(index.systems, index.version)
+
+    def postings_at_least(self, material_id: Any, min_abundance: float) -> List[tuple]:
+        """获取丰度 >= min_abundance 的倒排表前缀"""
+        entries = self.postings.get(material_id)
+        if not entries:
+            return []
+        end = bisect_right(self._negated_abundances[material_id], -min_abundance)
+        return entries[:end]
+
+    def systems_with_material(
+        self,
+        material_id: Any,
+        min_abundance: float = 0,
+        excluded_tiers: Optional[Set[Any]] = None
+    ) -> Set[int]:
+        """至少有一个（未被排除等级的）行星满足丰度要求的星系位置集合"""
+        if excluded_tiers:
+            return {
+                e[2] for e in self.postings_at_least(material_id, min_abundance)
+                if e[3] is None or e[3] not in excluded_tiers
+            }
+        return {e[2] for e in self.postings_at_least(material_id, min_abundance)}
+
+    def systems_with_fertility(self, min_fertility: float) -> Set[int]:
+        """至少有一个行星肥力 >= min_fertility 的星系位置集合"""
+        end = bisect_right(self._negated_fertility, -min_fertility)
+        return set(self._fertile_positions[:end])
+
+    def search(
+        self,
+        material_filters: Optional[List[Dict[str, Any]]] = None,
+        min_fertility: Optional[float] = None
+    ) -> Optional[Set[int]]:
+        """
+        按材料/肥力条件筛选有行星的星系
+
+        Returns:
+            满足条件的星系位置集合；没有任何条件时返回None（表示全部有行星的星系）
+        """
+        candidate_sets = []
+        for filter_item in material_filters or []:
+            candidate_sets.append(
+                self.systems_with_material(filter_item.get('materialId'), filter_item.get('minAbundance', 0))
+            )
+        if min_fertility is not None:
+            candidate_sets.append(self.systems_with_fertility(min_fertility))
+        if not candidate_sets:
+            return None
+
+        # 从最小的集合开始求交集
+        candidate_sets.sort(key=len)
+        result = set(candidate_sets[0])
+        for other in candidate_sets[1:]:
+            if not result:
+                break
+            result &= other
+        return result
+
+    def best_locations(self, material_id: Any) -> List[Dict[str, Any]]:
+        """
+        某材料按星系汇总的总丰度（降序，相同丰度保持星系原始顺序）
+
+        Returns:
+            [{'position', 'totalAbundance', 'planetCount'}]，仅包含总丰度 > 0 的星系
+        """
+        cached = self._best_locations.get(material_id)
+        if cached is not None:
+            return cached
+
+        positions = sorted({e[2] for e in self.postings.get(material_id, [])})
+        locations = []
+        for position in positions:
+            # 星系汇总按行星原始顺序累加
+            resource = self.summaries[position].resources_by_id[material_id]
+            if resource['totalAbundance'] > 0:
+                locations.append({
+                    'position': position,
+                    'totalAbundance': resource['totalAbundance'],
+                    'planetCount': resource['planetCount']
+                })
+        locations.sort(key=lambda x: x['totalAbundance'], reverse=True)
+        self._best_locations[material_id] = locations
+        return locations
+
+    def aggregate(self, positions: Iterable[int]) -> Dict[str, Any]:
+        """
+        汇总一组星系的资源（资源按首次出现顺序）
+
+        Returns:
+            {'planetCount', 'maxFertility', 'resources'}
+        """
+        resource_summary: Dict[Any, Dict[str, Any]] = {}
+        planet_count = 0
+        max_fertility = 0
+        for position in positions:
+            summary = self.summaries[position]
+            planet_count += len(summary.planets)
+            if summary.max_fertility > max_fertility:
+                max_fertility = summary.max_fertility
+            for resource in summary.resources:
+                mat_id = resource['materialId']
+                total = resource_summary.get(mat_id)
+                if total is None:
+                    resource_summary[mat_id] = dict(resource)
+                    continue
+                total['totalAbundance'] += resource['totalAbundance']
+                total['planetCount'] += resource['planetCount']
+                if resource['maxAbundance'] > total['maxAbundance']:
+                    total['maxAbundance'] = resource['maxAbundance']
+        return {
+            'planetCount': planet_count,
+            'maxFertility': max_fertility,
+            'resources': list(resource_summary.values())
+        }
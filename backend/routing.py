@@ -0,0 +1,212 @@
+"""
+GT2See 星系航线规划
+在相邻关系图上计算星系之间的最短航线（光年）：点到点使用 A*（直线距离为启发函数），
+到交易所的距离由交易所星系出发的 Dijkstra 最短路径树一次性算出，按图版本缓存
+"""
+import heapq
+import math
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from neighbor_graph import NeighborGraph
+from spatial_index import SpatialIndex, ly_distance
+
+# 每个引擎缓存的最短路径树数量
+MAX_CACHED_TREES = 16
+
+# 启发函数略微缩小，避免浮点误差破坏可采纳性
+_HEURISTIC_SCALE = 1 - 1e-9
+
+INF = float('inf')
+
+
+class RouteEngine:
+    """
+    相邻关系图上的航线规划引擎（只读，可在请求间共享）
+
+    边权为两端星系坐标的直线距离（与 SystemAnalyzer.calculate_distance 一致），
+    因此直线距离是一致的启发函数，A* 的结果即最短航线
+    """
+
+    def __init__(self, index, graph: NeighborGraph):
+        self.index = index
+        self.graph = graph
+
+        # 节点坐标（星系数据中不存在的节点不参与规划）
+        self.systems: List[Optional[Dict[str, Any]]] = [index.systems_by_id.get(i) for i in graph.ids]
+        self.xs = [s.get('x', 0.0) if s is not None else 0.0 for s in self.systems]
+        self.ys = [s.get('y', 0.0) if s is not None else 0.0 for s in self.systems]
+
+        # 每个节点的 [(邻居节点, 距离)]
+        self.adjacency: List[List[Tuple[int, float]]] = []
+        for node in range(len(graph)):
+            edges = []
+            if self.systems[node] is not None:
+                for neighbor in graph.neighbor_positions(node):
+                    if self.systems[neighbor] is not None:
+                        edges.append((neighbor, ly_distance(
+                            self.xs[node], self.ys[node], self.xs[neighbor], self.ys[neighbor]
+                        )))
+            self.adjacency.append(edges)
+
+        self._trees: "OrderedDict[int, Tuple[List[float], List[int]]]" = OrderedDict()
+
+    @classmethod
+    def from_index(cls, index, graph: NeighborGraph) -> 'RouteEngine':
+        """从游戏数据索引与相邻关系图构建（供 GraphEngineCache 使用）"""
+        return cls(index, graph)
+
+    def node_of(self, system_id: int) -> Optional[int]:
+        """星系ID对应的图节点，不可规划时返回None"""
+        node = self.graph.position_of.get(system_id)
+        if node is None or self.systems[node] is None:
+            return None
+        return node
+
+    def nearest_node(self, x: float, y: float) -> Optional[int]:
+        """距离指定坐标最近的可规划节点（如交易所所在星系）；坐标不是有限数值时返回None"""
+        if not (math.isfinite(x) and math.isfinite(y)):
+            return None
+        spatial_index = self.index.derived('spatial', SpatialIndex.from_index)
+        for position, _ in spatial_index.nearest(x, y, 8):
+            node = self.node_of(self.index.systems[position].get('id'))
+            if node is not None:
+                return node
+        return None
+
+    def _describe_path(self, nodes: List[int]) -> Dict[str, Any]:
+        """航线详情：途经星系及每段距离"""
+        steps = []
+        total = 0.0
+        for i, node in enumerate(nodes):
+            leg = 0.0
+            if i > 0:
+                prev = nodes[i - 1]
+                leg = ly_distance(self.xs[prev], self.ys[prev], self.xs[node], self.ys[node])
+                total += leg
+            system = self.systems[node]
+            steps.append({
+                'systemId': system.get('id'),
+                'systemName': system.get('name'),
+                'x': self.xs[node],
+                'y': self.ys[node],
+                'legDistance': leg
+            })
+        return {
+            'distance': total,
+            'jumps': len(nodes) - 1,
+            'path': steps
+        }
+
+    def shortest_path(self, source_id: int, target_id: int) -> Optional[Dict[str, Any]]:
+        """
+        A* 点到点最短航线
+
+        Args:
+            source_id: 起点星系ID
+            target_id: 终点星系ID
+
+        Returns:
+            {'distance', 'jumps', 'path'}；星系不存在或不可达时返回None
+        """
+        source = self.node_of(source_id)
+        target = self.node_of(target_id)
+        if source is None or target is None:
+            return None
+
+        tx, ty = self.xs[target], self.ys[target]
+        xs, ys = self.xs, self.ys
+        adjacency = self.adjacency
+
+        g_score = {source: 0.0}
+        came_from = {source: -1}
+        closed = set()
+        heap = [(ly_distance(xs[source], ys[source], tx, ty) * _HEURISTIC_SCALE, source)]
+        while heap:
+            _, node = heapq.heappop(heap)
+            if node == target:
+                break
+            if node in closed:
+                continue
+            closed.add(node)
+            base = g_score[node]
+            for neighbor, weight in adjacency[node]:
+                if neighbor in closed:
+                    continue
+                candidate = base + weight
+                if candidate < g_score.get(neighbor, INF):
+                    g_score[neighbor] = candidate
+                    came_from[neighbor] = node
+                    h = ly_distance(xs[neighbor], ys[neighbor], tx, ty) * _HEURISTIC_SCALE
+                    heapq.heappush(heap, (candidate + h, neighbor))
+        else:
+            return None
+
+        nodes = [target]
+        while came_from[nodes[-1]] != -1:
+            nodes.append(came_from[nodes[-1]])
+        nodes.reverse()
+        return self._describe_path(nodes)
+
+    def shortest_path_tree(self, source: int) -> Tuple[List[float], List[int]]:
+        """
+        Dijkstra 单源最短路径树（按起点缓存；图为无向图，也是到起点的距离）
+
+        Returns:
+            (每个节点的距离（不可达为inf）, 前驱节点（起点/不可达为-1）)
+        """
+        cached = self._trees.get(source)
+        if cached is not None:
+            self._trees.move_to_end(source)
+            return cached
+
+        n = len(self.adjacency)
+        dist = [INF] * n
+        prev = [-1] * n
+        dist[source] = 0.0
+        heap = [(0.0, source)]
+        adjacency = self.adjacency
+        while heap:
+            d, node = heapq.heappop(heap)
+            if d > dist[node]:
+                continue
+            for neighbor, weight in adjacency[node]:
+                candidate = d + weight
+                if candidate < dist[neighbor]:
+                    dist[neighbor] = candidate
+                    prev[neighbor] = node
+                    heapq.heappush(heap, (candidate, neighbor))
+
+        tree = (dist, prev)
+        self._trees[source] = tree
+        while len(self._trees) > MAX_CACHED_TREES:
+            self._trees.popitem(last=False)
+        return tree
+
+    def route_distances(self, source: int) -> Dict[int, float]:
+        """{星系ID: 到起点的最短航线距离}（仅包含可达星系）"""
+        dist, _ = self.shortest_path_tree(source)
+        return {
+            self.graph.ids[node]: d for node, d in enumerate(dist) if d != INF
+        }
+
+    def path_in_tree(self, source: int, system_id: int) -> Optional[Dict[str, Any]]:
+        """
+        从最短路径树中取出星系到起点的航线
+
+        Returns:
+            {'distance', 'jumps', 'path'}（由该星系出发到起点）；不可达时返回None
+        """
+        node = self.node_of(system_id)
+        if node is None:
+            return None
+        dist, prev = self.shortest_path_tree(source)
+        if dist[node] == INF:
+            return None
+        nodes = [node]
+        while nodes[-1] != source:
+            nodes.append(prev[nodes[-1]])
+        route = self._describe_path(nodes)
+        # 与 route_distances 保持一致（按由起点出发的累加顺序）
+        route['distance'] = dist[node]
+        return route
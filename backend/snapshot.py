@@ -0,0 +1,153 @@
+"""
+GT2See 本地数据快照
+将备份文件解析为带版本号的只读内存快照，按文件 mtime/size 失效
+"""
+import asyncio
+import itertools
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+# 全局单调递增的快照版本号（所有加载器共享，便于组合成缓存键）
+_version_counter = itertools.count(1)
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    一次加载得到的数据快照
+
+    data 被所有请求共享，调用方必须将其视为只读
+    """
+    version: int
+    path: str
+    mtime: float
+    size: int
+    loaded_at: float
+    data: Any
+    index: Any = None
+
+
+def _read_json_file(path: str) -> Any:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class SnapshotLoader:
+    """
+    备份文件快照加载器
+
+    - 仅当文件 mtime/size 变化或被显式通知（adopt/invalidate）时才重新解析
+    - 并发调用方共享同一个进行中的重新加载，避免惊群
+    - 文件状态检查按 min_check_interval 节流
+    - 可选的 builder(data, version) 在加载时为每个版本构建一次派生索引
+    """
+
+    def __init__(
+        self,
+        path: str,
+        parser: Callable[[str], Any] = _read_json_file,
+        builder: Optional[Callable[[Any, int], Any]] = None,
+        min_check_interval: float = 1.0
+    ):
+        self.path = path
+        self.parser = parser
+        self.builder = builder
+        self.min_check_interval = min_check_interval
+        self._snapshot: Optional[Snapshot] = None
+        self._reload_task: Optional[asyncio.Task] = None
+        self._last_check = 0.0
+        self._stale = False
+        self.reload_count = 0
+
+    @property
+    def current(self) -> Optional[Snapshot]:
+        """当前快照（可能为None）"""
+        return self._snapshot
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime, st.st_size
+        except OSError:
+            return None
+
+    def _is_fresh(self) -> bool:
+        """判断当前快照是否仍与磁盘文件一致"""
+        if self._snapshot is None or self._stale:
+            return False
+
+        now = time.monotonic()
+        if now - self._last_check < self.min_check_interval:
+            return True
+        self._last_check = now
+
+        stat = self._stat()
+        if stat is None:
+            # 文件被删除时继续使用最后一次成功加载的快照
+            return True
+        return stat == (self._snapshot.mtime, self._snapshot.size)
+
+    def _make_snapshot(self, data: Any, stat) -> Snapshot:
+        version = next(_version_counter)
+        index = self.builder(data, version) if self.builder is not None else None
+        return Snapshot(
+            version=version,
+            path=self.path,
+            mtime=stat[0],
+            size=stat[1],
+            loaded_at=time.time(),
+            data=data,
+            index=index
+        )
+
+    def _load_sync(self) -> Optional[Snapshot]:
+        stat = self._stat()
+        if stat is None:
+            return None
+        data = self.parser(self.path)
+        # 解析期间文件可能被再次替换，这里记录解析前的状态，下次检查会再次触发加载
+        return self._make_snapshot(data, stat)
+
+    async def _reload(self) -> Optional[Snapshot]:
+        try:
+            snapshot = await asyncio.to_thread(self._load_sync)
+        except Exception:
+            # 解析失败（例如写入中途）时保留旧快照
+            snapshot = None
+        if snapshot is not None:
+            self._snapshot = snapshot
+            self._stale = False
+            self.reload_count += 1
+        self._last_check = time.monotonic()
+        return self._snapshot
+
+    async def get(self) -> Optional[Snapshot]:
+        """获取最新快照，必要时重新加载（并发调用共享同一次加载）"""
+        if self._is_fresh():
+            return self._snapshot
+
+        if self._reload_task is None or self._reload_task.done():
+            self._reload_task = asyncio.ensure_future(self._reload())
+        # shield: 单个请求被取消时不影响其他等待者
+        return await asyncio.shield(self._reload_task)
+
+    def adopt(self, data: Any) -> Snapshot:
+        """
+        直接采用已在内存中的数据作为新快照（由备份服务在写入文件后调用）
+
+        Args:
+            data: 刚写入文件的数据
+        """
+        stat = self._stat() or (0.0, 0)
+        self._snapshot = self._make_snapshot(data, stat)
+        self._stale = False
+        self._last_check = time.monotonic()
+        self.reload_count += 1
+        return self._snapshot
+
+    def invalidate(self):
+        """标记当前快照过期，下一次 get 时重新加载"""
+        self._stale = True
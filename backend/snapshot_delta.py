@@ -0,0 +1,127 @@
+"""
+GT2See 快照变更日志
+每个新的价格/详情快照在写入时与上一个快照逐条比较一次，记录 (版本号, 变化的 matId, 移除的 matId)；
+客户端带上已有版本号即可只取变化的记录，版本过旧（超出日志窗口或服务重启前的版本）时退回全量
+"""
+import time
+from collections import deque
+from typing import Callable, Dict, Any, FrozenSet, List, Optional, Tuple
+
+# 一次变更：(版本号, 变化的键, 移除的键)
+Change = Tuple[int, FrozenSet[Any], FrozenSet[Any]]
+
+
+class SnapshotChangeLog:
+    """
+    带版本号的快照变更日志（只在事件循环中调用，无需加锁）
+
+    - 版本号取毫秒时间戳并保证单调递增，服务重启后不会与旧版本号重复
+    - 内容未变化的快照（例如文件被重新加载）不产生新版本
+    - 只保留最近 max_versions 次变更
+    """
+
+    def __init__(self, list_key: str, key: str = 'matId', max_versions: int = 288):
+        self.list_key = list_key
+        self.key = key
+        self.max_versions = max_versions
+        self.version = 0
+        self._records: Dict[Any, Dict[str, Any]] = {}
+        self._changes: deque = deque()
+        # 日志窗口起点：该版本之后的每次变更都在 _changes 中
+        self._base_version = 0
+        self._source_version: Optional[int] = None
+        self._listeners: List[Callable[[Change], None]] = []
+
+    def add_listener(self, callback: Callable[[Change], None]):
+        """注册新版本发布后的回调 callback((版本号, 变化的键, 移除的键))"""
+        self._listeners.append(callback)
+
+    def _extract(self, payload: Any) -> List[Dict[str, Any]]:
+        if isinstance(payload, dict):
+            records = payload.get(self.list_key) or []
+        elif isinstance(payload, list):
+            records = payload
+        else:
+            records = []
+        return [r for r in records if isinstance(r, dict) and r.get(self.key) is not None]
+
+    def ingest(self, payload: Any, source_version: Optional[int] = None) -> Optional[Change]:
+        """
+        与上一个快照比较并记录变更
+
+        Args:
+            payload: 快照数据
+            source_version: 快照加载器的版本号（同一个快照重复调用时直接跳过）
+
+        Returns:
+            新产生的变更；内容没有变化时返回None
+        """
+        if source_version is not None and source_version == self._source_version:
+            return None
+        self._source_version = source_version
+
+        records = {r[self.key]: r for r in self._extract(payload)}
+        changed = frozenset(k for k, r in records.items() if self._records.get(k) != r)
+        removed = frozenset(k for k in self._records if k not in records)
+        if self.version and not changed and not removed:
+            return None
+
+        version = max(self.version + 1, int(time.time() * 1000))
+        if not self.version:
+            # 第一个快照只作为日志起点
+            self._base_version = version
+        else:
+            self._changes.append((version, changed, removed))
+            while len(self._changes) > self.max_versions:
+                self._base_version = self._changes.popleft()[0]
+        self.version = version
+        self._records = records
+        change = (version, changed, removed)
+        for callback in self._listeners:
+            try:
+                callback(change)
+            except Exception as e:
+                print(f"警告：快照变更回调失败: {e}")
+        return change
+
+    def delta(self, since: int) -> Dict[str, Any]:
+        """
+        获取 since 版本之后变化的记录
+
+        Returns:
+            {'version', 'since', 'full', list_key: [...], 'removed': [...]}；
+            since 不在日志窗口内时 full 为 True，list_key 为全部记录
+        """
+        known = since == self._base_version or any(version == since for version, _, _ in self._changes)
+        if not self.version or not known:
+            return {
+                'version': self.version,
+                'since': since,
+                'full': True,
+                self.list_key: list(self._records.values()),
+                'removed': []
+            }
+
+        touched = set()
+        for version, changed, removed in self._changes:
+            if version > since:
+                touched |= changed
+                touched |= removed
+        # 按键排序，同一对版本号的响应逐字节一致
+        keys = sorted(touched)
+        return {
+            'version': self.version,
+            'since': since,
+            'full': False,
+            self.list_key: [self._records[k] for k in keys if k in self._records],
+            'removed': [k for k in keys if k not in self._records]
+        }
+
+    def get_stats(self) -> dict:
+        """获取变更日志统计信息"""
+        return {
+            "version": self.version,
+            "base_version": self._base_version,
+            "versions": len(self._changes),
+            "records": len(self._records)
+        }
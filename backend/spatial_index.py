@@ -0,0 +1,219 @@
+"""
+GT2See 星系空间索引
+按 galaxyConfig.hexSize 将星系坐标划分为均匀网格，每个游戏数据版本构建一次，
+支持半径查询（距离某点 max_distance 光年内的星系）和 k 近邻查询
+"""
+import heapq
+import math
+from typing import Dict, Any, List, Optional, Tuple
+
+# 坐标单位到光年的换算（与 SystemAnalyzer.calculate_distance 一致）
+PX_PER_LY = 50.0
+
+# galaxyConfig 缺失 hexSize 时使用的网格边长（坐标单位）
+DEFAULT_CELL_SIZE = 150.0
+
+
+def ly_distance(x1: float, y1: float, x2: float, y2: float) -> float:
+    """
+    计算两点之间的欧几里得距离（光年）
+
+    Args:
+        x1, y1: 第一个点的坐标
+        x2, y2: 第二个点的坐标
+
+    Returns:
+        距离（光年，欧几里得距离除以50）
+    """
+    euclidean_distance = ((x2 - x1) ** 2 + (y2 - y1) ** 2) ** 0.5
+    return euclidean_distance / PX_PER_LY
+
+
+class SpatialIndex:
+    """
+    星系坐标网格索引
+
+    查询只访问与查询圆相交的网格单元，距离仍用 ly_distance 精确计算，
+    因此结果与逐星系扫描完全一致
+    """
+
+    def __init__(self, systems: List[Dict[str, Any]], cell_size: float = DEFAULT_CELL_SIZE, version: int = 0):
+        self.version = version
+        self.cell_size = float(cell_size) if cell_size and cell_size > 0 else DEFAULT_CELL_SIZE
+
+        self.xs: List[float] = []
+        self.ys: List[float] = []
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        for position, system in enumerate(systems):
+            x = system.get('x', 0.0)
+            y = system.get('y', 0.0)
+            self.xs.append(x)
+            self.ys.append(y)
+            self.cells.setdefault(self._cell_of(x, y), []).append(position)
+
+        if self.cells:
+            self.min_cx = min(cx for cx, _ in self.cells)
+            self.max_cx = max(cx for cx, _ in self.cells)
+            self.min_cy = min(cy for _, cy in self.cells)
+            self.max_cy = max(cy for _, cy in self.cells)
+        else:
+            self.min_cx = self.max_cx = self.min_cy = self.max_cy = 0
+
+    @classmethod
+    def from_index(cls, index) -> 'SpatialIndex':
+        """从游戏数据索引构建（供 GameDataIndex.derived 使用）"""
+        return cls(index.systems, index.galaxy_config.get('hexSize') or DEFAULT_CELL_SIZE, index.version)
+
+    def __len__(self) -> int:
+        return len(self.xs)
+
+    def _cell_of(self, x: float, y: float) -> Tuple[int, int]:
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def distance_to(self, position: int, x: float, y: float) -> float:
+        """星系到指定坐标的距离（光年）"""
+        return ly_distance(x, y, self.xs[position], self.ys[position])
+
+    def within(self, x: float, y: float, max_distance: float) -> List[Tuple[int, float]]:
+        """
+        半径查询
+
+        Args:
+            x, y: 查询点坐标
+            max_distance: 最大距离（光年，包含边界）
+
+        Returns:
+            [(星系位置, 距离)]，按星系位置升序
+        """
+        if max_distance < 0 or not self.cells:
+            return []
+
+        # 略微放大搜索范围，避免浮点误差漏掉恰好在边界上的星系
+        radius = max_distance * PX_PER_LY * (1 + 1e-9) + 1e-9
+        min_cx = max(math.floor((x - radius) / self.cell_size), self.min_cx)
+        max_cx = min(math.floor((x + radius) / self.cell_size), self.max_cx)
+        min_cy = max(math.floor((y - radius) / self.cell_size), self.min_cy)
+        max_cy = min(math.floor((y + radius) / self.cell_size), self.max_cy)
+        if min_cx > max_cx or min_cy > max_cy:
+            return []
+
+        if (max_cx - min_cx + 1) * (max_cy - min_cy + 1) > len(self.cells):
+            # 查询范围覆盖大部分网格时直接遍历已有单元
+            buckets = [
+                positions for (cx, cy), positions in self.cells.items()
+                if min_cx <= cx <= max_cx and min_cy <= cy <= max_cy
+            ]
+        else:
+            buckets = []
+            for cx in range(min_cx, max_cx + 1):
+                for cy in range(min_cy, max_cy + 1):
+                    positions = self.cells.get((cx, cy))
+                    if positions:
+                        buckets.append(positions)
+
+        results = []
+        for positions in buckets:
+            for position in positions:
+                distance = ly_distance(x, y, self.xs[position], self.ys[position])
+                if distance <= max_distance:
+                    results.append((position, distance))
+        results.sort()
+        return results
+
+    def nearest(self, x: float, y: float, k: int) -> List[Tuple[int, float]]:
+        """
+        k 近邻查询：从离查询点最近的已占用网格范围内的单元逐圈向外扩展，
+        第 k 个距离不大于未访问区域的下界时提前结束（查询点远在网格之外时圈数也不超过网格大小）
+
+        Args:
+            x, y: 查询点坐标
+            k: 返回数量
+
+        Returns:
+            [(星系位置, 距离)]，按距离升序（距离相同按星系位置）
+        """
+        if k <= 0 or not self.cells or not (math.isfinite(x) and math.isfinite(y)):
+            return []
+
+        qcx, qcy = self._cell_of(x, y)
+        qcx = min(max(qcx, self.min_cx), self.max_cx)
+        qcy = min(max(qcy, self.min_cy), self.max_cy)
+        max_ring = max(
+            qcx - self.min_cx, self.max_cx - qcx,
+            qcy - self.min_cy, self.max_cy - qcy
+        )
+
+        # 最大堆保存当前最近的 k 个 (-距离, -位置)
+        heap: List[Tuple[float, int]] = []
+        for ring in range(max_ring + 1):
+            for cell in self._ring_cells(qcx, qcy, ring):
+                positions = self.cells.get(cell)
+                if not positions:
+                    continue
+                for position in positions:
+                    item = (-ly_distance(x, y, self.xs[position], self.ys[position]), -position)
+                    if len(heap) < k:
+                        heapq.heappush(heap, item)
+                    elif item > heap[0]:
+                        heapq.heapreplace(heap, item)
+
+            if len(heap) == k:
+                bound = self._unvisited_bound(x, y, qcx, qcy, ring)
+                if bound is None or -heap[0][0] < bound:
+                    break
+
+        return sorted(((-p, -d) for d, p in heap), key=lambda item: (item[1], item[0]))
+
+    def _unvisited_bound(self, x: float, y: float, qcx: int, qcy: int, ring: int) -> Optional[float]:
+        """
+        已访问 ring 圈后，网格范围内未访问单元中的点到查询点的最小距离（光年）
+
+        未访问区域由已访问方块左/右/下/上四条贯穿网格的带状区域覆盖，取到各区域矩形的最小距离；
+        全部访问完时返回None
+        """
+        size = self.cell_size
+        grid_x0, grid_x1 = self.min_cx * size, (self.max_cx + 1) * size
+        grid_y0, grid_y1 = self.min_cy * size, (self.max_cy + 1) * size
+        strips = []
+        if qcx - ring > self.min_cx:
+            strips.append((grid_x0, (qcx - ring) * size, grid_y0, grid_y1))
+        if qcx + ring < self.max_cx:
+            strips.append(((qcx + ring + 1) * size, grid_x1, grid_y0, grid_y1))
+        if qcy - ring > self.min_cy:
+            strips.append((grid_x0, grid_x1, grid_y0, (qcy - ring) * size))
+        if qcy + ring < self.max_cy:
+            strips.append((grid_x0, grid_x1, (qcy + ring + 1) * size, grid_y1))
+        if not strips:
+            return None
+        return min(
+            math.hypot(max(x0 - x, 0.0, x - x1), max(y0 - y, 0.0, y - y1))
+            for x0, x1, y0, y1 in strips
+        ) / PX_PER_LY
+
+    @staticmethod
+    def _ring_cells(cx: int, cy: int, ring: int):
+        """与 (cx, cy) 切比雪夫距离恰为 ring 的网格单元"""
+        if ring == 0:
+            yield (cx, cy)
+            return
+        for dx in range(-ring, ring + 1):
+            yield (cx + dx, cy - ring)
+            yield (cx + dx, cy + ring)
+        for dy in range(-ring + 1, ring):
+            yield (cx - ring, cy + dy)
+            yield (cx + ring, cy + dy)
+
+    def sorted_within(self, x: float, y: float, max_distance: Optional[float] = None) -> List[Tuple[int, float]]:
+        """
+        按距离升序返回星系（距离相同按星系位置）
+
+        Args:
+            x, y: 查询点坐标
+            max_distance: 最大距离（光年），None表示全部星系
+        """
+        if max_distance is None:
+            items = [(p, ly_distance(x, y, self.xs[p], self.ys[p])) for p in range(len(self.xs))]
+        else:
+            items = self.within(x, y, max_distance)
+        items.sort(key=lambda item: (item[1], item[0]))
+        return items
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 后端模块以扁平结构导入（与 uvicorn 在 backend 目录下启动时一致）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,98 @@
+"""基地规划超时：HiGHS 与内置求解器超时时返回当前可行解（或LP松弛解），而不是空规划"""
+import json
+import os
+
+import pytest
+
+import base_planner
+from game_data_model import GameDataIndex
+from price_table import PriceTable
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+def _load(name):
+    with open(os.path.join(DATA_DIR, name), encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope='module')
+def index():
+    return GameDataIndex(_load('game_data_backup.json'))
+
+
+@pytest.fixture(scope='module')
+def prices():
+    return PriceTable.build(_load('exchange_prices_backup.json'))
+
+
+def _plan(index, prices, **kwargs):
+    output_id = index.recipes[0]['output']['id']
+    return base_planner.plan_base(index, prices, {output_id: 10.0},
+                                  int(index.galaxy_config.get('slotsPerBase', 0) or 0), **kwargs)
+
+
+def _with_status(real, status, keep_x=True):
+    """包装 scipy 求解函数：照常求解，但把结果标记为超时"""
+    def solve(*args, **kwargs):
+        res = real(*args, **kwargs)
+        res.status = status
+        if not keep_x:
+            res.x = None
+        return res
+    return solve
+
+
+def test_builtin_timeout_returns_plan(index, prices, monkeypatch):
+    monkeypatch.setattr(base_planner, 'HAS_SCIPY', False)
+    baseline = _plan(index, prices, integer=False)
+    calls = []
+    real_simplex = base_planner.simplex
+
+    def simplex(*args, **kwargs):
+        # LP松弛之后的下一次求解即超时
+        calls.append(1)
+        if len(calls) > 1:
+            raise base_planner.PlannerTimeout()
+        return real_simplex(*args, **kwargs)
+
+    monkeypatch.setattr(base_planner, 'simplex', simplex)
+    result = _plan(index, prices, integer=True)
+    if len(calls) == 1:
+        pytest.skip("LP松弛解已是整数解，没有进入分支定界")
+    assert result['solver'] == 'simplex'
+    assert result['status'] == 'timeLimit'
+    assert result['buildings']
+    assert result['netProfitPerHour'] <= baseline['netProfitPerHour'] + 1e-6
+
+
+@pytest.mark.skipif(not base_planner.HAS_SCIPY, reason="SciPy 未安装")
+def test_scipy_lp_time_limit_returns_feasible_basis(index, prices, monkeypatch):
+    optimal = _plan(index, prices, integer=False)
+    monkeypatch.setattr(base_planner, 'linprog', _with_status(base_planner.linprog, 1))
+    result = _plan(index, prices, integer=True)
+    assert result['solver'] == 'highs'
+    assert result['status'] == 'timeLimit'
+    assert result['integral'] is False
+    assert result['buildings']
+    assert result['netProfitPerHour'] == pytest.approx(optimal['netProfitPerHour'])
+    # 超时的基解没有对偶值
+    assert result['shadowPrices']['slot'] is None
+
+
+@pytest.mark.skipif(not base_planner.HAS_SCIPY, reason="SciPy 未安装")
+def test_scipy_lp_time_limit_without_solution(index, prices, monkeypatch):
+    monkeypatch.setattr(base_planner, 'linprog', _with_status(base_planner.linprog, 1, keep_x=False))
+    result = _plan(index, prices, integer=True)
+    assert result['status'] == 'timeLimit'
+    assert 'buildings' not in result
+
+
+@pytest.mark.skipif(not base_planner.HAS_SCIPY, reason="SciPy 未安装")
+def test_scipy_milp_time_limit_falls_back_to_relaxation(index, prices, monkeypatch):
+    monkeypatch.setattr(base_planner, 'milp', _with_status(base_planner.milp, 1, keep_x=False))
+    result = _plan(index, prices, integer=True)
+    assert result['status'] == 'timeLimit'
+    assert result['integral'] is False
+    assert result['buildings']
+    assert result['shadowPrices']['slot'] is not None
@@ -0,0 +1,64 @@
+"""价格历史存储：写入失败时回滚，之后的写入能恢复并重新记录同样的数据"""
+import sqlite3
+
+import pytest
+
+from price_history import PriceHistoryStore
+
+
+class _FailingConnection:
+    """代理 sqlite3 连接，第一次 executemany 时抛出异常"""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self.failures = 1
+
+    def executemany(self, *args, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        return self._conn.executemany(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def _snapshot(price):
+    return {'materials': [
+        {'matId': 1, 'currentPrice': price, 'avgPrice': 100, 'totalQtyAvailable': 50},
+        {'matId': 2, 'currentPrice': price * 2, 'avgPrice': 200, 'totalQtyAvailable': 10},
+    ]}
+
+
+@pytest.fixture
+def store(tmp_path):
+    history = PriceHistoryStore(str(tmp_path / 'history.sqlite3'), retention_days=30, compact_interval=86400)
+    yield history
+    history.close()
+
+
+def test_failed_write_is_rolled_back_and_retried(store):
+    ts = 1_700_000_000
+    assert store.ingest(_snapshot(10), ts) == 2
+
+    real_conn = store._connect()
+    store._conn = _FailingConnection(real_conn)
+    with pytest.raises(sqlite3.OperationalError):
+        store.ingest(_snapshot(11), ts + 60)
+
+    # 事务已回滚：连接不在事务中，失败的数据没有落盘
+    assert not real_conn.in_transaction
+    assert store.range(1) == [(ts, 10.0, 100.0, 50)]
+
+    # 同一快照重试时重新记录这些材料
+    assert store.ingest(_snapshot(11), ts + 60) == 2
+    assert store.range(1) == [(ts, 10.0, 100.0, 50), (ts + 60, 11.0, 100.0, 50)]
+    assert store.range(2)[-1] == (ts + 60, 22.0, 200.0, 10)
+    assert [row[6] for row in store.iter_rollups(1, '1d')] == [2]
+
+
+def test_unchanged_snapshot_is_not_appended(store):
+    ts = 1_700_000_000
+    assert store.ingest(_snapshot(10), ts) == 2
+    assert store.ingest(_snapshot(10), ts + 60) == 0
+    assert store.get_stats()['rows'] == 2
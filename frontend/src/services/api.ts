@@ -64,6 +64,14 @@ export const exchangeApi = {
     apiClient.get('/exchange/prices', { params: { mat_id: matId } }),
   getMaterialDetails: (matId?: number) => 
     apiClient.get('/exchange/details', { params: { mat_id: matId } }),
+  getMaterialPricesDelta: (since: number) =>
+    apiClient.get('/exchange/prices/delta', { params: { since } }),
+  getMaterialDetailsDelta: (since: number) =>
+    apiClient.get('/exchange/details/delta', { params: { since } }),
+  getPriceHistory: (matIds: number[], resolution: '5m' | '1h' | '1d' = '1h', start?: number, end?: number) =>
+    apiClient.get('/exchange/history', {
+      params: { mat_ids: matIds.join(','), resolution, start, end }
+    }),
 }
 
 // ==================== 计算器API ====================
@@ -132,6 +140,19 @@ export const comprehensiveApi = {
     }),
 }
 
+// ==================== 快照推送 ====================
+
+// 订阅新的价格/详情快照（SSE，浏览器自动重连）；返回的 EventSource 需在组件卸载时 close()
+export const subscribeSnapshotEvents = (
+  onEvent: (event: 'hello' | 'prices' | 'details', data: any) => void
+) => {
+  const source = new EventSource(`${getApiBaseUrl()}/events`)
+  for (const name of ['hello', 'prices', 'details'] as const) {
+    source.addEventListener(name, (e) => onEvent(name, JSON.parse((e as MessageEvent).data)))
+  }
+  return source
+}
+
 // ==================== 系统API ====================
 
 export const systemApi = {